@@ -0,0 +1 @@
+"""Shared (non-UI) building blocks for the KMFX dashboard."""
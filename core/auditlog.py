@@ -0,0 +1,254 @@
+"""Buffered audit log writer.
+
+``log()`` only puts the entry on a bounded in-memory queue; a background
+thread writes queued entries to ``logs`` with one ``executemany`` per
+transaction, at most every ``FLUSH_INTERVAL_MS`` or as soon as
+``FLUSH_BATCH`` entries are waiting.  The request thread never waits for a
+commit, and a burst of actions costs one commit instead of one each.
+
+The timestamp is taken when ``log()`` is called, so the order and time of
+entries are the same as with synchronous writes.  An entry shows up in the
+table up to ``FLUSH_INTERVAL_MS`` later.  ``flush()`` waits until
+everything logged so far is committed, and it also runs at interpreter
+exit.
+
+When the queue is full (the database has been locked for a long time) the
+``OVERFLOW`` policy applies:
+
+* ``block`` (default): wait up to ``BLOCK_TIMEOUT`` for room, then write the
+  entry synchronously on the calling thread - slower, never lost;
+* ``drop``: discard the entry and count it in ``stats()["dropped"]``.
+
+A batch the database refuses because it is locked or busy is retried every
+``RETRY_SECONDS`` until it goes in.  Any other error will not go away by
+itself (a bad value, a missing table): the batch is dropped, counted in
+``stats()["failed"]`` and its entries are printed to stderr, so the thread
+keeps draining the queue.
+"""
+import atexit
+import datetime
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from core.db import connect, get_conn
+
+FLUSH_INTERVAL_MS = int(os.getenv("KMFX_LOG_FLUSH_MS", "200"))
+FLUSH_BATCH = int(os.getenv("KMFX_LOG_BATCH", "500"))
+QUEUE_SIZE = int(os.getenv("KMFX_LOG_QUEUE", "10000"))
+OVERFLOW = os.getenv("KMFX_LOG_OVERFLOW", "block")
+BLOCK_TIMEOUT = 2.0          # seconds a caller waits for room before writing inline
+RETRY_SECONDS = 1.0          # pause before retrying a batch the database refused
+
+INSERT = "INSERT INTO logs (timestamp, action, details, user_type, user_id) VALUES (?, ?, ?, ?, ?)"
+
+
+class _Marker:
+    """Queued after the entries a flush() or close() is waiting for."""
+
+    def __init__(self, stop=False):
+        self.stop = stop
+        self.done = threading.Event()
+
+
+class AuditLogger:
+    def __init__(self, interval_ms=FLUSH_INTERVAL_MS, batch=FLUSH_BATCH, size=QUEUE_SIZE, overflow=OVERFLOW):
+        if overflow not in ("block", "drop"):
+            raise ValueError(f"unknown overflow policy {overflow!r} (use 'block' or 'drop')")
+        self.interval = interval_ms / 1000
+        self.batch = batch
+        self.overflow = overflow
+        self._queue = queue.Queue(maxsize=size)
+        self._lock = threading.Lock()
+        self._gate = threading.Condition()    # guards _closed and _producers, never held while waiting for room
+        self._producers = 0                   # log() / flush() calls past the _closed check, not done putting
+        self._stats = {"logged": 0, "written": 0, "batches": 0, "inline": 0, "dropped": 0,
+                       "errors": 0, "failed": 0, "max_depth": 0, "last_batch": 0, "last_flush_ms": 0.0}
+        self._closed = False
+        self._conn = None                # the writer thread's own connection, outside the pool
+        self._thread = threading.Thread(target=self._run, name="kmfx-audit-log", daemon=True)
+        self._thread.start()
+
+    # === CALLER SIDE ===
+    def log(self, action, details="", user_type="System", user_id=None):
+        row = (datetime.datetime.now().isoformat(), action, details, user_type,
+               int(user_id) if user_id is not None else None)
+        queued = False
+        if self._enter():
+            try:
+                queued = self._put(row)
+            finally:
+                self._leave()
+        if not queued:
+            if self.overflow == "drop" and not self._closed:
+                self._count("dropped")
+            else:
+                self._write_inline(row)
+            return
+        with self._lock:
+            self._stats["logged"] += 1
+            self._stats["max_depth"] = max(self._stats["max_depth"], self._queue.qsize())
+
+    def _enter(self):
+        """Register a producer unless closed; close() waits for registered ones before queueing its stop."""
+        with self._gate:
+            if self._closed:
+                return False
+            self._producers += 1
+            return True
+
+    def _leave(self):
+        with self._gate:
+            self._producers -= 1
+            if not self._producers:
+                self._gate.notify_all()
+
+    def _put(self, row):
+        try:
+            if self.overflow == "block":
+                self._queue.put(row, timeout=BLOCK_TIMEOUT)
+            else:
+                self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            return False
+
+    def flush(self, timeout=None):
+        """Wait until every entry logged before this call is committed.  False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self._enter():
+            return True
+        marker = _Marker()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        finally:
+            self._leave()
+        return marker.done.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def close(self, timeout=10.0):
+        """Flush and stop the writer thread; later log() calls write synchronously."""
+        deadline = time.monotonic() + timeout
+        with self._gate:
+            if self._closed:
+                return
+            self._closed = True
+            # A producer waits at most BLOCK_TIMEOUT for room, then writes inline
+            self._gate.wait_for(lambda: not self._producers, timeout)
+        marker = _Marker(stop=True)
+        try:
+            self._queue.put(marker, timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Full:
+            return
+        marker.done.wait(max(0.0, deadline - time.monotonic()))
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, depth=self._queue.qsize(), capacity=self._queue.maxsize,
+                        overflow=self.overflow, running=self._thread.is_alive())
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _write_inline(self, row):
+        conn = get_conn()
+        conn.execute(INSERT, row)
+        conn.commit()
+        self._count("inline")
+
+    # === WRITER THREAD ===
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            rows, markers = [], []
+            (markers if isinstance(first, _Marker) else rows).append(first)
+            # Collect for up to one interval after the first entry, or until the batch is full
+            deadline = time.monotonic() + self.interval
+            while not markers and len(rows) < self.batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                (markers if isinstance(item, _Marker) else rows).append(item)
+            if rows:
+                self._write(rows)
+            for marker in markers:
+                marker.done.set()
+                if marker.stop:
+                    if self._conn is not None:
+                        self._conn.close()
+                    return
+
+    def _write(self, rows):
+        while True:
+            started = time.perf_counter()
+            try:
+                if self._conn is None:
+                    self._conn = connect()
+                conn = self._conn
+                if conn.in_transaction:
+                    conn.commit()
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(INSERT, rows)
+                conn.commit()
+            except Exception as e:
+                if self._conn is not None and self._conn.in_transaction:
+                    self._conn.rollback()
+                self._count("errors")
+                if not _transient(e):
+                    self._count("failed", len(rows))
+                    print(f"Audit log write failed ({len(rows)} entries dropped): {e}", file=sys.stderr)
+                    for row in rows:
+                        print(f"  dropped audit entry {row}", file=sys.stderr)
+                    return
+                print(f"Audit log write failed ({len(rows)} entries kept, retrying): {e}", file=sys.stderr)
+                time.sleep(RETRY_SECONDS)
+                continue
+            with self._lock:
+                self._stats["written"] += len(rows)
+                self._stats["batches"] += 1
+                self._stats["last_batch"] = len(rows)
+                self._stats["last_flush_ms"] = (time.perf_counter() - started) * 1000
+            return
+
+
+def _transient(error):
+    """Locked or busy: another connection holds the database and the same write can succeed later."""
+    return isinstance(error, sqlite3.OperationalError) and any(
+        word in str(error).lower() for word in ("locked", "busy"))
+
+
+# === PROCESS-WIDE LOGGER ===
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def get_logger():
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                _logger = AuditLogger()
+                atexit.register(_logger.close)
+    return _logger
+
+
+def log(action, details="", user_type="System", user_id=None):
+    get_logger().log(action, details, user_type, user_id)
+
+
+def flush(timeout=None):
+    return get_logger().flush(timeout)
+
+
+def stats():
+    return get_logger().stats()
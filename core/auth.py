@@ -0,0 +1,10 @@
+"""Password hashing for admin and client accounts (bcrypt)."""
+import bcrypt
+
+
+def hash_password(pw: str) -> str:
+    return bcrypt.hashpw(pw.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+
+def check_password(pw: str, hashed: str) -> bool:
+    return bcrypt.checkpw(pw.encode('utf-8'), hashed.encode('utf-8'))
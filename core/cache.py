@@ -0,0 +1,97 @@
+"""Process-wide read cache invalidated by per-table change counters.
+
+Every write to a tracked table bumps its row in ``table_versions`` (via the
+triggers installed by migration 3), no matter which session, page or process
+made the write.  A cached read remembers the versions of the tables it
+depends on and stays valid until one of them moves - no TTLs and no manual
+``.clear()`` calls after writes.
+"""
+import functools
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from core.db import get_conn
+
+MAX_ENTRIES = 512
+
+_lock = threading.Lock()
+_store = OrderedDict()        # key -> (versions, value)
+_stats = {}                   # function name -> {"hits": n, "misses": n}
+
+
+def table_versions(conn, tables):
+    placeholders = ",".join("?" * len(tables))
+    rows = dict(conn.execute(f"SELECT name, version FROM table_versions WHERE name IN ({placeholders})",
+                             tuple(tables)).fetchall())
+    return tuple(rows.get(t, 0) for t in tables)
+
+
+def _copy(value):
+    # Callers are used to st.cache_data handing out private copies they may mutate
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def versioned_cache(*tables):
+    """Cache a loader until any of ``tables`` changes.
+
+    The versions are read *before* the loader runs, so a write racing with the
+    load can only make the entry look older than its data (an extra miss later),
+    never newer.
+    """
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+        counters = _stats.setdefault(name, {"hits": 0, "misses": 0})
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            versions = table_versions(get_conn(), tables)
+            key = (name, args, tuple(sorted(kwargs.items())))
+            with _lock:
+                entry = _store.get(key)
+                if entry is not None and entry[0] == versions:
+                    _store.move_to_end(key)
+                    counters["hits"] += 1
+                    return _copy(entry[1])
+                counters["misses"] += 1
+
+            value = fn(*args, **kwargs)
+            with _lock:
+                _store[key] = (versions, value)
+                _store.move_to_end(key)
+                while len(_store) > MAX_ENTRIES:
+                    _store.popitem(last=False)
+            return _copy(value)
+
+        def clear():
+            with _lock:
+                for key in [k for k in _store if k[0] == name]:
+                    del _store[key]
+
+        wrapper.tables = tables
+        wrapper.clear = clear
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """Hit/miss counters per cached loader plus totals."""
+    with _lock:
+        per_function = {name: dict(c) for name, c in _stats.items()}
+        entries = len(_store)
+    hits = sum(c["hits"] for c in per_function.values())
+    misses = sum(c["misses"] for c in per_function.values())
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "entries": entries,
+        "functions": per_function,
+    }
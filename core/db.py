@@ -0,0 +1,283 @@
+"""SQLite connection management for the KMFX dashboard.
+
+Every Streamlit session runs its script in its own thread, so instead of one
+global connection + cursor shared by all of them, each thread borrows its own
+connection from a small bounded pool.  Connections are opened in WAL mode so
+readers never block the (single) writer and vice versa.
+
+Pooled connections time every statement they run (execute plus fetching its
+rows) and report it to the callbacks registered with ``observe()``, e.g. the
+per-page metrics of core/perf.py.  With no observer registered the cost is
+one extra Python call per statement.
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+DB_PATH = os.getenv("KMFX_DB_PATH", "kmfx_ultimate.db")
+POOL_SIZE = int(os.getenv("KMFX_DB_POOL_SIZE", "16"))
+POOL_TIMEOUT = 30.0          # seconds to wait for a free connection
+BUSY_TIMEOUT_MS = 5000       # how long a writer waits on a locked database
+# Prepared statements kept per connection (sqlite3 default: 128).  Every query in
+# core/queries.py and the core modules is a constant string, so this bounds re-parsing.
+STATEMENT_CACHE_SIZE = int(os.getenv("KMFX_DB_STATEMENT_CACHE", "256"))
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous=NORMAL",   # safe with WAL, one fsync per checkpoint
+    "PRAGMA cache_size=-16000",    # ~16 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+# === STATEMENT OBSERVERS ===
+_observers = []
+
+
+def observe(callback):
+    """Call ``callback(sql, params, seconds, rows)`` after every statement on a pooled
+    connection, once its rows have been fetched (or the cursor is dropped)."""
+    if callback not in _observers:
+        _observers.append(callback)
+
+
+class TimedCursor(sqlite3.Cursor):
+    _sql = None
+
+    def execute(self, sql, parameters=()):
+        if not _observers:
+            return super().execute(sql, parameters)
+        self._done()
+        started = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._sql, self._params, self._seconds, self._rows = sql, parameters, time.perf_counter() - started, 0
+        if self.description is None:
+            self._done()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        if not _observers:
+            return super().executemany(sql, seq_of_parameters)
+        self._done()
+        started = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._sql, self._params, self._seconds, self._rows = sql, (), time.perf_counter() - started, 0
+            self._done()
+        return self
+
+    def _fetched(self, started, rows, finished):
+        if self._sql is not None:
+            self._seconds += time.perf_counter() - started
+            self._rows += rows
+            if finished:
+                self._done()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 0 if row is None else 1, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self):
+        self._done()
+        super().close()
+
+    def __del__(self):
+        self._done()
+
+    def _done(self):
+        sql, self._sql = self._sql, None
+        if sql is not None and _observers:
+            for callback in _observers:
+                try:
+                    callback(sql, self._params, self._seconds, self._rows)
+                except Exception as e:
+                    print(f"Statement observer error: {e}", file=sys.stderr)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors (including those of execute()) are TimedCursors."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    """Bounded pool handing out one connection per thread.
+
+    A thread keeps its connection until it calls ``release()`` or dies; the
+    connections of dead threads (e.g. a Streamlit rerun that ended with
+    ``st.stop()``/``st.rerun()``) are reclaimed lazily when the pool runs dry.
+    """
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._owners = {}            # thread -> connection
+        self._created = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE, factory=TimedConnection)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _reclaim_dead(self):
+        reclaimed = 0
+        for thread, conn in list(self._owners.items()):
+            if not thread.is_alive():
+                del self._owners[thread]
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.append(conn)
+                reclaimed += 1
+        return reclaimed
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        deadline = time.monotonic() + self.timeout
+        new = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    new = True
+                    break
+                if self._reclaim_dead():
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No free database connection after {self.timeout:.0f}s "
+                                      f"({self.size} in use)")
+                # Wake up periodically: dead threads never notify us
+                self._cond.wait(min(remaining, 0.5))
+
+        if new:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+                raise
+
+        with self._cond:
+            self._owners[threading.current_thread()] = conn
+        self._local.conn = conn
+        return conn
+
+    def release(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        del self._local.conn
+        if conn.in_transaction:
+            conn.rollback()
+        with self._cond:
+            self._owners.pop(threading.current_thread(), None)
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            for conn in self._idle + list(self._owners.values()):
+                conn.close()
+            self._idle.clear()
+            self._owners.clear()
+            self._created = 0
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "idle": len(self._idle),
+                "in_use": len(self._owners),
+            }
+
+
+# === PROCESS-WIDE POOL ===
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_conn():
+    """The calling thread's connection (borrowed from the process pool)."""
+    return get_pool().connection()
+
+
+def connect(path=None):
+    """A dedicated connection outside the pool, for background jobs.
+
+    Daemon threads live as long as the process: a pooled connection taken by
+    one of them would never be handed back.  The connection is not observed,
+    so background writes do not show up in the page metrics.
+    """
+    conn = sqlite3.connect(path or get_pool().path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE_SIZE)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def release_conn():
+    get_pool().release()
@@ -0,0 +1,97 @@
+"""Change feed shared by every session (and process) using the database.
+
+Writers ``publish()`` an event inside the same transaction as the change it
+describes, so an event exists if and only if the change was committed.  Event
+ids come from an AUTOINCREMENT key and SQLite has a single writer, so commit
+order is id order: a reader holding a cursor (the last id it has seen) gets
+every later event exactly once by asking for ``id > cursor``.  Ids are never
+reused, so cursors stay valid across restarts.
+
+Topics are ``<area>.<what>`` (e.g. ``withdrawal.approved``); ``client_id`` is
+the client the event concerns, or NULL for events meant for everybody.
+"""
+import datetime
+import json
+from collections import namedtuple
+
+FETCH_LIMIT = 200
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        topic TEXT NOT NULL,
+        client_id INTEGER,
+        payload TEXT,
+        created_at TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_events_client ON events(client_id, id)",
+]
+
+Event = namedtuple("Event", "id topic client_id payload created_at")
+
+# What each audience is told about
+STAFF_TOPICS = ("withdrawal.requested", "message.from_client")
+CLIENT_TOPICS = ("withdrawal.approved", "withdrawal.rejected", "withdrawal.paid",
+                 "message.to_client", "license.issued", "announcement.posted")
+
+
+def publish(conn, topic, client_id=None, **payload):
+    """Queue an event in the caller's open transaction; it is visible once the caller commits.
+
+    The payload is stored as JSON and must hold plain Python values: pass ids
+    taken from a DataFrame row as ``int(...)``, or they do not serialize.
+    """
+    cur = conn.execute("INSERT INTO events (topic, client_id, payload, created_at) VALUES (?, ?, ?, ?)",
+                       (topic, int(client_id) if client_id is not None else None,
+                        json.dumps(payload), datetime.datetime.now().isoformat()))
+    return cur.lastrowid
+
+
+def latest_id(conn):
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+
+def fetch_since(conn, cursor, topics=None, client_id=None, limit=FETCH_LIMIT, upto=None):
+    """Events after ``cursor`` (and up to ``upto``) in id order, optionally for some
+    topics and one client (a client also receives the events addressed to everybody)."""
+    where, params = ["id > ?"], [int(cursor)]
+    if upto is not None:
+        where.append("id <= ?")
+        params.append(int(upto))
+    if topics:
+        where.append(f"topic IN ({','.join('?' * len(topics))})")
+        params.extend(topics)
+    if client_id is not None:
+        where.append("(client_id = ? OR client_id IS NULL)")
+        params.append(int(client_id))
+    rows = conn.execute(f"""
+        SELECT id, topic, client_id, payload, created_at FROM events
+        WHERE {' AND '.join(where)}
+        ORDER BY id
+        LIMIT ?
+    """, params + [limit]).fetchall()
+    return [Event(r[0], r[1], r[2], json.loads(r[3]) if r[3] else {}, r[4]) for r in rows]
+
+
+class Subscription:
+    """A cursor over the feed.  New subscriptions start at the current end of
+    the feed unless given a cursor, i.e. they only see what happens next."""
+
+    def __init__(self, topics=None, client_id=None, cursor=None):
+        self.topics = tuple(topics) if topics else None
+        self.client_id = client_id
+        self.cursor = cursor
+
+    def poll(self, conn, limit=FETCH_LIMIT):
+        # Pin the end of the feed first (one rowid lookup, so an idle poll is cheap):
+        # everything up to it is already committed, so jumping the cursor there
+        # cannot skip an event committed meanwhile
+        end = latest_id(conn)
+        if self.cursor is None:
+            self.cursor = end
+            return []
+        if end <= self.cursor:
+            return []
+        events = fetch_since(conn, self.cursor, self.topics, self.client_id, limit, upto=end)
+        self.cursor = events[-1].id if len(events) == limit else end
+        return events
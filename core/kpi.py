@@ -0,0 +1,164 @@
+"""Incrementally maintained KPI totals for the Dashboard Home command center.
+
+``kpi_totals`` (one row per metric) and ``revenue_monthly`` (one row per
+month) are kept up to date by triggers on profits, withdrawals,
+client_licenses and clients, i.e. inside the very transaction that records a
+profit, changes a withdrawal status or issues a license.  The dashboard reads
+O(1) / O(months) rows instead of whole tables.
+
+    python -m core.kpi verify [db]    # recompute from raw tables, report drift
+    python -m core.kpi rebuild [db]   # recompute and overwrite the aggregates
+"""
+import sqlite3
+
+from core.db import DB_PATH, PRAGMAS
+
+# Withdrawal totals are kept per status as "withdrawals:<status>"
+REVENUE_SHARE = "revenue:your_share"
+REVENUE_BONUS = "revenue:referral_bonus"
+LICENSES = "licenses:issued"
+CLIENTS = "clients:total"
+
+
+def _bump(key, amount):
+    return (f"INSERT INTO kpi_totals (key, value) VALUES ({key}, {amount}) "
+            f"ON CONFLICT(key) DO UPDATE SET value = value + excluded.value;")
+
+
+def _bump_month(sign, row):
+    return (f"INSERT INTO revenue_monthly (month, your_share, referral_bonus) "
+            f"SELECT strftime('%Y-%m', {row}.date), {sign}COALESCE({row}.your_share, 0), "
+            f"{sign}COALESCE({row}.referral_bonus, 0) WHERE strftime('%Y-%m', {row}.date) IS NOT NULL "
+            f"ON CONFLICT(month) DO UPDATE SET your_share = your_share + excluded.your_share, "
+            f"referral_bonus = referral_bonus + excluded.referral_bonus;")
+
+
+def _profit_delta(sign, row):
+    return (_bump(f"'{REVENUE_SHARE}'", f"{sign}COALESCE({row}.your_share, 0)")
+            + _bump(f"'{REVENUE_BONUS}'", f"{sign}COALESCE({row}.referral_bonus, 0)")
+            + _bump_month(sign, row))
+
+
+def _withdrawal_delta(sign, row):
+    return _bump(f"'withdrawals:' || COALESCE({row}.status, '')", f"{sign}COALESCE({row}.amount, 0)")
+
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS kpi_totals (
+        key TEXT PRIMARY KEY,
+        value REAL NOT NULL DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS revenue_monthly (
+        month TEXT PRIMARY KEY,
+        your_share REAL NOT NULL DEFAULT 0,
+        referral_bonus REAL NOT NULL DEFAULT 0
+    )""",
+    f"CREATE TRIGGER IF NOT EXISTS trg_profits_kpi_insert AFTER INSERT ON profits BEGIN {_profit_delta('', 'NEW')} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_profits_kpi_delete AFTER DELETE ON profits BEGIN {_profit_delta('-', 'OLD')} END",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_profits_kpi_update
+        AFTER UPDATE OF your_share, referral_bonus, date ON profits
+        BEGIN {_profit_delta('-', 'OLD')} {_profit_delta('', 'NEW')} END""",
+    f"CREATE TRIGGER IF NOT EXISTS trg_withdrawals_kpi_insert AFTER INSERT ON withdrawals BEGIN {_withdrawal_delta('', 'NEW')} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_withdrawals_kpi_delete AFTER DELETE ON withdrawals BEGIN {_withdrawal_delta('-', 'OLD')} END",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_withdrawals_kpi_update
+        AFTER UPDATE OF status, amount ON withdrawals
+        BEGIN {_withdrawal_delta('-', 'OLD')} {_withdrawal_delta('', 'NEW')} END""",
+    f"CREATE TRIGGER IF NOT EXISTS trg_licenses_kpi_insert AFTER INSERT ON client_licenses BEGIN {_bump(repr(LICENSES), '1')} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_licenses_kpi_delete AFTER DELETE ON client_licenses BEGIN {_bump(repr(LICENSES), '-1')} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_clients_kpi_insert AFTER INSERT ON clients BEGIN {_bump(repr(CLIENTS), '1')} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_clients_kpi_delete AFTER DELETE ON clients BEGIN {_bump(repr(CLIENTS), '-1')} END",
+]
+
+
+# === RECOMPUTE FROM RAW TABLES ===
+def expected_totals(conn):
+    totals = {REVENUE_SHARE: 0.0, REVENUE_BONUS: 0.0}
+    row = conn.execute("SELECT COALESCE(SUM(your_share), 0), COALESCE(SUM(referral_bonus), 0) FROM profits").fetchone()
+    totals[REVENUE_SHARE], totals[REVENUE_BONUS] = row
+    for status, amount in conn.execute(
+            "SELECT COALESCE(status, ''), COALESCE(SUM(amount), 0) FROM withdrawals GROUP BY 1"):
+        totals[f"withdrawals:{status}"] = amount
+    totals[LICENSES] = conn.execute("SELECT COUNT(*) FROM client_licenses").fetchone()[0]
+    totals[CLIENTS] = conn.execute("SELECT COUNT(*) FROM clients").fetchone()[0]
+    return totals
+
+
+def expected_monthly(conn):
+    return {month: (share, bonus) for month, share, bonus in conn.execute("""
+        SELECT strftime('%Y-%m', date) AS month,
+               COALESCE(SUM(your_share), 0), COALESCE(SUM(referral_bonus), 0)
+        FROM profits
+        WHERE strftime('%Y-%m', date) IS NOT NULL
+        GROUP BY month
+    """)}
+
+
+def rebuild_rows(conn):
+    """Overwrite the aggregates from the raw tables (caller owns the transaction)."""
+    conn.execute("DELETE FROM kpi_totals")
+    conn.executemany("INSERT INTO kpi_totals (key, value) VALUES (?, ?)", expected_totals(conn).items())
+    conn.execute("DELETE FROM revenue_monthly")
+    conn.executemany("INSERT INTO revenue_monthly (month, your_share, referral_bonus) VALUES (?, ?, ?)",
+                     [(m, s, b) for m, (s, b) in expected_monthly(conn).items()])
+
+
+def rebuild(conn):
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rebuild_rows(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def verify(conn, tolerance=0.005):
+    """List of (what, stored, expected) for every aggregate that drifted."""
+    drift = []
+    stored = dict(conn.execute("SELECT key, value FROM kpi_totals").fetchall())
+    expected = expected_totals(conn)
+    for key in sorted(set(stored) | set(expected)):
+        if abs(stored.get(key, 0) - expected.get(key, 0)) > tolerance:
+            drift.append((key, stored.get(key, 0), expected.get(key, 0)))
+
+    stored_m = {m: (s, b) for m, s, b in conn.execute("SELECT month, your_share, referral_bonus FROM revenue_monthly")}
+    expected_m = expected_monthly(conn)
+    for month in sorted(set(stored_m) | set(expected_m)):
+        s = stored_m.get(month, (0, 0))
+        e = expected_m.get(month, (0, 0))
+        if abs(s[0] - e[0]) > tolerance or abs(s[1] - e[1]) > tolerance:
+            drift.append((f"revenue_monthly:{month}", s, e))
+    return drift
+
+
+# === READS FOR THE DASHBOARD ===
+def read_totals(conn):
+    totals = dict(conn.execute("SELECT key, value FROM kpi_totals").fetchall())
+    return {
+        "revenue_your_share": totals.get(REVENUE_SHARE, 0.0),
+        "revenue_referral_bonus": totals.get(REVENUE_BONUS, 0.0),
+        "total_revenue": totals.get(REVENUE_SHARE, 0.0) + totals.get(REVENUE_BONUS, 0.0),
+        "withdrawals_paid": totals.get("withdrawals:Paid", 0.0),
+        "withdrawals_pending": totals.get("withdrawals:Pending", 0.0),
+        "licenses_issued": int(totals.get(LICENSES, 0)),
+        "total_clients": int(totals.get(CLIENTS, 0)),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    db = sqlite3.connect(sys.argv[2] if len(sys.argv) > 2 else DB_PATH)
+    for pragma in PRAGMAS:
+        db.execute(pragma)
+    if command == "rebuild":
+        rebuild(db)
+        print("KPI aggregates rebuilt from raw tables.")
+    drift = verify(db)
+    if not drift:
+        print("KPI aggregates match the raw tables.")
+    for what, stored, expected in drift:
+        print(f"DRIFT {what}: stored={stored} expected={expected}")
+    sys.exit(1 if drift else 0)
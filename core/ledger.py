@@ -0,0 +1,340 @@
+"""Append-only money ledger behind the client balances.
+
+Every change to a client's equity or withdrawable balance is one row in
+``ledger_entries``: profit shares, referral bonuses, paid withdrawals, opening
+balances and manual adjustments.  ``post()`` is the only writer.  It appends
+the entries in a single ``BEGIN IMMEDIATE`` transaction, together with the
+rows they refer to (the profits rows, the withdrawal's status), so either all
+of it commits or none of it does.
+
+``clients.current_equity`` and ``clients.withdrawable_balance`` stay as a
+projection for the pages that list, sort and show balances.  A trigger on
+``ledger_entries`` updates them in the same transaction as the entry.
+
+A posting can carry an idempotency key.  The key is recorded in
+``posting_keys`` in the same transaction as the entries.  Posting again with
+a key that is already there writes nothing and returns the entries of the
+first posting, so a retry or a double click is harmless.
+
+``balance_snapshots`` holds each client's balances up to some entry id.  A
+balance is the snapshot plus the entries after it, so it can be checked or
+rebuilt from the ledger at any time.  The reconciliation job replays the
+ledger and compares it with the snapshots and the projection, then moves the
+snapshots forward.  The replay runs in a read transaction, so postings carry
+on while it runs.  Only moving the snapshots takes the write lock, a few
+thousand clients per transaction:
+
+    python -m core.ledger verify [db]      # report drift, change nothing
+    python -m core.ledger reconcile [db]   # verify, then take new snapshots
+    python -m core.ledger rebuild [db]     # reset the projection from the ledger
+"""
+import collections
+import datetime
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+
+from core.db import DB_PATH, PRAGMAS, connect
+
+RECONCILE_EVERY_HOURS = 24
+RECONCILE_CHUNK = 5000       # clients per write transaction when the snapshots move forward
+TOLERANCE = 1e-6             # float sums in another order may differ in the last bits
+
+KINDS = ("opening", "profit", "referral_bonus", "withdrawal", "adjustment")
+
+Entry = collections.namedtuple("Entry", "client_id equity withdrawable kind ref_table ref_id memo",
+                               defaults=(None, None, ""))
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS ledger_entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        client_id INTEGER NOT NULL,
+        equity_delta REAL NOT NULL DEFAULT 0,
+        withdrawable_delta REAL NOT NULL DEFAULT 0,
+        kind TEXT NOT NULL,
+        ref_table TEXT,
+        ref_id INTEGER,
+        memo TEXT,
+        posted_at TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_ledger_client ON ledger_entries(client_id, id)",
+    """CREATE TABLE IF NOT EXISTS balance_snapshots (
+        client_id INTEGER PRIMARY KEY,
+        entry_id INTEGER NOT NULL,
+        current_equity REAL NOT NULL,
+        withdrawable_balance REAL NOT NULL,
+        taken_at TEXT
+    )""",
+    # The ledger is append-only: corrections are new entries
+    """CREATE TRIGGER IF NOT EXISTS trg_ledger_no_update BEFORE UPDATE ON ledger_entries
+        BEGIN
+            SELECT RAISE(ABORT, 'ledger entries are append-only - post a correcting entry');
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_ledger_no_delete BEFORE DELETE ON ledger_entries
+        BEGIN
+            SELECT RAISE(ABORT, 'ledger entries are append-only - post a correcting entry');
+        END""",
+]
+
+# Created after the opening entries, which record balances the clients already have
+PROJECTION = [
+    """CREATE TRIGGER IF NOT EXISTS trg_ledger_projection AFTER INSERT ON ledger_entries
+        BEGIN
+            UPDATE clients
+            SET current_equity = current_equity + NEW.equity_delta,
+                withdrawable_balance = withdrawable_balance + NEW.withdrawable_delta
+            WHERE id = NEW.client_id;
+        END""",
+]
+
+POSTING_KEYS = [
+    """CREATE TABLE IF NOT EXISTS posting_keys (
+        key TEXT PRIMARY KEY,
+        first_entry INTEGER,
+        last_entry INTEGER,
+        posted_at TEXT NOT NULL
+    )""",
+]
+
+
+def open_balances(conn):
+    """One opening entry per client for the balances it had before the ledger existed."""
+    conn.execute("""
+        INSERT INTO ledger_entries (client_id, equity_delta, withdrawable_delta, kind, memo, posted_at)
+        SELECT id, COALESCE(current_equity, 0), COALESCE(withdrawable_balance, 0), 'opening',
+               'balance before the ledger', ?
+        FROM clients ORDER BY id
+    """, (datetime.datetime.now().isoformat(),))
+    conn.execute("UPDATE clients SET current_equity = COALESCE(current_equity, 0), "
+                 "withdrawable_balance = COALESCE(withdrawable_balance, 0)")
+    snapshot_rows(conn)
+
+
+# === POSTING ===
+def posting_key(*parts):
+    """Idempotency key from the values that identify one intended posting."""
+    return hashlib.sha256(json.dumps([str(p) for p in parts]).encode()).hexdigest()
+
+
+def _posted_with(conn, key):
+    row = conn.execute("SELECT first_entry, last_entry FROM posting_keys WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    return [Entry(*e) for e in conn.execute("""
+        SELECT client_id, equity_delta, withdrawable_delta, kind, ref_table, ref_id, memo
+        FROM ledger_entries WHERE id BETWEEN ? AND ? ORDER BY id
+    """, row)]
+
+
+def post(conn, entries, key=None):
+    """Append money movements to the ledger atomically.  Returns the entries posted.
+
+    ``entries`` is an iterable of ``Entry`` or a function ``(conn) -> entries``.
+    The function runs inside the transaction, so it can write the rows the
+    entries refer to and read balances no other writer can change before the
+    commit.  If it raises, nothing is written.
+
+    With a ``key`` that was posted before, the function is not called and the
+    entries of that first posting are returned instead.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Checked under the write lock, so two racing postings cannot both miss it
+        replayed = _posted_with(conn, key) if key is not None else None
+        if replayed is not None:
+            conn.rollback()
+            return replayed
+        posted = [Entry(*e) for e in (entries(conn) if callable(entries) else entries)]
+        unknown = {e.kind for e in posted} - set(KINDS)
+        if unknown:
+            raise ValueError(f"unknown ledger entry kind(s): {', '.join(sorted(map(str, unknown)))}")
+        now = datetime.datetime.now().isoformat()
+        # AUTOINCREMENT under the write lock: this posting gets the next len(posted) ids
+        last_id = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence "
+                               "WHERE name = 'ledger_entries'").fetchone()[0]
+        conn.executemany("""INSERT INTO ledger_entries
+                            (client_id, equity_delta, withdrawable_delta, kind, ref_table, ref_id, memo, posted_at)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                         [(int(e.client_id), float(e.equity), float(e.withdrawable), e.kind, e.ref_table,
+                           None if e.ref_id is None else int(e.ref_id), e.memo, now) for e in posted])
+        if key is not None:
+            conn.execute("INSERT INTO posting_keys (key, first_entry, last_entry, posted_at) VALUES (?, ?, ?, ?)",
+                         (key, last_id + 1, last_id + len(posted), now))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return posted
+
+
+# === BALANCES ===
+_MAX_ID = 2 ** 63 - 1
+_BALANCES = """
+    SELECT c.id AS client_id,
+           COALESCE(s.current_equity, 0) + COALESCE(SUM(e.equity_delta), 0) AS equity,
+           COALESCE(s.withdrawable_balance, 0) + COALESCE(SUM(e.withdrawable_delta), 0) AS withdrawable,
+           COALESCE(MAX(e.id), s.entry_id, 0) AS last_entry
+    FROM clients c
+    LEFT JOIN balance_snapshots s ON s.client_id = c.id
+    LEFT JOIN ledger_entries e ON e.client_id = c.id AND e.id > COALESCE(s.entry_id, 0)
+"""
+
+
+def balances(conn, client_ids=None):
+    """{client_id: (equity, withdrawable)} from the snapshots plus the entries since."""
+    where, params = "", ()
+    if client_ids is not None:
+        where, params = "WHERE c.id IN (SELECT value FROM json_each(?))", (json.dumps(sorted({int(i) for i in client_ids})),)
+    return {cid: (equity, withdrawable)
+            for cid, equity, withdrawable, _ in conn.execute(_BALANCES + where + " GROUP BY c.id", params)}
+
+
+def snapshot_rows(conn, upto=None, first=0, last=None):
+    """Move the snapshots of clients ``first < id <= last`` (default: all) up to entry
+    ``upto`` (default: their latest entry).  The caller owns the transaction."""
+    conn.execute(f"""
+        INSERT INTO balance_snapshots (client_id, entry_id, current_equity, withdrawable_balance, taken_at)
+        SELECT client_id, last_entry, equity, withdrawable, ? FROM ({_BALANCES} AND e.id <= ?
+                                                                    WHERE c.id > ? AND c.id <= ? GROUP BY c.id)
+        WHERE true
+        ON CONFLICT(client_id) DO UPDATE SET
+            entry_id = excluded.entry_id,
+            current_equity = excluded.current_equity,
+            withdrawable_balance = excluded.withdrawable_balance,
+            taken_at = excluded.taken_at
+        WHERE excluded.entry_id > balance_snapshots.entry_id
+    """, (datetime.datetime.now().isoformat(), _MAX_ID if upto is None else upto, first,
+          _MAX_ID if last is None else last))
+
+
+# === RECONCILIATION ===
+def verify(conn):
+    """List of problems: snapshots that do not match a full replay of the ledger,
+    and projected balances on clients that do not match snapshot + entries since."""
+    problems = []
+    for cid, snap_eq, snap_wd, replay_eq, replay_wd in conn.execute("""
+        SELECT s.client_id, s.current_equity, s.withdrawable_balance,
+               COALESCE(SUM(e.equity_delta), 0), COALESCE(SUM(e.withdrawable_delta), 0)
+        FROM balance_snapshots s
+        LEFT JOIN ledger_entries e ON e.client_id = s.client_id AND e.id <= s.entry_id
+        GROUP BY s.client_id
+    """):
+        if abs(snap_eq - replay_eq) > TOLERANCE or abs(snap_wd - replay_wd) > TOLERANCE:
+            problems.append(f"client {cid}: snapshot {snap_eq:.2f} / {snap_wd:.2f}, "
+                            f"ledger {replay_eq:.2f} / {replay_wd:.2f}")
+    return problems + _projection_drift(conn)
+
+
+def _projection_drift(conn, where="", params=()):
+    problems = []
+    for cid, equity, withdrawable, ledger_eq, ledger_wd in conn.execute(f"""
+        SELECT c.id, c.current_equity, c.withdrawable_balance, b.equity, b.withdrawable
+        FROM clients c JOIN ({_BALANCES} {where} GROUP BY c.id) b ON b.client_id = c.id
+    """, params):
+        if abs((equity or 0) - ledger_eq) > TOLERANCE or abs((withdrawable or 0) - ledger_wd) > TOLERANCE:
+            problems.append(f"client {cid}: balance {equity or 0:.2f} / {withdrawable or 0:.2f}, "
+                            f"ledger {ledger_eq:.2f} / {ledger_wd:.2f}")
+    return problems
+
+
+def reconcile(conn, chunk=RECONCILE_CHUNK):
+    """Verify, then (only if clean) move the snapshots forward.  Returns the problems found.
+
+    The verify reads one consistent state of the ledger without blocking writers.
+    The snapshots then move up to the last entry it saw, ``chunk`` clients per
+    write transaction.  Before each move, the clients of the chunk that got
+    entries after the verify started are checked again under the write lock;
+    a chunk with drift keeps its snapshots.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN")
+    try:
+        # The first read fixes what this transaction sees: the verify covers entries up to here
+        upto = conn.execute("SELECT COALESCE(MAX(id), 0) FROM ledger_entries").fetchone()[0]
+        last_client = conn.execute("SELECT COALESCE(MAX(id), 0) FROM clients").fetchone()[0]
+        problems = verify(conn)
+    finally:
+        conn.rollback()
+    if problems:
+        return problems
+    for first in range(0, last_client, chunk):
+        last = first + chunk
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            drift = _projection_drift(conn, "WHERE c.id IN (SELECT client_id FROM ledger_entries "
+                                            "WHERE id > ? AND client_id > ? AND client_id <= ?)",
+                                      (upto, first, last))
+            if drift:
+                problems += drift
+                conn.rollback()
+                continue
+            snapshot_rows(conn, upto, first, last)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return problems
+
+
+def rebuild(conn):
+    """Reset the projected balances on clients to what the ledger says."""
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM balance_snapshots")
+        snapshot_rows(conn)
+        conn.execute("""
+            UPDATE clients SET
+                current_equity = (SELECT current_equity FROM balance_snapshots s WHERE s.client_id = clients.id),
+                withdrawable_balance = (SELECT withdrawable_balance FROM balance_snapshots s WHERE s.client_id = clients.id)
+        """)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _scheduled(every_hours):
+    while True:
+        # A connection of its own per run: the thread outlives any pooled one it would borrow
+        conn = connect()
+        try:
+            for problem in reconcile(conn):
+                print(f"Ledger drift: {problem}", file=sys.stderr)
+        except Exception as e:
+            print(f"Ledger reconciliation error: {e}", file=sys.stderr)
+        finally:
+            conn.close()
+        time.sleep(every_hours * 3600)
+
+
+def start_scheduler(every_hours=RECONCILE_EVERY_HOURS):
+    """Reconcile now and then every ``every_hours`` on a daemon thread."""
+    thread = threading.Thread(target=_scheduled, args=(every_hours,), name="kmfx-ledger-reconcile", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    db = sqlite3.connect(sys.argv[2] if len(sys.argv) > 2 else DB_PATH)
+    for pragma in PRAGMAS:
+        db.execute(pragma)
+    if command == "rebuild":
+        rebuild(db)
+        print("Client balances rebuilt from the ledger.")
+    problems = reconcile(db) if command == "reconcile" else verify(db)
+    entries, clients = db.execute("SELECT COUNT(*), COUNT(DISTINCT client_id) FROM ledger_entries").fetchone()
+    print(f"ledger: {entries} entries for {clients} clients")
+    if not problems:
+        print("Snapshots and client balances match the ledger." + (" Snapshots moved forward." if command == "reconcile" else ""))
+    for problem in problems:
+        print(f"DRIFT {problem}")
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,88 @@
+"""Batch id -> name (or a few other columns) resolution.
+
+Pages that show a client name next to rows from another table resolve all of
+the ids at once.  Ids seen before come from a per-process dict.  The rest
+are fetched with a single ``IN (json_each(?))`` query, so it is one
+statement whatever the number of ids.  The dict is dropped as soon as the
+table's change counter (core/cache.py) moves, the same way
+``versioned_cache`` invalidates.
+"""
+import json
+import threading
+
+import pandas as pd
+
+from core.cache import table_versions
+from core.db import get_conn
+
+MAX_ENTRIES = 200_000
+
+
+class Lookup:
+    """id -> row of ``columns`` from ``table``, cached until the table changes."""
+
+    def __init__(self, table, columns=("name",)):
+        self.table = table
+        self.columns = tuple(columns)
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+
+    def get(self, ids):
+        """{id: (column values...)} for the ids that exist."""
+        wanted = set(pd.Series(ids, dtype="float64").dropna().astype("int64").tolist())
+        conn = get_conn()
+        # Read the version before the rows (see versioned_cache): a racing write
+        # can only make the dict look older than its rows, never newer
+        version = table_versions(conn, (self.table,))
+        with self._lock:
+            if version != self._version or len(self._rows) > MAX_ENTRIES:
+                self._rows = {}
+                self._version = version
+            found = {i: self._rows[i] for i in wanted if i in self._rows}
+            self.hits += len(found)
+            self.misses += len(wanted) - len(found)
+        missing = wanted - found.keys()
+        if missing:
+            fetched = dict.fromkeys(missing)  # ids with no row stay cached as None
+            fetched.update((row[0], tuple(row[1:])) for row in conn.execute(
+                f"SELECT id, {', '.join(self.columns)} FROM {self.table} "
+                f"WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(sorted(missing)),)))
+            with self._lock:
+                self.queries += 1
+                if self._version == version:
+                    self._rows.update(fetched)
+            found.update(fetched)
+        return {i: row for i, row in found.items() if row is not None}
+
+    def names(self, ids):
+        """{id: first column} - the usual id -> name map."""
+        return {i: row[0] for i, row in self.get(ids).items()}
+
+    def attach(self, df, id_column, columns=None, inner=False):
+        """Copy of ``df`` with ``columns`` (default: all) looked up by ``df[id_column]``.
+
+        ``inner=True`` drops rows whose id has no match, like an inner JOIN would.
+        """
+        columns = tuple(columns or self.columns)
+        rows = self.get(df[id_column])
+        found = pd.DataFrame.from_dict(rows, orient="index", columns=list(self.columns))
+        out = df.copy()
+        for col in columns:
+            out[col] = out[id_column].map(found[col]) if rows else None
+        if inner:
+            out = out[out[id_column].isin(list(rows))]
+        return out
+
+    def stats(self):
+        with self._lock:
+            return {"table": self.table, "entries": len(self._rows), "hits": self.hits,
+                    "misses": self.misses, "queries": self.queries}
+
+
+clients = Lookup("clients", ("name", "type"))
+# Withdrawal review also shows how to pay the client and what they can withdraw
+client_contacts = Lookup("clients", ("name", "withdrawable_balance", "mobile_number", "address"))
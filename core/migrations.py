@@ -0,0 +1,281 @@
+"""Versioned schema migrations.
+
+Each migration is ``(version, description, steps)`` where ``steps`` is a list
+of SQL statements or callables taking the connection.  Applied versions are
+recorded in ``schema_version``; a database that is already up to date costs a
+single SELECT.  Never edit a migration that has shipped - append a new one.
+"""
+import datetime
+import sqlite3
+
+from core import events, kpi, ledger, perf, referrals, retention, rowversion, search, slowlog, timeseries
+from core.db import DB_PATH, PRAGMAS
+
+# === BASE SCHEMA (was the `tables` list in streamlit_app.py) ===
+BASE_TABLES = [
+    '''CREATE TABLE IF NOT EXISTS clients (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        type TEXT DEFAULT 'Regular',
+        accounts TEXT,
+        expiry TEXT,
+        start_balance REAL DEFAULT 0,
+        current_equity REAL DEFAULT 0,
+        withdrawable_balance REAL DEFAULT 0,
+        add_date TEXT,
+        referred_by INTEGER,
+        referral_code TEXT UNIQUE,
+        notes TEXT,
+        address TEXT,
+        mobile_number TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS users (
+        client_id INTEGER UNIQUE,
+        username TEXT UNIQUE,
+        password TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS admins (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE,
+        password TEXT,
+        name TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS profits (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        client_id INTEGER,
+        profit REAL,
+        date TEXT,
+        client_share REAL,
+        your_share REAL,
+        referral_bonus REAL DEFAULT 0
+    )''',
+    '''CREATE TABLE IF NOT EXISTS client_licenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        client_id INTEGER,
+        key TEXT,
+        enc_data TEXT,
+        version TEXT,
+        date_generated TEXT,
+        expiry TEXT,
+        allow_live INTEGER DEFAULT 1
+    )''',
+    '''CREATE TABLE IF NOT EXISTS client_files (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        client_id INTEGER,
+        file_name TEXT,
+        original_name TEXT,
+        upload_date TEXT,
+        sent_by TEXT,
+        notes TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS announcements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        message TEXT,
+        date TEXT,
+        posted_by TEXT,
+        likes INTEGER DEFAULT 0
+    )''',
+    '''CREATE TABLE IF NOT EXISTS announcement_files (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        announcement_id INTEGER,
+        file_name TEXT,
+        original_name TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        from_client_id INTEGER DEFAULT NULL,
+        from_admin TEXT DEFAULT NULL,
+        to_client_id INTEGER DEFAULT NULL,
+        message TEXT,
+        timestamp TEXT,
+        read INTEGER DEFAULT 0
+    )''',
+    '''CREATE TABLE IF NOT EXISTS message_attachments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        message_id INTEGER,
+        file_name TEXT,
+        original_name TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS notifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        client_id INTEGER,
+        title TEXT,
+        message TEXT,
+        category TEXT DEFAULT 'General',
+        date TEXT,
+        read INTEGER DEFAULT 0
+    )''',
+    '''CREATE TABLE IF NOT EXISTS withdrawals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        client_id INTEGER,
+        amount REAL,
+        method TEXT,
+        details TEXT,
+        status TEXT DEFAULT 'Pending',
+        date_requested TEXT,
+        date_processed TEXT DEFAULT NULL,
+        processed_by TEXT DEFAULT NULL,
+        notes TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS ea_versions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        version TEXT,
+        file_name TEXT,
+        upload_date TEXT,
+        notes TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS announcement_comments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        announcement_id INTEGER,
+        commenter_name TEXT,
+        comment TEXT,
+        timestamp TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT,
+        action TEXT,
+        details TEXT,
+        user_type TEXT,
+        user_id INTEGER DEFAULT NULL
+    )''',
+]
+
+# Columns added after the first release - older databases may still lack them
+LATE_COLUMNS = [
+    ("clients", "current_equity", "REAL DEFAULT 0"),
+    ("clients", "withdrawable_balance", "REAL DEFAULT 0"),
+    ("clients", "referred_by", "INTEGER"),
+    ("clients", "address", "TEXT"),
+    ("clients", "mobile_number", "TEXT"),
+    ("clients", "referral_code", "TEXT"),
+    ("notifications", "read", "INTEGER DEFAULT 0"),
+    ("announcements", "likes", "INTEGER DEFAULT 0"),
+    ("admins", "name", "TEXT"),
+]
+
+
+def table_columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _base_schema(conn):
+    for sql in BASE_TABLES:
+        conn.execute(sql)
+    for table, column, definition in LATE_COLUMNS:
+        if column not in table_columns(conn, table):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            if (table, column) == ("clients", "referral_code"):
+                # SQLite cannot ADD a UNIQUE column, so enforce it with an index instead
+                conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_clients_referral_code ON clients(referral_code)")
+
+
+# Tables whose writes bump table_versions (read by core/cache.py)
+VERSIONED_TABLES = [
+    "clients", "users", "admins", "profits", "client_licenses", "client_files",
+    "announcements", "announcement_files", "messages", "message_attachments",
+    "notifications", "withdrawals", "ea_versions", "announcement_comments", "logs",
+]
+
+
+def _table_version_triggers(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS table_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )""")
+    for table in VERSIONED_TABLES:
+        conn.execute("INSERT OR IGNORE INTO table_versions (name, version) VALUES (?, 0)", (table,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+                END""")
+
+
+# === MIGRATIONS (APPEND ONLY) ===
+MIGRATIONS = [
+    (1, "base schema", [_base_schema]),
+    (2, "indexes for hot lookup columns", [
+        "CREATE INDEX IF NOT EXISTS idx_profits_client_date ON profits(client_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_clients_referred_by ON clients(referred_by)",
+        "CREATE INDEX IF NOT EXISTS idx_messages_from_client ON messages(from_client_id)",
+        "CREATE INDEX IF NOT EXISTS idx_messages_to_client ON messages(to_client_id)",
+        "CREATE INDEX IF NOT EXISTS idx_notifications_client_read ON notifications(client_id, read)",
+        "CREATE INDEX IF NOT EXISTS idx_withdrawals_status ON withdrawals(status)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs(timestamp)",
+        # users.username already has the UNIQUE autoindex
+    ]),
+    (3, "per-table change counters", [_table_version_triggers]),
+    (4, "KPI totals and monthly revenue rollup", kpi.SCHEMA + [kpi.rebuild_rows]),
+    (5, "covering index for profit time series", timeseries.SCHEMA),
+    (6, "referral closure table", referrals.SCHEMA + [referrals.rebuild_rows]),
+    (7, "event feed", events.SCHEMA),
+    (8, "full-text search indexes", search.SCHEMA + [search.rebuild_rows]),
+    (9, "indexes for audit log filters", [
+        "CREATE INDEX IF NOT EXISTS idx_logs_action ON logs(action, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_user_type ON logs(user_type, timestamp)",
+    ]),
+    (10, "log archive registry", retention.SCHEMA),
+    (11, "balance ledger", ledger.SCHEMA + [ledger.open_balances] + ledger.PROJECTION),
+    (12, "idempotency keys for ledger postings", ledger.POSTING_KEYS),
+    (13, "referral graph change counter", referrals.GRAPH_VERSION_SCHEMA),
+    (14, "per-client change counters", rowversion.SCHEMA + [rowversion.rebuild_rows]),
+    (15, "page render metrics", perf.SCHEMA),
+    (16, "slow statement log", slowlog.SCHEMA),
+    (17, "full-text indexes for log archives", [retention.index_archives]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT
+    )""")
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def run_migrations(conn):
+    """Apply pending migrations, each in its own transaction. Returns the versions applied."""
+    if conn.in_transaction:
+        conn.commit()
+    if current_version(conn) >= LATEST_VERSION:
+        return []
+
+    applied = []
+    for version, description, steps in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check under the write lock: another process may have beaten us to it
+            if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone():
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                         (version, description, datetime.datetime.now().isoformat()))
+            conn.commit()
+            applied.append(version)
+        except Exception:
+            conn.rollback()
+            raise
+    return applied
+
+
+if __name__ == "__main__":
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else DB_PATH
+    db = sqlite3.connect(path)
+    for pragma in PRAGMAS:
+        db.execute(pragma)
+    before = current_version(db)
+    done = run_migrations(db)
+    print(f"{path}: schema version {before} -> {current_version(db)}"
+          + (f" (applied {', '.join(map(str, done))})" if done else " (up to date)"))
@@ -0,0 +1,36 @@
+"""Client notification feed reads.
+
+The Notifications page polls ``signature()`` from a ``st.fragment`` timer
+instead of sleeping in the script thread and rerunning the whole app.  The
+signature is answered from the (client_id, read) index alone, and the list
+itself is only re-read when the signature moves.
+"""
+import pandas as pd
+
+POLL_SECONDS = 5
+
+CATEGORY_ICONS = {
+    'License': '🔑',
+    'Withdrawal': '💳',
+    'General': '📢',
+    'Message': '✉️',
+    'Profit': '💰',
+    'System': '⚙️',
+}
+
+
+def signature(conn, client_id):
+    """(newest id, total, unread) - changes on every insert, delete or read flip."""
+    return conn.execute("""
+        SELECT COALESCE(MAX(id), 0), COUNT(*), COALESCE(SUM(read = 0), 0)
+        FROM notifications WHERE client_id = ?
+    """, (int(client_id),)).fetchone()
+
+
+def load(conn, client_id):
+    return pd.read_sql("""
+        SELECT id, title, message, category, date, read
+        FROM notifications
+        WHERE client_id = ?
+        ORDER BY read ASC, date DESC
+    """, conn, params=(int(client_id),))
@@ -0,0 +1,361 @@
+"""Per-page render metrics: where the time of a rerun goes.
+
+``views.render()`` runs every page inside ``page_run(page, role)``.  While a
+run is open on a thread, the statement observer of core/db.py adds every
+statement that thread executes to it: the count, rows fetched and time in
+SQLite.  ``queries._read`` adds the time spent building DataFrames.  A
+finished run keeps its wall time, those totals and whether the page raised.
+
+Finished runs wait in memory and a background thread writes them to
+``perf_runs`` every ``FLUSH_SECONDS``.  Their statements are summed per SQL
+text into ``perf_queries`` (calls, total and slowest time, rows).  Rows older
+than ``KEEP_DAYS`` are deleted, so both tables hold a rolling window.  The
+owner's Performance page reads them: p50/p95/p99 per page and the slowest
+statements.
+
+Profiling: with ``KMFX_PROFILE=1`` the first session that opens a page after
+start-up has each of its page runs profiled with cProfile.  Each run is
+dumped to its own pstats file in ``PROFILE_DIR`` (read it with
+``python -m pstats FILE``).  Other sessions are never profiled.
+
+    python -m core.perf [hours] [db]    # p50/p95/p99 per page and the slowest statements
+"""
+import atexit
+import contextlib
+import cProfile
+import datetime
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from core import db
+from core.db import DB_PATH, PRAGMAS
+
+FLUSH_SECONDS = 5
+KEEP_DAYS = int(os.getenv("KMFX_PERF_KEEP_DAYS", "14"))
+MAX_PENDING = 10000          # runs kept in memory while the database refuses writes
+PRUNE_EVERY_SECONDS = 3600
+PROFILE = os.getenv("KMFX_PROFILE", "0") not in ("", "0")
+PROFILE_DIR = os.getenv("KMFX_PROFILE_DIR", "profiles")
+PERCENTILES = (0.5, 0.95, 0.99)
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS perf_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts TEXT NOT NULL,
+        page TEXT NOT NULL,
+        role TEXT,
+        wall_ms REAL NOT NULL,
+        db_ms REAL NOT NULL DEFAULT 0,
+        pandas_ms REAL NOT NULL DEFAULT 0,
+        queries INTEGER NOT NULL DEFAULT 0,
+        rows INTEGER NOT NULL DEFAULT 0,
+        error INTEGER NOT NULL DEFAULT 0
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_perf_runs_ts ON perf_runs(ts)",
+    """CREATE TABLE IF NOT EXISTS perf_queries (
+        sql TEXT PRIMARY KEY,
+        calls INTEGER NOT NULL DEFAULT 0,
+        total_ms REAL NOT NULL DEFAULT 0,
+        max_ms REAL NOT NULL DEFAULT 0,
+        rows INTEGER NOT NULL DEFAULT 0,
+        last_page TEXT,
+        last_seen TEXT
+    )""",
+]
+
+INSERT_RUN = """INSERT INTO perf_runs (ts, page, role, wall_ms, db_ms, pandas_ms, queries, rows, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+UPSERT_QUERY = """INSERT INTO perf_queries (sql, calls, total_ms, max_ms, rows, last_page, last_seen)
+                  VALUES (?, ?, ?, ?, ?, ?, ?)
+                  ON CONFLICT(sql) DO UPDATE SET
+                      calls = calls + excluded.calls,
+                      total_ms = total_ms + excluded.total_ms,
+                      max_ms = MAX(max_ms, excluded.max_ms),
+                      rows = rows + excluded.rows,
+                      last_page = excluded.last_page,
+                      last_seen = excluded.last_seen"""
+
+
+class Run:
+    """Totals of one page run, filled in by the statement observer while it is open."""
+
+    def __init__(self, page, role=None):
+        self.page = page
+        self.role = role
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.rows = 0
+        self.db_seconds = 0.0
+        self.pandas_seconds = 0.0
+        self.statements = {}         # sql -> [calls, seconds, slowest, rows]
+
+    def add(self, sql, seconds, rows):
+        self.queries += 1
+        self.rows += rows
+        self.db_seconds += seconds
+        stat = self.statements.get(sql)
+        if stat is None:
+            self.statements[sql] = [1, seconds, seconds, rows]
+        else:
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+            stat[3] += rows
+
+
+_local = threading.local()
+_lock = threading.Lock()
+_pending_runs = []
+_pending_queries = {}            # sql -> [calls, seconds, slowest, rows, page, ts]
+_stats = {"runs": 0, "written": 0, "dropped": 0, "errors": 0, "profiles": 0}
+_writer = None
+_writer_conn = None
+_flush_lock = threading.Lock()   # one flush at a time on the writer connection
+_last_prune = 0.0
+_profiled_session = None
+
+
+def _on_statement(sql, params, seconds, rows):
+    run = getattr(_local, "run", None)
+    if run is not None:
+        run.add(" ".join(sql.split()), seconds, rows)
+
+
+db.observe(_on_statement)
+
+
+# === RECORDING ===
+@contextlib.contextmanager
+def page_run(page, role=None, profile=False):
+    """Measure the block as one run of ``page``; ``profile`` also dumps a cProfile of it."""
+    run = Run(page, role)
+    outer = getattr(_local, "run", None)
+    _local.run = run
+    profiler = cProfile.Profile() if profile else None
+    error = False
+    try:
+        if profiler is not None:
+            profiler.enable()
+        yield run
+    except Exception:
+        error = True
+        raise
+    finally:
+        # st.stop() / st.rerun() end the page with a BaseException: a normal run
+        if profiler is not None:
+            profiler.disable()
+            _dump(profiler, page)
+        _local.run = outer
+        _finish(run, error)
+
+
+def add_pandas(seconds):
+    """Charge DataFrame building time to the run open on this thread, if any."""
+    run = getattr(_local, "run", None)
+    if run is not None:
+        run.pandas_seconds += seconds
+
+
+def _finish(run, error):
+    wall = time.perf_counter() - run.started
+    ts = datetime.datetime.now().isoformat()
+    row = (ts, run.page, run.role, wall * 1000, run.db_seconds * 1000, run.pandas_seconds * 1000,
+           run.queries, run.rows, int(error))
+    with _lock:
+        _stats["runs"] += 1
+        if len(_pending_runs) >= MAX_PENDING:
+            _stats["dropped"] += 1
+            return
+        _pending_runs.append(row)
+        for sql, (calls, seconds, slowest, rows) in run.statements.items():
+            agg = _pending_queries.get(sql)
+            if agg is None:
+                _pending_queries[sql] = [calls, seconds, slowest, rows, run.page, ts]
+            else:
+                agg[0] += calls
+                agg[1] += seconds
+                agg[2] = max(agg[2], slowest)
+                agg[3] += rows
+                agg[4], agg[5] = run.page, ts
+    _start_writer()
+
+
+# === WRITER ===
+def _own_conn():
+    """The writer's connection, outside the pool: the writer thread never hands a connection back."""
+    global _writer_conn
+    if _writer_conn is None:
+        _writer_conn = db.connect()
+    return _writer_conn
+
+
+def flush(conn=None):
+    """Write the finished runs waiting in memory.  Returns how many were written."""
+    with _flush_lock:
+        return _flush(conn)
+
+
+def _flush(conn):
+    global _last_prune
+    with _lock:
+        runs = list(_pending_runs)
+        queries = dict(_pending_queries)
+        _pending_runs.clear()
+        _pending_queries.clear()
+    if not runs and not queries:
+        return 0
+    conn = conn or _own_conn()
+    if conn.in_transaction:
+        conn.commit()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(INSERT_RUN, runs)
+        conn.executemany(UPSERT_QUERY, [(sql, calls, seconds * 1000, slowest * 1000, rows, page, ts)
+                                        for sql, (calls, seconds, slowest, rows, page, ts) in queries.items()])
+        if time.monotonic() - _last_prune > PRUNE_EVERY_SECONDS:
+            prune(conn)
+            _last_prune = time.monotonic()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        with _lock:
+            _stats["errors"] += 1
+            # Keep them for the next flush, oldest first, within the memory bound
+            _pending_runs[:0] = runs[:max(0, MAX_PENDING - len(_pending_runs))]
+            for sql, agg in queries.items():
+                _pending_queries.setdefault(sql, agg)
+        raise
+    with _lock:
+        _stats["written"] += len(runs)
+    return len(runs)
+
+
+def prune(conn, days=KEEP_DAYS):
+    """Delete runs and statement totals older than ``days`` (caller owns the transaction)."""
+    cutoff = (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat()
+    conn.execute("DELETE FROM perf_runs WHERE ts < ?", (cutoff,))
+    conn.execute("DELETE FROM perf_queries WHERE last_seen < ?", (cutoff,))
+
+
+def _write_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            flush()
+        except Exception as e:
+            print(f"Perf metrics write failed (kept for the next try): {e}", file=sys.stderr)
+
+
+def _start_writer():
+    global _writer
+    if _writer is None:
+        with _lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_loop, name="kmfx-perf-metrics", daemon=True)
+                _writer.start()
+                atexit.register(_flush_at_exit)
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception as e:
+        print(f"Perf metrics lost at exit: {e}", file=sys.stderr)
+
+
+def stats():
+    with _lock:
+        return dict(_stats, pending=len(_pending_runs), profiling=PROFILE, profile_dir=PROFILE_DIR,
+                    profiled_session=_profiled_session)
+
+
+# === PROFILING ===
+def profiling(session_id):
+    """True if this session's runs are profiled: KMFX_PROFILE is on and it is the session
+    that asked first."""
+    global _profiled_session
+    if not PROFILE:
+        return False
+    with _lock:
+        if _profiled_session is None:
+            _profiled_session = session_id
+        return _profiled_session == session_id
+
+
+def _dump(profiler, page):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r"[^a-z0-9]+", "-", page.lower()).strip("-")
+    path = os.path.join(PROFILE_DIR, f"{datetime.datetime.now():%Y%m%d-%H%M%S-%f}-{slug}.prof")
+    try:
+        profiler.dump_stats(path)
+    except OSError as e:
+        print(f"Profile dump failed: {e}", file=sys.stderr)
+        return
+    with _lock:
+        _stats["profiles"] += 1
+
+
+def profile_dumps():
+    """(file name, size, modified) of the dumps in PROFILE_DIR, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    dumps = []
+    for name in os.listdir(PROFILE_DIR):
+        if name.endswith(".prof"):
+            info = os.stat(os.path.join(PROFILE_DIR, name))
+            dumps.append((name, info.st_size, datetime.datetime.fromtimestamp(info.st_mtime)))
+    return sorted(dumps, key=lambda d: d[2], reverse=True)
+
+
+# === READ SIDE ===
+def _since(hours):
+    return (datetime.datetime.now() - datetime.timedelta(hours=hours)).isoformat() if hours else ""
+
+
+def page_summary(conn, hours=None):
+    """One row per page over the last ``hours`` (None = everything kept): runs, wall time
+    p50/p95/p99/max, mean queries / rows / DB and pandas time, errors.  Slowest p95 first."""
+    runs = pd.read_sql("SELECT page, wall_ms, db_ms, pandas_ms, queries, rows, error FROM perf_runs WHERE ts >= ?",
+                       conn, params=(_since(hours),))
+    columns = ["page", "runs", "p50_ms", "p95_ms", "p99_ms", "max_ms", "queries", "rows", "db_ms", "pandas_ms", "errors"]
+    if runs.empty:
+        return pd.DataFrame(columns=columns)
+    grouped = runs.groupby("page")
+    summary = grouped["wall_ms"].quantile(list(PERCENTILES)).unstack()
+    summary.columns = ["p50_ms", "p95_ms", "p99_ms"]
+    summary["runs"] = grouped.size()
+    summary["max_ms"] = grouped["wall_ms"].max()
+    summary[["queries", "rows", "db_ms", "pandas_ms"]] = grouped[["queries", "rows", "db_ms", "pandas_ms"]].mean()
+    summary["errors"] = grouped["error"].sum()
+    return summary.reset_index()[columns].sort_values("p95_ms", ascending=False).reset_index(drop=True)
+
+
+def slow_queries(conn, hours=None, limit=20, order="total_ms"):
+    """Statements seen in page runs, ordered by ``total_ms``, ``max_ms`` or ``avg_ms``."""
+    order = {"total_ms": "total_ms", "max_ms": "max_ms", "avg_ms": "total_ms / calls"}[order]
+    return pd.read_sql(f"""
+        SELECT sql, calls, total_ms, total_ms / calls AS avg_ms, max_ms, rows, last_page, last_seen
+        FROM perf_queries WHERE last_seen >= ?
+        ORDER BY {order} DESC LIMIT ?
+    """, conn, params=(_since(hours), int(limit)))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    hours = float(args.pop(0)) if args and re.fullmatch(r"[0-9.]+", args[0]) else None
+    conn = sqlite3.connect(args[0] if args else DB_PATH)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    window = f"last {hours:g} h" if hours else "everything kept"
+    with pd.option_context("display.width", 200, "display.max_columns", 20, "display.max_colwidth", 90,
+                           "display.float_format", "{:,.1f}".format):
+        print(f"Page runs ({window}):")
+        print(page_summary(conn, hours).to_string(index=False))
+        print("\nSlowest statements by total time:")
+        print(slow_queries(conn, hours, limit=15)[["calls", "total_ms", "avg_ms", "max_ms", "rows", "sql"]].to_string(index=False))
@@ -0,0 +1,260 @@
+"""Profit posting engine: shares, referral bonuses and balance updates.
+
+The split rules are the ones the single-client "RECORD PROFIT / LOSS" button
+applies:
+
+* the client keeps 65% (Regular) or 75% (Pioneer) of a profit, nothing of a loss;
+* a Regular client's profit pays 6% / 3% / 1% to its first three uplines, as
+  long as the chain is unbroken Pioneers (the first non-Pioneer stops it);
+* each bonus is its own profits row on the Pioneer and is added to the
+  Pioneer's withdrawable balance;
+* the owner keeps ``profit - client_share - bonuses``.
+
+``compute_postings`` applies them to a whole batch with vectorized pandas
+joins against the bonus chains of core/referrals.py; ``post_profits``
+computes and writes the result in one transaction with ``executemany``.
+The single-client button and the bulk import both go through it.
+Balances move only through ledger entries (core/ledger.py), one per profits
+row, posted in that same transaction.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from core import ledger, referrals
+from core.referrals import MAX_BONUS_DEPTH, REFERRAL_RATES
+
+CLIENT_SHARE_RATES = {"Regular": 0.65, "Pioneer": 0.75}
+
+IMPORT_COLUMNS = ["client_id", "profit", "date"]
+PROFIT_COLUMNS = ["client_id", "profit", "date", "client_share", "your_share", "referral_bonus"]
+
+
+def client_share_rate(client_type):
+    # Anything that is not a Pioneer is paid like a Regular client
+    return CLIENT_SHARE_RATES["Pioneer"] if str(client_type).strip() == "Pioneer" else CLIENT_SHARE_RATES["Regular"]
+
+
+def normalize_entries(conn, entries, default_date=None):
+    """Validate an import (DataFrame, CSV rows, or (client_id, profit, date) tuples).
+
+    Clients may be given by ``client_id`` or by exact ``name``.  Raises
+    ValueError listing every bad row instead of posting part of a batch.
+    """
+    df = entries.copy() if isinstance(entries, pd.DataFrame) else pd.DataFrame(list(entries), columns=IMPORT_COLUMNS)
+    df.columns = [str(col).strip().lower() for col in df.columns]
+    if "profit" not in df.columns or not ({"client_id", "name"} & set(df.columns)):
+        raise ValueError("Import needs a 'profit' column and a 'client_id' or 'name' column.")
+    df = df.reset_index(drop=True)
+
+    clients = pd.read_sql("SELECT id, name, type FROM clients", conn)
+    problems = []
+    if "client_id" not in df.columns:
+        names = clients.groupby(clients["name"].str.strip())["id"].agg(list)
+        matches = df["name"].astype(str).str.strip().map(names)
+        for i in df.index[matches.isna() | (matches.str.len() != 1)]:
+            kind = "unknown" if not isinstance(matches[i], list) else "ambiguous"
+            problems.append(f"row {i + 1}: {kind} client name {df.at[i, 'name']!r}")
+        df["client_id"] = matches.map(lambda m: m[0] if isinstance(m, list) and len(m) == 1 else np.nan)
+
+    df["client_id"] = pd.to_numeric(df["client_id"], errors="coerce")
+    df["profit"] = pd.to_numeric(df["profit"], errors="coerce")
+    if "date" not in df.columns:
+        df["date"] = None
+    if default_date is not None:
+        df["date"] = df["date"].where(df["date"].notna() & (df["date"].astype(str).str.strip() != ""), default_date)
+    dates = pd.to_datetime(df["date"], errors="coerce")
+
+    known = df["client_id"].isin(clients["id"])
+    for i in df.index:
+        if pd.isna(df.at[i, "client_id"]):
+            if "name" not in df.columns:
+                problems.append(f"row {i + 1}: missing client_id")
+        elif not known[i]:
+            problems.append(f"row {i + 1}: no client with ID {int(df.at[i, 'client_id'])}")
+        if pd.isna(df.at[i, "profit"]) or df.at[i, "profit"] == 0:
+            problems.append(f"row {i + 1}: profit must be a non-zero number")
+        if pd.isna(dates[i]):
+            raw = df.at[i, "date"]
+            problems.append(f"row {i + 1}: " + ("missing date" if pd.isna(raw) or not str(raw).strip()
+                                                else f"invalid date {raw!r}"))
+    if problems:
+        raise ValueError("; ".join(problems[:20]) + (f" (+{len(problems) - 20} more)" if len(problems) > 20 else ""))
+
+    out = pd.DataFrame({
+        "client_id": df["client_id"].astype(int),
+        "profit": df["profit"].astype(float),
+        "date": dates.dt.date.map(lambda d: d.isoformat()),
+    })
+    return out.merge(clients.rename(columns={"id": "client_id"}), on="client_id", how="left")
+
+
+def cached_uplines(conn, client_ids, cache=None):
+    """Upline levels that pay a bonus for a set of clients, from a bonus chain cache
+    (``referrals.bonus_uplines`` unless another ``referrals.UplineCache`` is given)."""
+    chains = (cache or referrals.bonus_uplines).get_many(conn, client_ids)
+    return pd.DataFrame([(client_id, level, pioneer_id, "Pioneer")
+                         for client_id, chain in chains.items() for pioneer_id, level, _ in chain],
+                        columns=["client_id", "level", "pioneer_id", "pioneer_type"]
+                        ).astype({"client_id": "int64", "level": "int64", "pioneer_id": "int64"})
+
+
+def compute_postings(entries, uplines):
+    """Shares and bonuses for normalized ``entries`` (client_id, profit, date, type).
+
+    Returns ``(postings, bonuses)``: one row per entry with client_share,
+    referral_total and your_share, and one row per bonus paid.  Arithmetic
+    follows the single-row path operation for operation, so the floats match
+    bit for bit.
+    """
+    postings = entries.reset_index(drop=True).copy()
+    postings["entry"] = postings.index
+    positive = postings["profit"] > 0
+    client_type = postings["type"].fillna("").str.strip()
+    rate = np.where(client_type == "Pioneer", CLIENT_SHARE_RATES["Pioneer"], CLIENT_SHARE_RATES["Regular"])
+    postings["client_share"] = np.where(positive, postings["profit"] * rate, 0.0)
+
+    # Candidate bonuses: every (entry, upline level) of a Regular client's profit
+    eligible = postings.loc[positive & (client_type == "Regular"), ["entry", "client_id", "profit", "date"]]
+    bonuses = eligible.merge(uplines, on="client_id").sort_values(["entry", "level"])
+    # A level pays only if it and every level below it is a Pioneer
+    pioneer_level = (bonuses["pioneer_type"].fillna("").str.strip() == "Pioneer").astype(int)
+    bonuses = bonuses[pioneer_level.groupby(bonuses["entry"]).cumprod().astype(bool)].copy()
+    bonuses["bonus"] = bonuses["profit"] * bonuses["level"].map(REFERRAL_RATES)
+
+    # referral_total = 0.0 + level1 + level2 + level3, summed in level order like the loop does
+    per_level = bonuses.pivot_table(index="entry", columns="level", values="bonus", aggfunc="first")
+    referral_total = pd.Series(0.0, index=postings.index)
+    for level in sorted(REFERRAL_RATES):
+        if level in per_level.columns:
+            referral_total = referral_total + per_level[level].reindex(postings.index).fillna(0.0)
+    postings["referral_total"] = referral_total
+    postings["your_share"] = (postings["profit"] - postings["client_share"]) - postings["referral_total"]
+    return postings, bonuses.reset_index(drop=True)
+
+
+def preview_postings(conn, entries, default_date=None):
+    entries = normalize_entries(conn, entries, default_date)
+    return compute_postings(entries, cached_uplines(conn, entries["client_id"]))
+
+
+def _ledger_rows(postings, bonuses):
+    """Rows to write, in the order the single-row path writes them: per entry its
+    bonuses level by level, then the client's own row (balances are float sums,
+    so the order of the additions matters)."""
+    bonus_rows = pd.DataFrame({
+        "entry": bonuses["entry"], "step": bonuses["level"],
+        "client_id": bonuses["pioneer_id"], "profit": 0.0, "date": bonuses["date"],
+        "client_share": 0.0, "your_share": 0.0, "referral_bonus": bonuses["bonus"],
+        "equity_delta": 0.0, "withdrawable_delta": bonuses["bonus"],
+    })
+    main_rows = pd.DataFrame({
+        "entry": postings["entry"], "step": MAX_BONUS_DEPTH + 1,
+        "client_id": postings["client_id"], "profit": postings["profit"], "date": postings["date"],
+        "client_share": postings["client_share"], "your_share": postings["your_share"], "referral_bonus": 0.0,
+        "equity_delta": postings["profit"], "withdrawable_delta": postings["client_share"],
+    })
+    return pd.concat([bonus_rows, main_rows], ignore_index=True).sort_values(["entry", "step"], kind="stable")
+
+
+def record(conn, rows, key=None):
+    """Write profits rows and their ledger entries in one transaction.
+
+    ``rows`` has the ``PROFIT_COLUMNS`` plus ``equity_delta`` and
+    ``withdrawable_delta``, in posting order, or is a function ``(conn) -> rows``
+    called inside the transaction.  Returns ``(entries, replayed)``; with a
+    ``key`` posted before nothing is written and ``entries`` are the ones of
+    that first posting.
+    """
+    built = []
+
+    def build(conn):
+        built.append(True)
+        frame = pd.DataFrame(rows(conn) if callable(rows) else rows).reset_index(drop=True)
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM profits").fetchone()[0]
+        conn.executemany("""INSERT INTO profits
+                            (client_id, profit, date, client_share, your_share, referral_bonus)
+                            VALUES (?, ?, ?, ?, ?, ?)""",
+                         frame[PROFIT_COLUMNS].itertuples(index=False, name=None))
+        profit_ids = [r[0] for r in conn.execute("SELECT id FROM profits WHERE id > ? ORDER BY id", (last_id,))]
+        return [ledger.Entry(client_id, equity, withdrawable, "referral_bonus" if bonus else "profit",
+                             "profits", profit_id)
+                for (client_id, equity, withdrawable, bonus), profit_id
+                in zip(frame[["client_id", "equity_delta", "withdrawable_delta", "referral_bonus"]]
+                       .itertuples(index=False, name=None), profit_ids)]
+
+    entries = ledger.post(conn, build, key=key)
+    return entries, not built
+
+
+def record_postings(conn, postings, bonuses, key=None):
+    """Write what ``compute_postings`` returned, entries and bonuses, in one transaction."""
+    return record(conn, _ledger_rows(postings, bonuses), key=key)
+
+
+def posted_postings(conn, entries):
+    """``(postings, bonuses)`` as ``compute_postings`` returned them, rebuilt from
+    the ledger ``entries`` of a posting and the profits rows they point to.
+
+    Rows were written per entry as its bonuses level by level, then the
+    client's own row, so each ``profit`` entry closes an entry and the bonus
+    entries before it are its levels in order.  Names and types are the
+    clients' current ones.
+    """
+    entries = [e for e in entries if e.ref_table == "profits"]
+    ids = [int(e.ref_id) for e in entries]
+    rows = pd.read_sql("""
+        SELECT p.id, p.client_id, p.profit, p.date, p.client_share, p.your_share, p.referral_bonus,
+               c.name, c.type
+        FROM profits p LEFT JOIN clients c ON c.id = p.client_id
+        WHERE p.id IN (SELECT value FROM json_each(?))
+    """, conn, params=(json.dumps(ids),)).set_index("id").loc[ids].reset_index(drop=True)
+    main = pd.Series([e.kind == "profit" for e in entries], dtype=bool)
+    rows["entry"] = main.cumsum() - main
+
+    postings = rows[main].set_index("entry", drop=False)
+    postings.index.name = None
+    bonuses = rows[~main].rename(columns={"client_id": "pioneer_id", "type": "pioneer_type",
+                                          "referral_bonus": "bonus"})
+    bonuses["level"] = bonuses.groupby("entry").cumcount() + 1
+    bonuses = bonuses.merge(postings[["entry", "client_id", "profit"]], on="entry", suffixes=("_row", ""))
+
+    # Summed in level order, as compute_postings does
+    referral_total = pd.Series(0.0, index=postings.index)
+    for level in sorted(REFERRAL_RATES):
+        paid = bonuses.loc[bonuses["level"] == level].set_index("entry")["bonus"]
+        referral_total = referral_total + paid.reindex(postings.index).fillna(0.0)
+    postings = postings.assign(referral_total=referral_total)
+    return (postings[["client_id", "profit", "date", "name", "type", "entry",
+                      "client_share", "referral_total", "your_share"]].reset_index(drop=True),
+            bonuses[["entry", "client_id", "profit", "date", "level", "pioneer_id", "pioneer_type", "bonus"]]
+            .reset_index(drop=True))
+
+
+def posting_key(client_id, date, amount, nonce):
+    """Idempotency key of one profit posting: the same click retried maps to the same key."""
+    return ledger.posting_key("profit", int(client_id), str(date), f"{float(amount):.2f}", nonce)
+
+
+def post_profits(conn, entries, default_date=None, key=None):
+    """Compute and record a batch of profits atomically.
+
+    The split is computed inside the posting transaction, so the client types
+    and bonus chains it reads cannot change before its rows are written.
+    Returns ``(postings, bonuses, replayed)``; ``replayed`` is True when
+    ``key`` was already posted and nothing was written this time.  The
+    postings and bonuses are then those of the first posting, rebuilt from
+    what it wrote (``posted_postings``).
+    """
+    computed = []
+
+    def rows(conn):
+        computed[:] = preview_postings(conn, entries, default_date)
+        return _ledger_rows(*computed)
+
+    posted, replayed = record(conn, rows, key=key)
+    if replayed:
+        return (*posted_postings(conn, posted), True)
+    postings, bonuses = computed
+    return postings, bonuses, False
@@ -0,0 +1,438 @@
+"""Named, parameterized read queries used by the pages.
+
+Every statement here is a constant string with ``?`` placeholders, so each
+one is parsed and planned once per connection and then served from the
+sqlite3 statement cache (``STATEMENT_CACHE_SIZE`` in core/db.py) - an
+f-string with the id baked in is a brand-new statement on every call.  All
+reads go through ``_read`` / ``_row`` / ``_scalar`` on the calling thread's
+pooled connection.
+"""
+import csv
+import datetime
+import io
+import time
+
+import pandas as pd
+
+from core import lookup, perf, retention, search
+from core.db import get_conn
+
+
+def _read(sql, params=()):
+    cur = get_conn().execute(sql, tuple(params))
+    columns = [d[0] for d in cur.description]
+    rows = cur.fetchall()
+    started = time.perf_counter()
+    # The same frame pd.read_sql builds, with the conversion timed apart from the query
+    frame = (pd.DataFrame.from_records(rows, columns=columns, coerce_float=True) if rows
+             else pd.DataFrame(columns=columns))
+    perf.add_pandas(time.perf_counter() - started)
+    return frame
+
+
+def _row(sql, params=()):
+    return get_conn().execute(sql, tuple(params)).fetchone()
+
+
+def _scalar(sql, params=(), default=None):
+    row = _row(sql, params)
+    return row[0] if row is not None and row[0] is not None else default
+
+
+# === CLIENTS ===
+def all_clients():
+    return _read("SELECT * FROM clients")
+
+
+def client_by_id(client_id):
+    return _read("SELECT * FROM clients WHERE id = ?", (int(client_id),))
+
+
+def client_name(client_id):
+    return _scalar("SELECT name FROM clients WHERE id = ?", (int(client_id),))
+
+
+def pioneer_options():
+    return _read("SELECT id, name FROM clients WHERE type = 'Pioneer' ORDER BY name")
+
+
+# All Clients grid: sort keys the user can pick -> column (ties broken by id)
+CLIENT_SORTS = {
+    "Name": "name",
+    "Type": "type",
+    "Equity": "current_equity",
+    "Withdrawable": "withdrawable_balance",
+    "Joined": "add_date",
+    "Expiry": "expiry",
+    "ID": "id",
+}
+CLIENT_GRID_COLUMNS = ("id, name, type, mobile_number, address, accounts, referral_code, referred_by, "
+                       "current_equity, withdrawable_balance, start_balance, add_date, expiry")
+
+
+def _client_filter(text, client_type):
+    # Name, mobile, address and referral code through the clients_fts index
+    where, params = [], []
+    match = search.match_expression(text)
+    if match:
+        where.append(search.match_clause("clients"))
+        params.append(match)
+    if client_type:
+        where.append("type = ?")
+        params.append(client_type)
+    return (" WHERE " + " AND ".join(where)) if where else "", params
+
+
+def client_page(text="", client_type=None, sort="Name", descending=False, limit=50, offset=0):
+    """One page of the All Clients grid, filtered and sorted in SQL."""
+    where, params = _client_filter(text, client_type)
+    direction = "DESC" if descending else "ASC"
+    return _read(f"SELECT {CLIENT_GRID_COLUMNS} FROM clients{where} "
+                 f"ORDER BY {CLIENT_SORTS[sort]} {direction}, id {direction} LIMIT ? OFFSET ?",
+                 params + [int(limit), int(offset)])
+
+
+def client_count(text="", client_type=None):
+    where, params = _client_filter(text, client_type)
+    return _scalar(f"SELECT COUNT(*) FROM clients{where}", params, 0)
+
+
+def client_export(text="", client_type=None):
+    where, params = _client_filter(text, client_type)
+    return _read(f"SELECT * FROM clients{where} ORDER BY id", params)
+
+
+def referral_codes_with_prefix(prefix):
+    # Range scan on the referral_code unique index (LIKE would scan the table)
+    return [r[0] for r in get_conn().execute(
+        "SELECT referral_code FROM clients WHERE referral_code >= ? AND referral_code < ?",
+        (prefix, prefix + "\U0010ffff"))]
+
+
+# === AUTH ===
+def admin_password(username):
+    return _scalar("SELECT password FROM admins WHERE username = ?", (username,))
+
+
+def client_login(username):
+    """(client_id, password hash) or None."""
+    return _row("SELECT client_id, password FROM users WHERE username = ?", (username,))
+
+
+def client_password(client_id):
+    return _scalar("SELECT password FROM users WHERE client_id = ?", (int(client_id),))
+
+
+def admins():
+    return _read("SELECT id, username, name FROM admins ORDER BY username")
+
+
+# === PROFITS ===
+def profits_summary():
+    return _read("SELECT profit, client_share, your_share, referral_bonus, date, client_id FROM profits")
+
+
+def profit_history(client_id):
+    return _read("""
+        SELECT date, profit, client_share, your_share, referral_bonus
+        FROM profits
+        WHERE client_id = ?
+        ORDER BY date DESC
+    """, (int(client_id),))
+
+
+def earnings_history(client_id):
+    return _read("""
+        SELECT date, profit, client_share, referral_bonus
+        FROM profits
+        WHERE client_id = ?
+        ORDER BY date DESC
+    """, (int(client_id),))
+
+
+def earnings_totals(client_id):
+    """(profit records, client_share total, referral_bonus total) for one client."""
+    return _row("""
+        SELECT COUNT(*), COALESCE(SUM(client_share), 0), COALESCE(SUM(referral_bonus), 0)
+        FROM profits WHERE client_id = ?
+    """, (int(client_id),))
+
+
+def referral_bonus_history(client_id):
+    """Referral bonus rows of the client's subtree, newest first, by ``client_id``
+    (the page puts names on them from the shared clients frame)."""
+    return _read("""
+        SELECT p.date, p.referral_bonus, p.client_id
+        FROM referral_closure rc
+        JOIN profits p ON p.client_id = rc.descendant
+        WHERE rc.ancestor = ? AND p.referral_bonus > 0
+        ORDER BY p.date DESC
+    """, (int(client_id),))
+
+
+def profits_with_clients():
+    profits = _read("SELECT * FROM profits ORDER BY date DESC")
+    return lookup.clients.attach(profits, "client_id", inner=True).reset_index(drop=True)
+
+
+# === LICENSES & FILES ===
+def recent_licenses(client_id, limit=7):
+    return _read("""
+        SELECT date_generated, expiry, allow_live, version
+        FROM client_licenses
+        WHERE client_id = ?
+        ORDER BY date_generated DESC
+        LIMIT ?
+    """, (int(client_id), limit))
+
+
+def client_files(client_id, limit=-1):
+    # LIMIT -1 means no limit, so both callers share one statement
+    return _read("""
+        SELECT original_name, upload_date, sent_by, notes, file_name
+        FROM client_files
+        WHERE client_id = ?
+        ORDER BY upload_date DESC
+        LIMIT ?
+    """, (int(client_id), limit))
+
+
+def ea_versions():
+    return _read("""
+        SELECT version, file_name, upload_date, notes
+        FROM ea_versions
+        ORDER BY upload_date DESC
+    """)
+
+
+# === ANNOUNCEMENTS ===
+def search_announcements(text, limit=20):
+    return _read("""
+        SELECT a.id, a.title, a.message, a.date, a.posted_by, a.likes
+        FROM announcements_fts f
+        JOIN announcements a ON a.id = f.rowid
+        WHERE announcements_fts MATCH ?
+        ORDER BY f.rank
+        LIMIT ?
+    """, (search.match_expression(text), limit))
+
+
+def recent_announcements(limit=20):
+    return _read("""
+        SELECT id, title, message, date, posted_by, likes
+        FROM announcements
+        ORDER BY date DESC
+        LIMIT ?
+    """, (limit,))
+
+
+def announcement_attachments(announcement_id):
+    return _read("SELECT file_name, original_name FROM announcement_files WHERE announcement_id = ?",
+                 (int(announcement_id),))
+
+
+def announcement_comments(announcement_id):
+    return _read("""
+        SELECT commenter_name, comment, timestamp, id
+        FROM announcement_comments
+        WHERE announcement_id = ?
+        ORDER BY timestamp ASC
+    """, (int(announcement_id),))
+
+
+# === MESSAGES ===
+def conversations():
+    """Every client with message and unread counts, most recent conversation first."""
+    # One pass over messages grouped by client instead of an OR-join per client
+    stats = _read("""
+        SELECT COALESCE(from_client_id, to_client_id) AS id,
+               COUNT(*) AS total_msgs,
+               COUNT(CASE WHEN read = 0 AND from_client_id IS NOT NULL THEN 1 END) AS unread,
+               MAX(timestamp) AS last_message
+        FROM messages
+        GROUP BY 1
+    """)
+    convos = lookup.clients.attach(_read("SELECT id FROM clients"), "id", ["name"]).merge(stats, on="id", how="left")
+    convos[["total_msgs", "unread"]] = convos[["total_msgs", "unread"]].fillna(0).astype(int)
+    convos = convos.sort_values(["last_message", "name"], ascending=[False, True], na_position="last")
+    return convos[["id", "name", "total_msgs", "unread"]].reset_index(drop=True)
+
+
+def search_messages(text, limit=50):
+    """Messages matching ``text`` with the client they belong to, best match first."""
+    return _read("""
+        SELECT m.id, c.id AS client_id, c.name, m.from_admin, m.message, m.timestamp
+        FROM messages_fts f
+        JOIN messages m ON m.id = f.rowid
+        JOIN clients c ON c.id = COALESCE(m.from_client_id, m.to_client_id)
+        WHERE messages_fts MATCH ?
+        ORDER BY f.rank
+        LIMIT ?
+    """, (search.match_expression(text), limit))
+
+
+def message_thread(client_id):
+    """A client's conversation as staff see it."""
+    return _read("""
+        SELECT from_client_id, from_admin, message, timestamp
+        FROM messages
+        WHERE from_client_id = ? OR to_client_id = ?
+        ORDER BY timestamp ASC
+    """, (int(client_id), int(client_id)))
+
+
+def client_message_thread(client_id):
+    """The same conversation as the client sees it."""
+    return _read("""
+        SELECT message, timestamp, from_admin IS NOT NULL as from_admin
+        FROM messages
+        WHERE from_client_id = ? OR to_client_id = ?
+        ORDER BY timestamp ASC
+    """, (int(client_id), int(client_id)))
+
+
+# === WITHDRAWALS ===
+def recent_withdrawals(limit=8):
+    return _read("SELECT amount, status, date_requested FROM withdrawals ORDER BY date_requested DESC LIMIT ?",
+                 (limit,))
+
+
+def pending_withdrawals():
+    pending = _read("""
+        SELECT id, client_id, amount, method, details, date_requested, status
+        FROM withdrawals
+        WHERE status = 'Pending'
+        ORDER BY date_requested DESC
+    """)
+    return lookup.client_contacts.attach(pending, "client_id", inner=True).reset_index(drop=True)
+
+
+def approved_withdrawals():
+    approved = _read("""
+        SELECT id, client_id, amount, method, details, date_requested, date_processed
+        FROM withdrawals
+        WHERE status = 'Approved'
+        ORDER BY date_processed DESC
+    """)
+    return lookup.client_contacts.attach(approved, "client_id", ["name", "withdrawable_balance"],
+                                         inner=True).reset_index(drop=True)
+
+
+def client_withdrawals(client_id):
+    return _read("SELECT * FROM withdrawals WHERE client_id = ? ORDER BY date_requested DESC", (int(client_id),))
+
+
+def all_withdrawals():
+    return _read("SELECT * FROM withdrawals")
+
+
+def withdrawals_with_clients():
+    withdrawals = _read("SELECT * FROM withdrawals ORDER BY date_requested DESC")
+    return lookup.clients.attach(withdrawals, "client_id", inner=True).reset_index(drop=True)
+
+
+# === LOGS ===
+def recent_logs(limit=20):
+    return _read("SELECT action, details, timestamp FROM logs ORDER BY timestamp DESC LIMIT ?", (limit,))
+
+
+# Audit Logs: filters become an indexed WHERE, pages are fetched by keyset
+# (timestamp, id) so page 1000 costs the same as page 1.  Archived months
+# (core/retention.py) are added as UNION ALL branches only when the date range
+# reaches them.
+LOG_COLUMNS = "id, timestamp, action, details, user_type, user_id"
+LOG_PAGE_SIZE = 100
+
+
+def _log_filter(table, actions=(), user_types=(), start=None, end=None, text="", cursor=None):
+    where, params = [], []
+    if actions:
+        where.append(f"action IN ({','.join('?' * len(actions))})")
+        params += list(actions)
+    if user_types:
+        where.append(f"user_type IN ({','.join('?' * len(user_types))})")
+        params += list(user_types)
+    # Timestamps are ISO strings, so a date range is a plain range on the index
+    if start is not None:
+        where.append("timestamp >= ?")
+        params.append(start.isoformat())
+    if end is not None:
+        where.append("timestamp < ?")
+        params.append((end + datetime.timedelta(days=1)).isoformat())
+    # Archives have their own index: the same word-prefix match on both sides of the cutoff
+    match = search.match_expression(text, ("details",))
+    if match:
+        where.append(search.match_clause(table))
+        params.append(match)
+    if cursor is not None:
+        where.append("(timestamp, id) < (?, ?)")
+        params += list(cursor)
+    return (" WHERE " + " AND ".join(where)) if where else "", params
+
+
+def _log_select(columns, actions=(), user_types=(), start=None, end=None, text="", cursor=None):
+    """``SELECT columns`` over logs and every archived month in [start, end], one branch each."""
+    branches, params = [], []
+    for table in ["logs"] + [a[1] for a in retention.archives(get_conn(), start, end)]:
+        where, branch_params = _log_filter(table, actions, user_types, start, end, text, cursor)
+        branches.append(f"SELECT {columns} FROM {table}{where}")
+        params += branch_params
+    return " UNION ALL ".join(branches), params
+
+
+def log_page(actions=(), user_types=(), start=None, end=None, text="", cursor=None, limit=LOG_PAGE_SIZE):
+    """Newest-first page of logs after ``cursor`` - the (timestamp, id) of the
+    previous page's last row, or None for the first page."""
+    sql, params = _log_select(LOG_COLUMNS, actions, user_types, start, end, text, cursor)
+    return _read(sql + " ORDER BY timestamp DESC, id DESC LIMIT ?", params + [int(limit)])
+
+
+def log_count(actions=(), user_types=(), start=None, end=None, text=""):
+    sql, params = _log_select("COUNT(*) AS n", actions, user_types, start, end, text)
+    return _scalar(f"SELECT SUM(n) FROM ({sql})", params, 0)
+
+
+def _distinct_logged(column):
+    # Skip-scan down the index: one seek per distinct value, not a pass over every row
+    return [r[0] for r in get_conn().execute(f"""
+        WITH RECURSIVE v(x) AS (
+            SELECT MIN({column}) FROM logs
+            UNION ALL
+            SELECT (SELECT MIN({column}) FROM logs WHERE {column} > x) FROM v WHERE x IS NOT NULL
+        )
+        SELECT x FROM v WHERE x IS NOT NULL
+    """)]
+
+
+def log_actions():
+    return sorted(set(_distinct_logged("action")) | retention.archived_values(get_conn(), "action"))
+
+
+def log_user_types():
+    return sorted(set(_distinct_logged("user_type")) | retention.archived_values(get_conn(), "user_type"))
+
+
+def log_date_range():
+    """(oldest, newest) timestamp in the live table - two index seeks (MIN and MAX together would scan)."""
+    return _row("SELECT (SELECT MIN(timestamp) FROM logs), (SELECT MAX(timestamp) FROM logs)")
+
+
+def log_archive_range():
+    """(oldest, newest) archived timestamp, or (None, None)."""
+    return retention.archived_range(get_conn())
+
+
+def logs_csv(actions=(), user_types=(), start=None, end=None, text="", batch=5000):
+    """Matching logs as CSV bytes, written from the cursor batch by batch
+    instead of through a DataFrame of the whole table."""
+    sql, params = _log_select(LOG_COLUMNS, actions, user_types, start, end, text)
+    cur = get_conn().execute(sql + " ORDER BY timestamp DESC, id DESC", params)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow([d[0] for d in cur.description])
+    while True:
+        rows = cur.fetchmany(batch)
+        if not rows:
+            break
+        writer.writerows(rows)
+    return out.getvalue().encode()
@@ -0,0 +1,322 @@
+"""Closure table for the referral graph.
+
+``referral_closure`` holds one row per (ancestor, descendant) pair of the
+``clients.referred_by`` forest, including a depth-0 row for every client
+itself.  Triggers on clients keep it current inside the same transaction as
+the insert / edit, so uplines, downlines and downline counts are each a single
+indexed lookup instead of a walk up or down the chain one query per level.
+
+``referred_by`` of NULL, 0 or an id that does not exist means "no upline".
+
+``bonus_uplines`` caches, per client, the uplines a Regular client's profit
+pays a bonus to: ``[(pioneer_id, level, rate), ...]``, nearest first.  It is
+dropped whole when ``referred_by`` or ``type`` changes anywhere (a
+``table_versions`` counter of its own, so balance updates do not touch it).
+After the Edit Client form changes them, ``changed()`` drops only the edited
+client's subtree.
+
+    python -m core.referrals verify [db]    # compare with a recursive CTE
+    python -m core.referrals rebuild [db]   # recompute the closure table
+"""
+import json
+import sqlite3
+import threading
+
+from core.cache import table_versions
+from core.db import DB_PATH, PRAGMAS
+
+# Referral bonus levels paid by the profit recorder (1 = direct upline)
+MAX_BONUS_DEPTH = 3
+REFERRAL_RATES = {1: 0.06, 2: 0.03, 3: 0.01}
+
+# table_versions row bumped when the shape or the Pioneers of the graph change
+GRAPH_VERSION = "referral_graph"
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS referral_closure (
+        ancestor INTEGER NOT NULL,
+        descendant INTEGER NOT NULL,
+        depth INTEGER NOT NULL,
+        PRIMARY KEY (ancestor, descendant)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_referral_closure_descendant ON referral_closure(descendant, depth)",
+    """CREATE TRIGGER IF NOT EXISTS trg_clients_referral_insert AFTER INSERT ON clients
+        BEGIN
+            INSERT INTO referral_closure (ancestor, descendant, depth) VALUES (NEW.id, NEW.id, 0);
+            INSERT INTO referral_closure (ancestor, descendant, depth)
+                SELECT ancestor, NEW.id, depth + 1 FROM referral_closure WHERE descendant = NEW.referred_by;
+        END""",
+    # Refuse to hang a client below itself or one of its own downline
+    """CREATE TRIGGER IF NOT EXISTS trg_clients_referral_cycle
+        BEFORE UPDATE OF referred_by ON clients
+        WHEN EXISTS (SELECT 1 FROM referral_closure WHERE ancestor = NEW.id AND descendant = NEW.referred_by)
+        BEGIN
+            SELECT RAISE(ABORT, 'referral cycle: the new upline is in this client''s downline');
+        END""",
+    # Subtree move: detach the subtree from its old uplines, attach it to the new ones
+    """CREATE TRIGGER IF NOT EXISTS trg_clients_referral_move
+        AFTER UPDATE OF referred_by ON clients
+        WHEN OLD.referred_by IS NOT NEW.referred_by
+        BEGIN
+            DELETE FROM referral_closure
+            WHERE descendant IN (SELECT descendant FROM referral_closure WHERE ancestor = NEW.id)
+              AND ancestor NOT IN (SELECT descendant FROM referral_closure WHERE ancestor = NEW.id);
+            INSERT INTO referral_closure (ancestor, descendant, depth)
+                SELECT up.ancestor, sub.descendant, up.depth + sub.depth + 1
+                FROM referral_closure up, referral_closure sub
+                WHERE up.descendant = NEW.referred_by AND sub.ancestor = NEW.id;
+        END""",
+    # The deleted client's downline becomes its own tree (its referred_by now dangles)
+    """CREATE TRIGGER IF NOT EXISTS trg_clients_referral_delete AFTER DELETE ON clients
+        BEGIN
+            DELETE FROM referral_closure
+            WHERE descendant IN (SELECT descendant FROM referral_closure WHERE ancestor = OLD.id)
+              AND ancestor IN (SELECT ancestor FROM referral_closure WHERE descendant = OLD.id);
+        END""",
+]
+
+GRAPH_VERSION_SCHEMA = [
+    f"INSERT OR IGNORE INTO table_versions (name, version) VALUES ('{GRAPH_VERSION}', 0)",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_clients_referral_graph_update
+        AFTER UPDATE OF referred_by, type ON clients
+        WHEN OLD.referred_by IS NOT NEW.referred_by OR OLD.type IS NOT NEW.type
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = '{GRAPH_VERSION}';
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_clients_referral_graph_delete AFTER DELETE ON clients
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = '{GRAPH_VERSION}';
+        END""",
+]
+
+
+# === RECOMPUTE FROM clients.referred_by ===
+# Depth is capped at the client count so a cycle already in old data cannot loop forever
+_WALK = """
+    WITH RECURSIVE walk(ancestor, descendant, depth) AS (
+        SELECT id, id, 0 FROM clients
+        UNION ALL
+        SELECT w.ancestor, c.id, w.depth + 1
+        FROM walk w JOIN clients c ON c.referred_by = w.descendant
+        WHERE c.id != w.ancestor AND w.depth < (SELECT COUNT(*) FROM clients)
+    )
+"""
+
+
+def expected_pairs(conn):
+    return {(a, d): depth for a, d, depth in conn.execute(
+        _WALK + "SELECT ancestor, descendant, MIN(depth) FROM walk GROUP BY ancestor, descendant")}
+
+
+def rebuild_rows(conn):
+    """Recompute the closure table (caller owns the transaction)."""
+    conn.execute("DELETE FROM referral_closure")
+    conn.execute(_WALK + """
+        INSERT INTO referral_closure (ancestor, descendant, depth)
+        SELECT ancestor, descendant, MIN(depth) FROM walk GROUP BY ancestor, descendant
+    """)
+
+
+def rebuild(conn):
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rebuild_rows(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def verify(conn):
+    """List of (ancestor, descendant, stored depth, expected depth) that differ."""
+    stored = {(a, d): depth for a, d, depth in conn.execute(
+        "SELECT ancestor, descendant, depth FROM referral_closure")}
+    expected = expected_pairs(conn)
+    return [(a, d, stored.get((a, d)), expected.get((a, d)))
+            for a, d in sorted(set(stored) | set(expected))
+            if stored.get((a, d)) != expected.get((a, d))]
+
+
+# === LOOKUPS ===
+def get_upline(conn, client_id, max_depth=MAX_BONUS_DEPTH):
+    """Uplines nearest first: [{"id", "name", "type", "depth"}, ...]."""
+    rows = conn.execute("""
+        SELECT c.id, c.name, c.type, rc.depth
+        FROM referral_closure rc JOIN clients c ON c.id = rc.ancestor
+        WHERE rc.descendant = ? AND rc.depth BETWEEN 1 AND ?
+        ORDER BY rc.depth
+    """, (int(client_id), max_depth)).fetchall()
+    return [{"id": r[0], "name": r[1], "type": r[2], "depth": r[3]} for r in rows]
+
+
+def get_subtree(conn, client_id, clients, max_depth=None):
+    """Whole downline (without the client itself), shallowest first:
+    [{"id", "name", "type", "referred_by", "depth"}, ...].
+
+    Only the closure table is read.  Name, type and referred_by come from
+    ``clients``, a DataFrame with those columns and ``id`` (the pages pass the
+    shared ``load_clients()`` frame, so a client run does not read clients again).
+    """
+    depth_limit, params = "", [int(client_id)]
+    if max_depth is not None:
+        depth_limit = "AND depth <= ?"
+        params.append(max_depth)
+    rows = conn.execute(f"""
+        SELECT descendant, depth FROM referral_closure
+        WHERE ancestor = ? AND depth >= 1 {depth_limit}
+        ORDER BY depth, descendant
+    """, params).fetchall()
+    info = clients.set_index("id")[["name", "type", "referred_by"]].reindex([r[0] for r in rows])
+    info["depth"] = [r[1] for r in rows]
+    # A client added after the frame was loaded is left out until its next load
+    info = info[info["name"].notna()]
+    return [{"id": int(client_id), "name": name, "type": client_type, "referred_by": int(referred_by), "depth": depth}
+            for client_id, name, client_type, referred_by, depth in info.itertuples(name=None)]
+
+
+def subtree_count(conn, client_id, max_depth=None):
+    """Downline size; ``max_depth=1`` counts direct referrals only."""
+    if max_depth is None:
+        return conn.execute("SELECT COUNT(*) FROM referral_closure WHERE ancestor = ? AND depth >= 1",
+                            (int(client_id),)).fetchone()[0]
+    return conn.execute("SELECT COUNT(*) FROM referral_closure WHERE ancestor = ? AND depth BETWEEN 1 AND ?",
+                        (int(client_id), max_depth)).fetchone()[0]
+
+
+def subtree_ids(conn, client_id, include_self=False):
+    return [r[0] for r in conn.execute(
+        "SELECT descendant FROM referral_closure WHERE ancestor = ? AND depth >= ?",
+        (int(client_id), 0 if include_self else 1))]
+
+
+def would_create_cycle(conn, client_id, new_referred_by):
+    """True if ``new_referred_by`` is the client itself or somewhere in its downline."""
+    if not new_referred_by:
+        return False
+    return conn.execute("SELECT 1 FROM referral_closure WHERE ancestor = ? AND descendant = ?",
+                        (int(client_id), int(new_referred_by))).fetchone() is not None
+
+
+def build_tree(subtree, root_id):
+    """Nest ``get_subtree`` rows into [{"name", "type", "children": [...]}, ...]."""
+    children = {}
+    for node in subtree:
+        children.setdefault(node["referred_by"], []).append(node)
+
+    def nest(parent_id):
+        return [{"name": n["name"], "type": n["type"], "children": nest(n["id"])}
+                for n in children.get(parent_id, [])]
+    return nest(root_id)
+
+
+# === BONUS UPLINE CACHE ===
+def bonus_chains(conn, client_ids):
+    """{client_id: [(pioneer_id, level, rate), ...]} for ``client_ids``, one query.
+
+    A level pays only while the chain is unbroken Pioneers: the first upline
+    that is not a Pioneer (or the top of the chain) ends it.
+    """
+    chains = {int(i): [] for i in client_ids}
+    broken = set()
+    for client_id, level, pioneer_id, pioneer_type in conn.execute("""
+        SELECT rc.descendant, rc.depth, rc.ancestor, c.type
+        FROM referral_closure rc JOIN clients c ON c.id = rc.ancestor
+        WHERE rc.descendant IN (SELECT value FROM json_each(?)) AND rc.depth BETWEEN 1 AND ?
+        ORDER BY rc.descendant, rc.depth
+    """, (json.dumps(sorted(chains)), MAX_BONUS_DEPTH)):
+        if client_id in broken:
+            continue
+        if str(pioneer_type or "").strip() != "Pioneer":
+            broken.add(client_id)
+            continue
+        chains[client_id].append((pioneer_id, level, REFERRAL_RATES[level]))
+    return chains
+
+
+class UplineCache:
+    """client_id -> bonus chain, filled on demand, valid until the graph changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chains = {}
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.resets = 0
+        self.partial = 0
+
+    def _sync(self, version):
+        # caller holds the lock
+        if version != self._version:
+            if self._chains:
+                self.resets += 1
+            self._chains = {}
+            self._version = version
+
+    def get_many(self, conn, client_ids):
+        """{client_id: [(pioneer_id, level, rate), ...]}; ids seen before are a dict lookup."""
+        wanted = {int(i) for i in client_ids}
+        version = table_versions(conn, (GRAPH_VERSION,))
+        with self._lock:
+            self._sync(version)
+            found = {i: self._chains[i] for i in wanted if i in self._chains}
+            self.hits += len(found)
+            self.misses += len(wanted) - len(found)
+        missing = wanted - found.keys()
+        if missing:
+            fetched = bonus_chains(conn, missing)
+            with self._lock:
+                if self._version == version:
+                    self._chains.update(fetched)
+            found.update(fetched)
+        return found
+
+    def get(self, conn, client_id):
+        return list(self.get_many(conn, [client_id])[int(client_id)])
+
+    def changed(self, conn, client_id):
+        """Call after committing a change of ``client_id``'s referred_by or type.
+
+        Only the clients whose chain can pass through it (itself and its
+        downline up to MAX_BONUS_DEPTH) are dropped.  If anything else moved
+        the graph meanwhile, the whole cache goes.
+        """
+        version = table_versions(conn, (GRAPH_VERSION,))
+        affected = [r[0] for r in conn.execute(
+            "SELECT descendant FROM referral_closure WHERE ancestor = ? AND depth <= ?",
+            (int(client_id), MAX_BONUS_DEPTH))]
+        with self._lock:
+            if self._version is None or version[0] - self._version[0] != 1:
+                self._sync(version)
+                return
+            for i in affected + [int(client_id)]:
+                self._chains.pop(i, None)
+            self._version = version
+            self.partial += 1
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._chains), "hits": self.hits, "misses": self.misses,
+                    "resets": self.resets, "partial": self.partial}
+
+
+bonus_uplines = UplineCache()
+
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    db = sqlite3.connect(sys.argv[2] if len(sys.argv) > 2 else DB_PATH)
+    for pragma in PRAGMAS:
+        db.execute(pragma)
+    if command == "rebuild":
+        rebuild(db)
+        print("Referral closure rebuilt from clients.referred_by.")
+    drift = verify(db)
+    if not drift:
+        print("Referral closure matches clients.referred_by.")
+    for ancestor, descendant, stored, expected in drift[:50]:
+        print(f"DRIFT {ancestor} -> {descendant}: stored depth={stored} expected depth={expected}")
+    sys.exit(1 if drift else 0)
@@ -0,0 +1,267 @@
+"""Audit log retention: old ``logs`` rows move into per-month archive tables.
+
+Rows older than ``RETENTION_DAYS`` are moved into ``logs_archive_YYYY_MM``.
+These tables have the same columns and keep the original ids.  Each batch
+is one transaction: INSERT OR IGNORE into the archive, then DELETE from
+``logs``.  A run that stops halfway leaves every row in exactly one place,
+and the next run carries on from there, so running the job again is always
+safe.
+
+``log_archives`` holds one row per archived month: its row count, first and
+last timestamp, and the distinct actions and user types in it.  The Audit Logs
+queries use it to read an archive only when the requested date range reaches
+into that month.  The filter options and date bounds come from it
+without opening the archive tables at all.
+
+Each archive has a full-text index of its own (core/search.py), filled by
+the same triggers as the live one, so a text search matches the same words
+in archived months as in ``logs``.  The live index is optimized after every
+run that moved rows.
+
+    python -m core.retention status [db]
+    python -m core.retention archive [days] [db]     # default RETENTION_DAYS
+    python -m core.retention verify [db]
+    python -m core.retention export DIR [db]         # one JSONL.gz per archived month
+"""
+import datetime
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from core import search
+from core.db import DB_PATH, PRAGMAS, connect
+
+RETENTION_DAYS = int(os.getenv("KMFX_LOG_RETENTION_DAYS", "180"))   # 0 keeps everything in logs
+ARCHIVE_EVERY_HOURS = 24
+BATCH_SIZE = 5000
+
+LOG_COLUMNS = "id, timestamp, action, details, user_type, user_id"
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS log_archives (
+        month TEXT PRIMARY KEY,
+        table_name TEXT NOT NULL,
+        rows INTEGER NOT NULL DEFAULT 0,
+        first_ts TEXT,
+        last_ts TEXT,
+        actions TEXT,
+        user_types TEXT,
+        archived_at TEXT
+    )""",
+]
+
+
+def archive_table(month):
+    """'2024-05' -> 'logs_archive_2024_05'."""
+    return "logs_archive_" + month.replace("-", "_")
+
+
+def _create_archive(conn, table):
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY,
+        timestamp TEXT,
+        action TEXT,
+        details TEXT,
+        user_type TEXT,
+        user_id INTEGER
+    )""")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table}(timestamp)")
+    for sql in search.index_schema(table, search.INDEXES["logs"]):
+        conn.execute(sql)
+
+
+def index_archives(conn):
+    """Give the archives made before they had a full-text index one (caller owns the transaction)."""
+    for (table,) in conn.execute("SELECT table_name FROM log_archives").fetchall():
+        _create_archive(conn, table)
+        conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+
+# === ARCHIVE JOB ===
+def cutoff_for(days, now=None):
+    """Rows with a timestamp before this (ISO date) are due for the archive."""
+    return ((now or datetime.datetime.now()) - datetime.timedelta(days=days)).date().isoformat()
+
+
+def archive_batch(conn, cutoff, batch=BATCH_SIZE):
+    """Move up to ``batch`` of the oldest rows before ``cutoff``.  Returns the number moved."""
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Only rows with an ISO timestamp: the month becomes part of a table name
+        rows = conn.execute(f"""
+            SELECT {LOG_COLUMNS} FROM logs
+            WHERE timestamp < ? AND timestamp GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*'
+            ORDER BY timestamp LIMIT ?
+        """, (cutoff, batch)).fetchall()
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(row[1][:7], []).append(row)
+        for month, month_rows in by_month.items():
+            table = archive_table(month)
+            _create_archive(conn, table)
+            added = conn.executemany(f"INSERT OR IGNORE INTO {table} ({LOG_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                                     month_rows).rowcount
+            _record(conn, month, table, month_rows, added)
+        conn.execute("DELETE FROM logs WHERE id IN (SELECT value FROM json_each(?))",
+                     (json.dumps([row[0] for row in rows]),))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(rows)
+
+
+def _record(conn, month, table, rows, added):
+    known = conn.execute("SELECT actions, user_types FROM log_archives WHERE month = ?", (month,)).fetchone()
+    actions = set(json.loads(known[0])) if known else set()
+    user_types = set(json.loads(known[1])) if known else set()
+    actions.update(row[2] for row in rows if row[2] is not None)
+    user_types.update(row[4] for row in rows if row[4] is not None)
+    conn.execute("""
+        INSERT INTO log_archives (month, table_name, rows, first_ts, last_ts, actions, user_types, archived_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(month) DO UPDATE SET
+            rows = rows + excluded.rows,
+            first_ts = MIN(first_ts, excluded.first_ts),
+            last_ts = MAX(last_ts, excluded.last_ts),
+            actions = excluded.actions,
+            user_types = excluded.user_types,
+            archived_at = excluded.archived_at
+    """, (month, table, added, min(row[1] for row in rows), max(row[1] for row in rows),
+          json.dumps(sorted(actions)), json.dumps(sorted(user_types)), datetime.datetime.now().isoformat()))
+
+
+def archive(conn, days=RETENTION_DAYS, batch=BATCH_SIZE, now=None):
+    """Move every row older than ``days`` into the monthly archives.  Returns rows moved."""
+    if days <= 0:
+        return 0
+    cutoff = cutoff_for(days, now)
+    moved = 0
+    while True:
+        n = archive_batch(conn, cutoff, batch)
+        moved += n
+        if n < batch:
+            break
+    if moved:
+        search.optimize(conn, "logs")
+    return moved
+
+
+def _scheduled(days, every_hours):
+    while True:
+        # A connection of its own per run: the thread outlives any pooled one it would borrow
+        conn = connect()
+        try:
+            moved = archive(conn, days)
+            if moved:
+                print(f"Log retention: archived {moved} rows older than {days} days")
+        except Exception as e:
+            print(f"Log retention error: {e}", file=sys.stderr)
+        finally:
+            conn.close()
+        time.sleep(every_hours * 3600)
+
+
+def start_scheduler(days=RETENTION_DAYS, every_hours=ARCHIVE_EVERY_HOURS):
+    """Run the archive job now and then every ``every_hours`` on a daemon thread."""
+    if days <= 0:
+        return None
+    thread = threading.Thread(target=_scheduled, args=(days, every_hours), name="kmfx-log-retention", daemon=True)
+    thread.start()
+    return thread
+
+
+# === READ SIDE ===
+def archives(conn, start=None, end=None):
+    """Registry rows (month, table_name, rows, first_ts, last_ts, actions, user_types) of the
+    archived months overlapping [start, end] (dates, None = open), newest first."""
+    where, params = [], []
+    if start is not None:
+        where.append("last_ts >= ?")
+        params.append(start.isoformat())
+    if end is not None:
+        where.append("first_ts < ?")
+        params.append((end + datetime.timedelta(days=1)).isoformat())
+    return conn.execute(f"""
+        SELECT month, table_name, rows, first_ts, last_ts, actions, user_types FROM log_archives
+        {('WHERE ' + ' AND '.join(where)) if where else ''}
+        ORDER BY month DESC
+    """, params).fetchall()
+
+
+def archived_range(conn):
+    """(first, last) archived timestamp, or (None, None)."""
+    return conn.execute("SELECT MIN(first_ts), MAX(last_ts) FROM log_archives").fetchone()
+
+
+def archived_values(conn, column):
+    """Distinct ``action`` or ``user_type`` values across every archive."""
+    field = {"action": "actions", "user_type": "user_types"}[column]
+    values = set()
+    for (encoded,) in conn.execute(f"SELECT {field} FROM log_archives"):
+        values.update(json.loads(encoded or "[]"))
+    return values
+
+
+def verify(conn):
+    """List of problems: registry counts that disagree with their table, ids in two places."""
+    problems = []
+    for month, table, rows, *_ in archives(conn):
+        actual = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if actual != rows:
+            problems.append(f"{table}: registry says {rows} rows, table has {actual}")
+        both = conn.execute(f"SELECT COUNT(*) FROM {table} a JOIN logs l ON l.id = a.id").fetchone()[0]
+        if both:
+            problems.append(f"{table}: {both} rows are also still in logs")
+    return problems
+
+
+def export(conn, directory):
+    """Write each archived month to DIR/logs_YYYY-MM.jsonl.gz (rewritten on every export)."""
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for month, table, *_ in archives(conn):
+        path = os.path.join(directory, f"logs_{month}.jsonl.gz")
+        cur = conn.execute(f"SELECT {LOG_COLUMNS} FROM {table} ORDER BY timestamp, id")
+        names = [d[0] for d in cur.description]
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8") as out:
+            for row in cur:
+                out.write(json.dumps(dict(zip(names, row))) + "\n")
+        os.replace(path + ".tmp", path)
+        written.append(path)
+    return written
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:] or ["status"]
+    command = args.pop(0)
+    days = RETENTION_DAYS
+    target = None
+    if command == "archive" and args and args[0].isdigit():
+        days = int(args.pop(0))
+    if command == "export":
+        target = args.pop(0)
+    db = sqlite3.connect(args[0] if args else DB_PATH)
+    for pragma in PRAGMAS:
+        db.execute(pragma)
+    if command == "archive":
+        started = time.perf_counter()
+        moved = archive(db, days)
+        print(f"Archived {moved} rows older than {days} days ({cutoff_for(days)}) in {time.perf_counter() - started:.1f}s.")
+    elif command == "export":
+        for path in export(db, target):
+            print(path)
+    problems = verify(db)
+    live = db.execute("SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM logs").fetchone()
+    print(f"logs: {live[0]} rows ({live[1]} .. {live[2]})")
+    for month, table, rows, first_ts, last_ts, *_ in archives(db):
+        print(f"{table}: {rows} rows ({first_ts} .. {last_ts})")
+    for problem in problems:
+        print(f"DRIFT {problem}")
+    sys.exit(1 if problems else 0)
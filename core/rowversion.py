@@ -0,0 +1,37 @@
+"""Per-row change counters for ``clients``.
+
+``table_versions`` moves on every write to the table, so it cannot tell a
+session whether *its* client changed.  ``client_versions`` keeps one counter
+per client row.  Triggers bump it on insert, update and delete, in the same
+transaction as the write.  That includes ledger postings, which update the
+balances.
+
+A session holding a copy of its client row revalidates the copy with one
+primary-key lookup here.  It reads ``clients`` again only when the counter
+moved (``refresh_current_client`` in views/common.py).
+"""
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS client_versions (
+        client_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )""",
+] + [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_clients_row_version_{event.lower()} AFTER {event} ON clients
+        BEGIN
+            INSERT INTO client_versions (client_id, version) VALUES ({row}.id, 1)
+                ON CONFLICT(client_id) DO UPDATE SET version = version + 1;
+        END"""
+    for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD"))
+]
+
+
+def rebuild_rows(conn):
+    """Start a counter for every existing client (caller owns the transaction)."""
+    conn.execute("INSERT OR IGNORE INTO client_versions (client_id, version) SELECT id, 1 FROM clients")
+
+
+def client_version(conn, client_id):
+    """Current counter of a client row (0 if it never existed)."""
+    row = conn.execute("SELECT version FROM client_versions WHERE client_id = ?", (int(client_id),)).fetchone()
+    return row[0] if row else 0
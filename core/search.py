@@ -0,0 +1,156 @@
+"""Full-text search over clients, messages, logs and announcements.
+
+Each searchable table has an FTS5 index stored as an external-content table
+(the text lives only in the base table, the index holds the tokens).
+Triggers keep every index current inside the same transaction as the write.
+Updates only touch the index when an indexed column changes, so balance
+updates and read flags cost nothing extra.
+
+Matching is by token prefix and is case- and accent-insensitive.
+"kmfx 0917" finds rows with a token starting "kmfx" and a token starting
+"0917".  It does not find text in the middle of a word the way the old
+``str.contains`` scans did.  Results come back best match first (bm25).
+
+The monthly log archives (core/retention.py) get an index of their own,
+with the columns of ``logs``, so a log search means the same thing on
+either side of the retention cutoff.
+
+    python -m core.search verify [db]    # FTS5 integrity check of every index
+    python -m core.search rebuild [db]   # re-index every table from scratch
+"""
+import re
+import sqlite3
+
+from core.db import DB_PATH, PRAGMAS
+
+# table -> indexed columns (the FTS table is "<table>_fts", rowid = table id)
+INDEXES = {
+    "clients": ("name", "mobile_number", "address", "referral_code"),
+    "messages": ("message",),
+    "logs": ("action", "details"),
+    "announcements": ("title", "message"),
+}
+
+
+def index_schema(table, columns):
+    """The FTS5 table and the triggers that keep it current, for ``table`` with ``columns``."""
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new = ", ".join(f"NEW.{col}" for col in columns)
+    old = ", ".join(f"OLD.{col}" for col in columns)
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {cols}, content='{table}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {new});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {old});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_update AFTER UPDATE OF {cols} ON {table}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {old});
+                INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {new});
+            END""",
+    ]
+
+
+SCHEMA = [sql for table, columns in INDEXES.items() for sql in index_schema(table, columns)]
+
+
+def archive_indexes(conn):
+    """The log archive tables that have an index (``<table>_fts``)."""
+    return [r[0][:-len("_fts")] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB 'logs_archive_*_fts' ORDER BY name")]
+
+
+def rebuild_rows(conn):
+    """Re-index every table from its content (caller owns the transaction)."""
+    for table in list(INDEXES) + archive_indexes(conn):
+        conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+
+def rebuild(conn):
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rebuild_rows(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def optimize(conn, table):
+    """Merge the index of ``table`` into one segment, dropping deleted entries.
+    Worth it after bulk deletes (e.g. log archiving), which leave the
+    index full of delete markers that every query has to skip over."""
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('optimize')")
+    conn.commit()
+
+
+def verify(conn):
+    """List of (table, error) for indexes that do not match their content."""
+    if conn.in_transaction:
+        conn.commit()
+    problems = []
+    for table in list(INDEXES) + archive_indexes(conn):
+        try:
+            conn.execute(f"INSERT INTO {table}_fts ({table}_fts, rank) VALUES ('integrity-check', 1)")
+        except sqlite3.DatabaseError as e:
+            problems.append((table, str(e)))
+        finally:
+            # The check is an INSERT: end the write transaction sqlite3 opened for it
+            conn.rollback()
+    return problems
+
+
+# === QUERIES ===
+def _words(text):
+    return [w for w in str(text or "").split() if re.search(r"\w", w)]
+
+
+def match_expression(text, columns=None):
+    """FTS5 query for free text typed by a user, or None if it has nothing to search for.
+
+    Each whitespace-separated word becomes a quoted phrase with a trailing
+    ``*``, so punctuation and FTS5 operators in the input are plain text and
+    the last token of every word matches as a prefix ("kmfx-ab" matches
+    "KMFX-AB12").  ``columns`` restricts the match to some indexed columns.
+    """
+    words = _words(text)
+    if not words:
+        return None
+    query = " ".join('"' + w.replace('"', '""') + '"*' for w in words)
+    if columns:
+        query = "{" + " ".join(columns) + "} : (" + query + ")"
+    return query
+
+
+def match_clause(table):
+    """SQL condition ``id IN (matches)`` taking the match expression as its one parameter."""
+    return f"id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)"
+
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    db = sqlite3.connect(sys.argv[2] if len(sys.argv) > 2 else DB_PATH)
+    for pragma in PRAGMAS:
+        db.execute(pragma)
+    if command == "rebuild":
+        rebuild(db)
+        print(f"Search indexes rebuilt: {', '.join(INDEXES)}.")
+    problems = verify(db)
+    if not problems:
+        print("Search indexes match their tables.")
+    for table, error in problems:
+        print(f"DRIFT {table}_fts: {error}")
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,327 @@
+"""Slow statement log: every statement slower than ``THRESHOLD_MS``, with its query plan.
+
+The statement observer of core/db.py sees everything run on a pooled
+connection.  That includes ``conn.execute``, ``c = conn.cursor()`` and the
+cursors ``pd.read_sql`` opens.  A statement at or over the threshold is kept
+in memory with its raw SQL, its parameters, duration and rows fetched.  A
+faster statement costs one comparison.
+
+Every ``FLUSH_SECONDS`` a background thread normalizes the kept statements.
+Whitespace is collapsed, literals become ``?`` and lists of placeholders
+become ``(?, ...)``.  The statements are then summed per normalized text into
+``slow_queries``: calls, total / slowest time, rows, first and last seen.
+The slowest call also keeps its raw SQL and a hash of its parameters, so
+calls that are only slow for some arguments stand out without storing client
+data.  The first time a process sees a statement it runs ``EXPLAIN QUERY
+PLAN`` with the slowest call's parameters.  ``full_scan`` flags plans that
+read a whole table (``SCAN <table>`` with no index), e.g. a history query
+filtering on an unindexed column.
+
+The writer uses its own connection outside the pool, so the log never logs itself.
+Rows not seen for ``KEEP_DAYS`` are deleted.
+
+    python -m core.slowlog [summary] [db]        # slowest statements and the plans of full scans
+    python -m core.slowlog export FILE [db]      # the whole log as CSV ("-" for stdout)
+    python -m core.slowlog reset [db]            # empty the log
+"""
+import atexit
+import csv
+import datetime
+import hashlib
+import io
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from core import db
+from core.db import DB_PATH
+
+THRESHOLD_MS = float(os.getenv("KMFX_SLOW_QUERY_MS", "100"))      # negative: log nothing
+KEEP_DAYS = int(os.getenv("KMFX_SLOW_QUERY_KEEP_DAYS", "30"))
+FLUSH_SECONDS = 5
+MAX_PENDING = 10000          # slow statements kept in memory while the database refuses writes
+PRUNE_EVERY_SECONDS = 3600
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS slow_queries (
+        sql TEXT PRIMARY KEY,
+        calls INTEGER NOT NULL DEFAULT 0,
+        total_ms REAL NOT NULL DEFAULT 0,
+        max_ms REAL NOT NULL DEFAULT 0,
+        rows INTEGER NOT NULL DEFAULT 0,
+        example TEXT,
+        params_hash TEXT,
+        plan TEXT,
+        full_scan INTEGER NOT NULL DEFAULT 0,
+        first_seen TEXT,
+        last_seen TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_slow_queries_last_seen ON slow_queries(last_seen)",
+]
+
+UPSERT = """INSERT INTO slow_queries (sql, calls, total_ms, max_ms, rows, example, params_hash, plan, full_scan,
+                                      first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(sql) DO UPDATE SET
+                calls = calls + excluded.calls,
+                total_ms = total_ms + excluded.total_ms,
+                rows = rows + excluded.rows,
+                example = CASE WHEN excluded.max_ms > max_ms THEN excluded.example ELSE example END,
+                params_hash = CASE WHEN excluded.max_ms > max_ms THEN excluded.params_hash ELSE params_hash END,
+                max_ms = MAX(max_ms, excluded.max_ms),
+                plan = COALESCE(excluded.plan, plan),
+                full_scan = CASE WHEN excluded.plan IS NULL THEN full_scan ELSE excluded.full_scan END,
+                last_seen = excluded.last_seen"""
+
+_lock = threading.Lock()
+_pending = []                # (sql, params, seconds, rows, ts)
+_explained = set()           # normalized statements whose plan this process has captured
+_stats = {"logged": 0, "written": 0, "dropped": 0, "errors": 0}
+_writer = None
+_writer_conn = None
+_flush_lock = threading.Lock()   # one flush at a time on the writer connection
+_last_prune = 0.0
+
+
+def _on_statement(sql, params, seconds, rows):
+    if seconds * 1000 < THRESHOLD_MS or THRESHOLD_MS < 0:
+        return
+    ts = datetime.datetime.now().isoformat()
+    with _lock:
+        _stats["logged"] += 1
+        if len(_pending) >= MAX_PENDING:
+            _stats["dropped"] += 1
+            return
+        _pending.append((sql, params, seconds, rows, ts))
+    _start_writer()
+
+
+db.observe(_on_statement)
+
+
+# === NORMALIZING ===
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?(?![\w.])")
+_PLACEHOLDERS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROW_LISTS = re.compile(r"\(\?, \.\.\.\)(?:\s*,\s*\(\?, \.\.\.\))+")
+_TABLE_SCAN = re.compile(r"^SCAN (?:TABLE )?\w+(?: AS \w+)?$")
+
+
+def normalize(sql):
+    """The statement with literals as ``?``, placeholder lists as ``(?, ...)`` and single spaces,
+    so calls that differ only by their values count as one statement."""
+    sql = _STRING.sub("?", " ".join(sql.split()))
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDERS.sub("(?, ...)", sql)
+    return _ROW_LISTS.sub("(?, ...), ...", sql)
+
+
+def params_hash(params):
+    return hashlib.sha1(repr(params).encode()).hexdigest()[:16]
+
+
+# === QUERY PLANS ===
+def explain(conn, sql, params=()):
+    """(plan text, full_scan) of ``sql``; (None, 0) for statements EXPLAIN does not apply to."""
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return None, 0
+    try:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.ProgrammingError:
+        # executemany() calls report no parameters: a plan for NULLs is still the plan
+        try:
+            rows = conn.execute("EXPLAIN QUERY PLAN " + sql, (None,) * sql.count("?")).fetchall()
+        except sqlite3.Error as e:
+            return f"(no plan: {e})", 0
+    except sqlite3.Error as e:
+        return f"(no plan: {e})", 0
+    depth = {0: -1}
+    lines = []
+    full_scan = 0
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+        if _TABLE_SCAN.match(detail):
+            full_scan = 1
+    return "\n".join(lines), full_scan
+
+
+# === WRITER ===
+def _own_conn():
+    """The writer's connection, outside the pool: not observed, so the log never logs itself."""
+    global _writer_conn
+    if _writer_conn is None:
+        _writer_conn = db.connect()
+    return _writer_conn
+
+
+def flush(conn=None):
+    """Write the slow statements waiting in memory.  Returns how many were written."""
+    with _flush_lock:
+        return _flush(conn)
+
+
+def _flush(conn):
+    global _last_prune
+    with _lock:
+        pending = list(_pending)
+        _pending.clear()
+    if not pending:
+        return 0
+    conn = conn or _own_conn()
+
+    statements = {}              # normalized -> [calls, seconds, slowest, rows, raw, params, first, last]
+    for sql, params, seconds, rows, ts in pending:
+        key = normalize(sql)
+        agg = statements.get(key)
+        if agg is None:
+            statements[key] = [1, seconds, seconds, rows, sql, params, ts, ts]
+            continue
+        agg[0] += 1
+        agg[1] += seconds
+        agg[3] += rows
+        if seconds > agg[2]:
+            agg[2], agg[4], agg[5] = seconds, sql, params
+        agg[7] = ts
+
+    records = []
+    for key, (calls, seconds, slowest, rows, raw, params, first, last) in statements.items():
+        plan, full_scan = (None, 0) if key in _explained else explain(conn, raw, params)
+        records.append((key, calls, seconds * 1000, slowest * 1000, rows, " ".join(raw.split()),
+                        params_hash(params), plan, full_scan, first, last))
+
+    if conn.in_transaction:
+        conn.commit()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(UPSERT, records)
+        if time.monotonic() - _last_prune > PRUNE_EVERY_SECONDS:
+            prune(conn)
+            _last_prune = time.monotonic()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        with _lock:
+            _stats["errors"] += 1
+            _pending[:0] = pending[:max(0, MAX_PENDING - len(_pending))]
+        raise
+    with _lock:
+        _explained.update(r[0] for r in records if r[7] is not None)
+        _stats["written"] += len(pending)
+    return len(pending)
+
+
+def prune(conn, days=KEEP_DAYS):
+    """Delete statements not seen for ``days`` (caller owns the transaction)."""
+    cutoff = (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat()
+    conn.execute("DELETE FROM slow_queries WHERE last_seen < ?", (cutoff,))
+
+
+def reset(conn):
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("DELETE FROM slow_queries")
+    conn.commit()
+    with _lock:
+        _explained.clear()
+
+
+def _write_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            flush()
+        except Exception as e:
+            print(f"Slow statement log write failed (kept for the next try): {e}", file=sys.stderr)
+
+
+def _start_writer():
+    global _writer
+    if _writer is None:
+        with _lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_loop, name="kmfx-slow-log", daemon=True)
+                _writer.start()
+                atexit.register(_flush_at_exit)
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception as e:
+        print(f"Slow statements lost at exit: {e}", file=sys.stderr)
+
+
+def stats():
+    with _lock:
+        return dict(_stats, pending=len(_pending), threshold_ms=THRESHOLD_MS)
+
+
+# === READ SIDE ===
+COLUMNS = ["sql", "calls", "total_ms", "avg_ms", "max_ms", "rows", "full_scan", "plan", "example", "params_hash",
+           "first_seen", "last_seen"]
+
+
+def summary(conn, hours=None, limit=20, order="total_ms"):
+    """Logged statements seen in the last ``hours`` (None = everything kept), ordered by
+    ``total_ms``, ``max_ms``, ``avg_ms`` or ``calls``."""
+    order = {"total_ms": "total_ms", "max_ms": "max_ms", "avg_ms": "total_ms / calls", "calls": "calls"}[order]
+    since = (datetime.datetime.now() - datetime.timedelta(hours=hours)).isoformat() if hours else ""
+    return pd.read_sql(f"""
+        SELECT sql, calls, total_ms, total_ms / calls AS avg_ms, max_ms, rows, full_scan, plan, example,
+               params_hash, first_seen, last_seen
+        FROM slow_queries WHERE last_seen >= ?
+        ORDER BY {order} DESC LIMIT ?
+    """, conn, params=(since, -1 if limit is None else int(limit)))
+
+
+def export_csv(conn):
+    """The whole log as CSV bytes, slowest total first."""
+    cur = conn.execute("""
+        SELECT sql, calls, total_ms, total_ms / calls AS avg_ms, max_ms, rows, full_scan, plan, example,
+               params_hash, first_seen, last_seen
+        FROM slow_queries ORDER BY total_ms DESC
+    """)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    writer.writerows(cur.fetchall())
+    return out.getvalue().encode()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    command = args.pop(0) if args and args[0] in ("summary", "export", "reset") else "summary"
+    target = args.pop(0) if command == "export" and args else "-"
+    conn = db.connect(args[0] if args else DB_PATH)
+    if command == "reset":
+        reset(conn)
+        print("Slow statement log emptied.")
+    elif command == "export":
+        data = export_csv(conn)
+        if target == "-":
+            sys.stdout.write(data.decode())
+        else:
+            with open(target, "wb") as f:
+                f.write(data)
+            count = conn.execute("SELECT COUNT(*) FROM slow_queries").fetchone()[0]
+            print(f"{target}: {count} statements.")
+    else:
+        top = summary(conn, limit=15)
+        if top.empty:
+            print(f"No statement over {THRESHOLD_MS:g} ms logged.")
+            sys.exit(0)
+        print("Slowest statements by total time:")
+        print(f"{'calls':>7} {'total ms':>10} {'avg ms':>8} {'max ms':>8} {'rows':>9}  scan  statement")
+        for _, row in top.iterrows():
+            print(f"{row['calls']:>7} {row['total_ms']:>10,.1f} {row['avg_ms']:>8,.1f} {row['max_ms']:>8,.1f} "
+                  f"{row['rows']:>9}  {'FULL' if row['full_scan'] else '    '}  {row['sql'][:110]}")
+        scans = top[top["full_scan"] == 1]
+        for _, row in scans.iterrows():
+            print(f"\nFULL SCAN ({row['calls']} calls, max {row['max_ms']:,.1f} ms): {row['sql']}\n{row['plan']}")
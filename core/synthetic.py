@@ -0,0 +1,669 @@
+"""Seeded synthetic dataset for load tests: every table of the schema, at any scale.
+
+``generate()`` creates a new database, runs the migrations and fills it the
+way the app would have over ``months`` of use.  Each table's triggers run,
+so the KPI totals, the referral closure, the search indexes and the change
+counters come out consistent.
+
+* clients, added over time with more sign-ups recently.  ``pioneers`` of
+  them are Pioneers and ``referred`` have an upline: an older client,
+  mostly a Pioneer, biased towards the oldest ones.  This gives referral
+  forests with a few large trees and long Pioneer chains.
+* profits, posted through ``profits.compute_postings`` and
+  ``record_postings`` in date order, so the referral bonus rows and the
+  ledger entries are the ones real postings would make.  Some are losses.
+* withdrawals in every status, for at most 90% of a client's withdrawable
+  balance.  Paid ones post their ledger entry like the Withdrawals page.
+* messages both ways with attachment metadata, notifications of every
+  category, licenses (the client's expiry follows the last one), file vault
+  entries, announcements with files and comments, EA versions, admins and
+  client logins.
+* logs for all of the above plus logins, then the usual archiving of the
+  months past the retention window; events for what sessions are told
+  about.  Both are staged while the tables are filled and copied over in
+  time order at the end, so ids follow timestamps as they do in the app.
+
+Only metadata is written for files: nothing is put in uploaded_files/, so
+the pages report those files as missing.  Every login
+(admins and clients) has the password ``PASSWORD``, hashed once.  The
+operational tables (perf metrics, slow statement log, posting keys) stay
+empty.
+
+Per-client volumes are means.  ``skew`` is the Pareto shape of how activity
+spreads over clients (smaller = a few clients own more of the rows), and the
+same shape biases who refers whom.  Each table draws from its own random
+stream of ``seed``.  The same seed, profile and ``today`` give the same rows,
+even after another table's volume changes.  Only the ledger posting times
+and the migration times are different.
+
+Rows are built from numpy arrays one ``CHUNK`` at a time, so memory grows
+with the arrays, not with the tuples: about 1.6 GB at 1m clients, a
+quarter of it SQLite's page cache.
+
+    python -m core.synthetic 1k|100k|1m [--seed N] [--today YYYY-MM-DD] [--out PATH] [--force]
+                             [--<profile field> VALUE ...]    # e.g. --profits 20 --skew 1.1
+"""
+import collections
+import datetime
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+
+import bcrypt
+import numpy as np
+import pandas as pd
+
+from core import kpi, ledger, migrations, profits, referrals, retention, search
+from core.db import PRAGMAS
+
+TIERS = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+CHUNK = 50_000               # rows per executemany / profits per posting transaction
+PASSWORD = "kmfx-demo"
+
+Profile = collections.namedtuple(
+    "Profile",
+    "clients months pioneers referred skew profits withdrawals messages attachments notifications "
+    "licenses files logins logs announcements",
+    defaults=(1_000, 24, 0.15, 0.6, 1.5, 8.0, 0.6, 3.0, 0.1, 4.0, 1.2, 1.0, 0.7, 6.0, 4.0))
+# clients        number of clients
+# months         history length, up to ``today``
+# pioneers       share of clients that are Pioneers
+# referred       share of clients with an upline
+# skew           Pareto shape of per-client activity and of referral attachment
+# profits .. files, logs     mean rows per client (logs: logins / logouts on top of the action logs)
+# attachments    share of messages with attachments
+# logins         share of clients with a username and password
+# announcements  per month
+
+WITHDRAWAL_STATUSES = {"Paid": 0.70, "Rejected": 0.10, "Approved": 0.08, "Pending": 0.12}
+WITHDRAWAL_METHODS = ["GCash", "Bank Transfer", "USDT", "PayMaya", "PayPal"]
+NOTIFICATION_CATEGORIES = {"Profit": 0.40, "Withdrawal": 0.20, "General": 0.15, "Message": 0.12,
+                           "License": 0.08, "System": 0.05}
+ADMINS = [("admin_ana", "Ana Reyes"), ("admin_marco", "Marco Santos"), ("admin_liza", "Liza Cruz")]
+
+FIRST_NAMES = ["Juan", "Maria", "Jose", "Ana", "Mark", "Kristine", "John", "Angelica", "Paolo", "Camille",
+               "Miguel", "Patricia", "Carlo", "Nicole", "Rafael", "Joanna", "Gabriel", "Bea", "Luis", "Andrea",
+               "Ramon", "Grace", "Daniel", "Sophia", "Vincent", "Erika", "Enrico", "Jasmine", "Noel", "Trisha",
+               "Adrian", "Katrina", "Francis", "Rhea", "Joshua", "Mae", "Kevin", "Hazel", "Ryan", "Leah"]
+LAST_NAMES = ["Santos", "Reyes", "Cruz", "Bautista", "Ocampo", "Garcia", "Mendoza", "Torres", "Flores", "Gonzales",
+              "Ramos", "Villanueva", "Aquino", "Castillo", "Rivera", "Dela Cruz", "Navarro", "Salazar", "Morales",
+              "Domingo", "Soriano", "Pascual", "Fernandez", "Mercado", "Aguilar", "Valdez", "Lim", "Tan", "Chua",
+              "Go", "Sy", "Yap", "Co", "Uy", "Dizon", "Manalo", "Santiago", "Francisco", "Marquez", "Perez"]
+CITIES = ["Quezon City", "Manila", "Makati", "Pasig", "Taguig", "Cebu City", "Davao City", "Iloilo City",
+          "Baguio", "Cagayan de Oro", "Bacolod", "Antipolo", "Caloocan", "Zamboanga City", "General Santos"]
+STREETS = ["Rizal St", "Mabini St", "Bonifacio Ave", "Luna St", "Del Pilar St", "Aguinaldo Hwy", "Quezon Ave",
+           "Roxas Blvd", "Katipunan Ave", "Burgos St"]
+ATTACHMENTS = ["statement.pdf", "screenshot.png", "deposit_slip.jpg", "mt5_report.html", "id_front.jpg",
+               "payout_proof.png", "trade_history.csv"]
+VAULT_FILES = ["KMFX_EA_setup.pdf", "monthly_report.pdf", "set_file.set", "contract.pdf", "tax_form.pdf"]
+CLIENT_MESSAGES = ["Hi, when will my withdrawal be processed?", "Can you check my equity this month?",
+                   "I updated my GCash number.", "Is the EA running on my account today?",
+                   "Thank you for the payout!", "How do I renew my license?", "Please send my monthly report."]
+STAFF_MESSAGES = ["Your withdrawal has been processed.", "Your monthly report is in the File Vault.",
+                  "Reminder: your license expires soon.", "The EA was updated, please restart MT5.",
+                  "Thanks for referring a new client!", "Please confirm your payment details."]
+REJECT_REASONS = ["Payment details incomplete", "Amount exceeds withdrawable balance", "Duplicate request"]
+
+# === RANDOM HELPERS ===
+def _rng(seed, part):
+    """Random stream of one table: changing another table's volume never changes this one."""
+    return np.random.default_rng([int(seed), zlib.crc32(part.encode())])
+
+
+def _activity(rng, n, mean, skew):
+    """Row counts for ``n`` clients averaging ``mean``, spread by a Pareto of shape ``skew``."""
+    if n == 0 or mean <= 0:
+        return np.zeros(n, dtype=np.int64)
+    weight = rng.pareto(skew, n) + 1.0
+    weight = np.minimum(weight / weight.mean(), 100.0)
+    return rng.poisson(mean * weight)
+
+
+def _between(rng, start, end):
+    """Uniform timestamps (datetime64[s]) between ``start`` and ``end``, element-wise."""
+    span = np.maximum((end - start).astype(np.int64), 0)
+    return start + (rng.random(len(span)) * span).astype("timedelta64[s]")
+
+
+def _in_order(when, *arrays):
+    """``when`` sorted, and the arrays in the same order."""
+    order = np.argsort(when, kind="stable")
+    return (when[order],) + tuple(a[order] for a in arrays)
+
+
+def _iso(stamps):
+    return np.datetime_as_string(stamps, unit="s").tolist()
+
+
+def _days(stamps):
+    return np.datetime_as_string(stamps, unit="D").tolist()
+
+
+def _pick(rng, options, size, p=None):
+    """Indexes into ``options`` (small ints, cheap to keep for millions of rows)."""
+    return rng.choice(len(options), size=size, p=p).astype(np.int8)
+
+
+def _password_hash(seed):
+    """One bcrypt hash of PASSWORD for every login, with a salt drawn from ``seed``."""
+    alphabet = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+    rng = _rng(seed, "password")
+    # The last salt character only carries 2 bits: keep the ones bcrypt does not normalize
+    salt = "".join(alphabet[i] for i in rng.integers(0, 64, 21)) + ".Oeu"[rng.integers(0, 4)]
+    return bcrypt.hashpw(PASSWORD.encode(), f"$2b$12${salt}".encode()).decode()
+
+
+def _rows(n, build):
+    """The tuples ``build(chunk)`` makes for each CHUNK-sized slice of ``range(n)``."""
+    for start in range(0, n, CHUNK):
+        yield from build(slice(start, min(n, start + CHUNK)))
+
+
+def _insert(conn, sql, rows):
+    """``executemany`` of any iterable of rows, one transaction per CHUNK."""
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, CHUNK))
+        if not chunk:
+            return
+        conn.execute("BEGIN")
+        conn.executemany(sql, chunk)
+        conn.commit()
+
+
+def _license_data(name, accounts, expiry, allow_live, key):
+    # The License Generator page's encoding (XOR with the key, upper-case hex), on bytes: names are ASCII
+    plain = np.frombuffer(f"{name}|{accounts or ''}|{expiry}|{'1' if allow_live else '0'}".encode(), np.uint8)
+    return (plain ^ np.resize(np.frombuffer(key.encode(), np.uint8), len(plain))).tobytes().hex().upper()
+
+
+# === STAGED LOGS AND EVENTS ===
+STAGING = [
+    "CREATE TABLE synthetic_logs (timestamp TEXT, action TEXT, details TEXT, user_type TEXT, user_id INTEGER)",
+    "CREATE TABLE synthetic_events (created_at TEXT, topic TEXT, client_id INTEGER, payload TEXT)",
+]
+
+
+def _log(conn, rows):
+    """Stage (timestamp, action, details, user_type, user_id) rows for ``logs``."""
+    _insert(conn, "INSERT INTO synthetic_logs VALUES (?, ?, ?, ?, ?)", rows)
+
+
+def _event(conn, rows):
+    """Stage (created_at, topic, client_id, payload dict) rows for ``events``."""
+    _insert(conn, "INSERT INTO synthetic_events VALUES (?, ?, ?, ?)",
+            ((ts, topic, client_id, json.dumps(payload)) for ts, topic, client_id, payload in rows))
+
+
+def _unstage(conn):
+    """Copy the staged rows in time order (ids follow timestamps) and drop the staging tables."""
+    conn.execute("BEGIN")
+    conn.execute("""INSERT INTO logs (timestamp, action, details, user_type, user_id)
+                    SELECT timestamp, action, details, user_type, user_id FROM synthetic_logs
+                    ORDER BY timestamp, rowid""")
+    conn.execute("""INSERT INTO events (topic, client_id, payload, created_at)
+                    SELECT topic, client_id, payload, created_at FROM synthetic_events
+                    ORDER BY created_at, rowid""")
+    logs, events = (conn.execute(f"SELECT COUNT(*) FROM synthetic_{t}").fetchone()[0] for t in ("logs", "events"))
+    conn.execute("DROP TABLE synthetic_logs")
+    conn.execute("DROP TABLE synthetic_events")
+    conn.commit()
+    return logs, events
+
+
+# === CLIENTS, LICENSES AND LOGINS ===
+def _clients(conn, p, seed, now, password):
+    rng = _rng(seed, "clients")
+    n = p.clients
+    span = int(p.months * 30.44 * 86400)
+    # Oldest first, and more sign-ups in recent months
+    age = np.sort((span * rng.random(n) ** 2).astype(np.int64))[::-1]
+    added = now - age.astype("timedelta64[s]")
+    pioneer = rng.random(n) < p.pioneers
+
+    # Uplines are older clients, mostly Pioneers, the oldest ones more often
+    idx = np.arange(n)
+    pioneer_idx = np.flatnonzero(pioneer)
+    older_pioneers = np.searchsorted(pioneer_idx, idx)
+    bias = rng.random(n) ** p.skew
+    to_pioneer = (rng.random(n) < 0.85) & (older_pioneers > 0)
+    pioneer_pick = pioneer_idx.take((older_pioneers * bias).astype(np.int64), mode="clip") if len(pioneer_idx) else idx
+    upline = np.where(to_pioneer, pioneer_pick, (idx * bias).astype(np.int64))
+    referred = (rng.random(n) < p.referred) & (idx > 0)
+    # 0, not NULL, is "no upline", as the app stores it
+    referred_by = np.where(referred, upline + 1, 0)
+
+    first = rng.integers(0, len(FIRST_NAMES), n)
+    last = rng.integers(0, len(LAST_NAMES), n)
+    accounts = rng.integers(10_000_000, 100_000_000, (n, 2))
+    two_accounts = rng.random(n) < 0.1
+    start_balance = np.round(np.maximum(rng.lognormal(np.log(1500), 0.9, n), 100.0), 2)
+    mobile = rng.integers(0, 10 ** 9, n)
+    street_no = rng.integers(1, 999, n)
+    street = rng.integers(0, len(STREETS), n)
+    city = rng.integers(0, len(CITIES), n)
+    noted = rng.random(n) < 0.05
+    names = [f"{FIRST_NAMES[f]} {LAST_NAMES[l]}" for f, l in zip(first, last)]
+    types = np.where(pioneer, "Pioneer", "Regular")
+
+    # Licenses first: a client's expiry is its last license's
+    lic = _rng(seed, "licenses")
+    owner = np.repeat(idx, lic.poisson(p.licenses, n))
+    issued = _between(lic, added[owner], np.full(len(owner), now))
+    term = lic.choice([30, 90, 180, 365], size=len(owner), p=[0.1, 0.2, 0.3, 0.4])
+    lic_expiry = issued.astype("datetime64[D]") + term.astype("timedelta64[D]")
+    expiry = added.astype("datetime64[D]") + np.timedelta64(365, "D")
+    np.maximum.at(expiry, owner, lic_expiry)
+    allow_live = lic.random(len(owner)) < 0.8
+    versions = ["Latest", "v2.4", "v2.3", "v3.0"]
+    version = _pick(lic, versions, len(owner), p=[0.6, 0.15, 0.1, 0.15])
+
+    def account_text(i):
+        return f"{accounts[i, 0]}, {accounts[i, 1]}" if two_accounts[i] else str(accounts[i, 0])
+
+    def client_rows(s):
+        for i, exp, day in zip(range(s.start, s.stop), _days(expiry[s]), _days(added[s])):
+            yield (i + 1, names[i], types[i], account_text(i), exp, float(start_balance[i]), 0.0, 0.0, day,
+                   int(referred_by[i]), "".join(ch for ch in names[i].lower() if ch.isalnum()) + str(i + 1),
+                   "VIP - priority payouts" if noted[i] else None,
+                   f"{street_no[i]} {STREETS[street[i]]}, {CITIES[city[i]]}", f"09{mobile[i]:09d}")
+
+    _insert(conn, """INSERT INTO clients
+                     (id, name, type, accounts, expiry, start_balance, current_equity, withdrawable_balance,
+                      add_date, referred_by, referral_code, notes, address, mobile_number)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", _rows(n, client_rows))
+    _log(conn, _rows(n, lambda s: (
+        (ts, "Client Added", f"{names[i]} ({types[i]}) | Referred by: "
+                             f"{names[referred_by[i] - 1] if referred_by[i] else 'None'} (ID: {referred_by[i]})",
+         "System", None)
+        for i, ts in zip(range(s.start, s.stop), _iso(added[s])))))
+
+    def license_rows(s):
+        for j, i, day, exp in zip(range(s.start, s.stop), owner[s].tolist(), _days(issued[s]), _days(lic_expiry[s])):
+            key = f"KMFX_{names[i].upper().replace(' ', '_')}_{issued[j].astype(datetime.datetime):%b%d%Y}".upper()
+            yield (i + 1, key, _license_data(names[i], account_text(i), exp, allow_live[j], key),
+                   versions[version[j]], day, exp, int(allow_live[j]))
+
+    _insert(conn, """INSERT INTO client_licenses (client_id, key, enc_data, version, date_generated, expiry, allow_live)
+                     VALUES (?, ?, ?, ?, ?, ?, ?)""", _rows(len(owner), license_rows))
+    _log(conn, _rows(len(owner), lambda s: (
+        (ts, "License Generated", f"{names[i]} | {versions[v]} | Expiry {exp}", "System", None)
+        for i, v, ts, exp in zip(owner[s].tolist(), version[s], _iso(issued[s]), _days(lic_expiry[s])))))
+    _event(conn, _rows(len(owner), lambda s: (
+        (ts, "license.issued", i + 1, {"version": versions[v], "text": f"🔑 New EA license issued ({versions[v]})"})
+        for i, v, ts in zip(owner[s].tolist(), version[s], _iso(issued[s])))))
+
+    logins = np.flatnonzero(rng.random(n) < p.logins)
+    usernames = (f"{FIRST_NAMES[first[i]].lower()}{i + 1}" for i in logins)
+    _insert(conn, "INSERT INTO users (client_id, username, password) VALUES (?, ?, ?)",
+            ((int(i) + 1, username, password) for i, username in zip(logins, usernames)))
+    _insert(conn, "INSERT INTO admins (username, password, name) VALUES (?, ?, ?)",
+            [(username, password, name) for username, name in ADMINS])
+    _log(conn, ((ts, "Client Login Set", f"Client {names[i]} | Username: {FIRST_NAMES[first[i]].lower()}{i + 1}",
+                 "System", None) for i, ts in zip(logins, _iso(added[logins]))))
+    return {"added": added, "names": names, "types": types, "start_balance": start_balance, "mobile": mobile,
+            "logins": logins}
+
+
+# === PROFITS ===
+def _profits(conn, p, seed, now, clients):
+    rng = _rng(seed, "profits")
+    owner = np.repeat(np.arange(p.clients), _activity(rng, p.clients, p.profits, p.skew))
+    when = _between(rng, clients["added"][owner], np.full(len(owner), now))
+    amount = np.round(clients["start_balance"][owner] * rng.normal(0.03, 0.07, len(owner)), 2)
+    amount[amount == 0] = 0.01
+    when, owner, amount = _in_order(when, owner, amount)
+    bonuses = 0
+    uplines = referrals.UplineCache()    # of this database only, not the process-wide one
+    for start in range(0, len(owner), CHUNK):
+        s = slice(start, start + CHUNK)
+        chunk = pd.DataFrame({"client_id": owner[s] + 1, "profit": amount[s], "date": _days(when[s]),
+                              "type": clients["types"][owner[s]]})
+        postings, paid = profits.compute_postings(chunk, profits.cached_uplines(conn, chunk["client_id"], uplines))
+        profits.record_postings(conn, postings, paid)
+        bonuses += len(paid)
+    return len(owner), bonuses
+
+
+# === WITHDRAWALS ===
+def _withdrawals(conn, p, seed, now, clients):
+    rng = _rng(seed, "withdrawals")
+    balances = np.array(conn.execute("SELECT id, withdrawable_balance FROM clients WHERE withdrawable_balance > 1 "
+                                     "ORDER BY id").fetchall()).reshape(-1, 2)
+    ids, balance = balances[:, 0].astype(np.int64), balances[:, 1]
+    count = np.minimum(_activity(rng, len(ids), p.withdrawals, p.skew), 8)
+    pos = np.repeat(np.arange(len(ids)), count)
+    # At most 90% of the balance in total, so the paid ones never overdraw it
+    share = rng.uniform(0.02, 0.25, len(pos))
+    total = np.bincount(pos, weights=share, minlength=len(ids))
+    share = share * np.minimum(1.0, 0.9 / np.maximum(total[pos], 1e-9))
+    amount = np.floor(balance[pos] * share * 100) / 100
+    keep = amount >= 1
+    client, amount = ids[pos[keep]], amount[keep]
+    statuses = list(WITHDRAWAL_STATUSES)
+    status = _pick(rng, statuses, len(client), p=list(WITHDRAWAL_STATUSES.values()))
+    added = clients["added"][client - 1]
+    requested = _between(rng, added, np.full(len(client), now))
+    # Requests still waiting are recent
+    still_open = (status == statuses.index("Pending")) | (status == statuses.index("Approved"))
+    recent = now - (rng.random(len(client)) * 14 * 86400).astype("timedelta64[s]")
+    requested = np.where(still_open, np.maximum(recent, added), requested)
+    delay = np.minimum((now - requested).astype(np.int64), 3 * 86400)
+    processed = requested + (rng.random(len(client)) * delay).astype("timedelta64[s]")
+    staff_names = ["Owner"] + [name for _, name in ADMINS]
+    staff = _pick(rng, staff_names, len(client), p=[0.7, 0.1, 0.1, 0.1])
+    method = _pick(rng, WITHDRAWAL_METHODS, len(client))
+    reason = _pick(rng, REJECT_REASONS, len(client))
+    requested, client, amount, status, processed, staff, method, reason = _in_order(
+        requested, client, amount, status, processed, staff, method, reason)
+    names, mobile = clients["names"], clients["mobile"]
+
+    def withdrawal_rows(s):
+        for k, cid, amt, st, req, done in zip(range(s.start, s.stop), client[s].tolist(), amount[s].tolist(),
+                                              status[s], _days(requested[s]), _days(processed[s])):
+            state, pending = statuses[st], statuses[st] == "Pending"
+            yield (k + 1, cid, amt, WITHDRAWAL_METHODS[method[k]],
+                   f"{WITHDRAWAL_METHODS[method[k]]} • 09{mobile[cid - 1]:09d}", state, req,
+                   None if pending else done, None if pending else staff_names[staff[k]],
+                   REJECT_REASONS[reason[k]] if state == "Rejected" else None)
+
+    rows = _rows(len(client), withdrawal_rows)
+    while True:
+        chunk = list(itertools.islice(rows, CHUNK))
+        if not chunk:
+            break
+
+        def build(conn, chunk=chunk):
+            conn.executemany("""INSERT INTO withdrawals
+                                (id, client_id, amount, method, details, status, date_requested, date_processed,
+                                 processed_by, notes)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", chunk)
+            return [ledger.Entry(r[1], 0.0, -r[2], "withdrawal", "withdrawals", r[0]) for r in chunk if r[5] == "Paid"]
+
+        ledger.post(conn, build)
+
+    def logs(s):
+        for k, cid, amt, st, ts in zip(range(s.start, s.stop), client[s].tolist(), amount[s].tolist(), status[s],
+                                       _iso(processed[s])):
+            state = statuses[st]
+            if state == "Rejected":
+                yield ts, "Withdrawal Rejected", f"${amt:,.2f} | {REJECT_REASONS[reason[k]]}", "System", None
+            elif state != "Pending":
+                yield ts, f"Withdrawal {state}", f"${amt:,.2f} for {names[cid - 1]}", "System", None
+
+    def events(s):
+        for k, cid, amt, st, req, ts in zip(range(s.start, s.stop), client[s].tolist(), amount[s].tolist(), status[s],
+                                            _iso(requested[s]), _iso(processed[s])):
+            yield req, "withdrawal.requested", cid, {"amount": amt,
+                                                     "text": f"💳 {names[cid - 1]} requested a ${amt:,.2f} withdrawal"}
+            state = statuses[st]
+            if state != "Pending":
+                icon = "💸" if state == "Paid" else "💳"
+                yield ts, f"withdrawal.{state.lower()}", cid, {"withdrawal_id": k + 1, "amount": amt,
+                                                               "text": f"{icon} Withdrawal of ${amt:,.2f} {state.lower()}"}
+
+    _log(conn, _rows(len(client), logs))
+    _event(conn, _rows(len(client), events))
+    return len(client)
+
+
+# === MESSAGES, NOTIFICATIONS AND FILES ===
+def _messages(conn, p, seed, now, clients):
+    rng = _rng(seed, "messages")
+    owner = np.repeat(np.arange(p.clients), _activity(rng, p.clients, p.messages, p.skew))
+    sent = _between(rng, clients["added"][owner], np.full(len(owner), now))
+    sent, owner = _in_order(sent, owner)
+    from_client = rng.random(len(owner)) < 0.5
+    client_text = _pick(rng, CLIENT_MESSAGES, len(owner))
+    staff_text = _pick(rng, STAFF_MESSAGES, len(owner))
+    staff_names = ["Owner"] + [name for _, name in ADMINS]
+    staff = _pick(rng, staff_names, len(owner), p=[0.55, 0.15, 0.15, 0.15])
+    read = (now - sent > np.timedelta64(3, "D")) | (rng.random(len(owner)) < 0.4)
+    names = clients["names"]
+
+    def message_rows(s):
+        for k, i, ts in zip(range(s.start, s.stop), owner[s].tolist(), _iso(sent[s])):
+            if from_client[k]:
+                yield k + 1, i + 1, None, None, CLIENT_MESSAGES[client_text[k]], ts, int(read[k])
+            else:
+                yield k + 1, None, staff_names[staff[k]], i + 1, STAFF_MESSAGES[staff_text[k]], ts, int(read[k])
+
+    _insert(conn, """INSERT INTO messages (id, from_client_id, from_admin, to_client_id, message, timestamp, read)
+                     VALUES (?, ?, ?, ?, ?, ?, ?)""", _rows(len(owner), message_rows))
+    _log(conn, _rows(len(owner), lambda s: (
+        (ts, "Message Received", f"From client ID {i + 1}", "System", None) if from_client[k]
+        else (ts, "Message Sent", f"To client {names[i]}", "System", None)
+        for k, i, ts in zip(range(s.start, s.stop), owner[s].tolist(), _iso(sent[s])))))
+    _event(conn, _rows(len(owner), lambda s: (
+        (ts, "message.from_client", i + 1, {"message_id": k + 1, "text": f"✉️ New message from {names[i]}"})
+        if from_client[k] else
+        (ts, "message.to_client", i + 1, {"message_id": k + 1, "text": f"✉️ New message from {staff_names[staff[k]]}"})
+        for k, i, ts in zip(range(s.start, s.stop), owner[s].tolist(), _iso(sent[s])))))
+
+    with_files = np.flatnonzero(rng.random(len(owner)) < p.attachments) + 1
+    message_ids = np.repeat(with_files, 1 + (rng.random(len(with_files)) < 0.3))
+    original = _pick(rng, ATTACHMENTS, len(message_ids))
+    _insert(conn, "INSERT INTO message_attachments (message_id, file_name, original_name) VALUES (?, ?, ?)",
+            ((int(m), f"{m}_{ATTACHMENTS[a]}", ATTACHMENTS[a]) for m, a in zip(message_ids, original)))
+    return len(owner), len(message_ids)
+
+
+def _notifications(conn, p, seed, now, clients):
+    rng = _rng(seed, "notifications")
+    owner = np.repeat(np.arange(p.clients), _activity(rng, p.clients, p.notifications, p.skew))
+    when = _between(rng, clients["added"][owner], np.full(len(owner), now))
+    when, owner = _in_order(when, owner)
+    categories = list(NOTIFICATION_CATEGORIES)
+    category = _pick(rng, categories, len(owner), p=list(NOTIFICATION_CATEGORIES.values()))
+    amount = np.round(rng.lognormal(np.log(60), 1.0, len(owner)), 2)
+    read = (now - when > np.timedelta64(14, "D")) | (rng.random(len(owner)) < 0.3)
+    titles = {"Profit": "💰 Profit Posted", "Withdrawal": "💳 Withdrawal Update", "General": "📢 KMFX Update",
+              "Message": "✉️ New Message", "License": "🔑 New License Issued!", "System": "⚙️ Maintenance Notice"}
+    texts = {"Profit": "A profit of ${:,.2f} was added to your account.",
+             "Withdrawal": "Your withdrawal of ${:,.2f} was updated.",
+             "General": "New EA settings are available in the File Vault.",
+             "Message": "You have a new message from Support.",
+             "License": "Your EA license was renewed.",
+             "System": "The dashboard will be briefly offline for maintenance."}
+    _insert(conn, "INSERT INTO notifications (client_id, title, message, category, date, read) VALUES (?, ?, ?, ?, ?, ?)",
+            _rows(len(owner), lambda s: (
+                (i + 1, titles[categories[c]], texts[categories[c]].format(amt), categories[c], day, int(r))
+                for i, c, amt, day, r in zip(owner[s].tolist(), category[s], amount[s], _days(when[s]), read[s]))))
+    return len(owner)
+
+
+def _files(conn, p, seed, now, clients):
+    rng = _rng(seed, "files")
+    owner = np.repeat(np.arange(p.clients), rng.poisson(p.files, p.clients))
+    sent = _between(rng, clients["added"][owner], np.full(len(owner), now))
+    sent, owner = _in_order(sent, owner)
+    original = _pick(rng, VAULT_FILES, len(owner))
+    sender = _pick(rng, ["Owner", "Admin"], len(owner), p=[0.7, 0.3])
+    names = clients["names"]
+
+    def file_rows(s):
+        for k, i, ts in zip(range(s.start, s.stop), owner[s].tolist(), _iso(sent[s])):
+            name = VAULT_FILES[original[k]]
+            compact = ts.replace("-", "").replace("T", "").replace(":", "")
+            yield (i + 1, f"{i + 1}_{compact}_{name}", name, ts[:10], "Owner" if sender[k] == 0 else "Admin",
+                   "Monthly statement" if name == "monthly_report.pdf" else None)
+
+    _insert(conn, """INSERT INTO client_files (client_id, file_name, original_name, upload_date, sent_by, notes)
+                     VALUES (?, ?, ?, ?, ?, ?)""", _rows(len(owner), file_rows))
+    _log(conn, _rows(len(owner), lambda s: (
+        (ts, "Files Sent", f"1 file(s) to client ID {i + 1} ({names[i]})", "System", None)
+        for i, ts in zip(owner[s].tolist(), _iso(sent[s])))))
+    return len(owner)
+
+
+# === ANNOUNCEMENTS AND EA VERSIONS ===
+def _announcements(conn, p, seed, now, clients):
+    rng = _rng(seed, "announcements")
+    start = now - np.timedelta64(int(p.months * 30.44 * 86400), "s")
+    count = int(rng.poisson(p.announcements * p.months))
+    posted = np.sort(_between(rng, np.full(count, start), np.full(count, now)))
+    topics = ["Monthly Results", "EA Update", "Payout Schedule", "Holiday Notice", "New Pioneer Bonus", "Maintenance"]
+    topic = _pick(rng, topics, count)
+    likes = rng.poisson(max(1.0, p.clients * 0.02), count)
+    titles = [f"{topics[t]} - {ts.astype(datetime.datetime):%B %Y}" for t, ts in zip(topic, posted)]
+    _insert(conn, "INSERT INTO announcements (id, title, message, date, posted_by, likes) VALUES (?, ?, ?, ?, ?, ?)",
+            [(a + 1, titles[a], f"{topics[topic[a]]}: details for all KMFX clients. Check the dashboard for your numbers.",
+              day, "Owner", int(likes[a])) for a, day in enumerate(_days(posted))])
+    with_files = np.flatnonzero(rng.random(count) < 0.2) + 1
+    _insert(conn, "INSERT INTO announcement_files (announcement_id, file_name, original_name) VALUES (?, ?, ?)",
+            [(int(a), f"{a}_results.pdf", "results.pdf") for a in with_files])
+
+    ann = np.repeat(np.arange(count), rng.poisson(min(20.0, 1 + p.clients / 200), count))
+    commented = _between(rng, posted[ann], np.full(len(ann), now))
+    commenter = rng.integers(0, p.clients, len(ann))
+    comments = ["Congrats team!", "Thank you!", "Noted, thanks.", "Great results 🔥", "When is the next payout?"]
+    text = _pick(rng, comments, len(ann))
+    names = clients["names"]
+    _insert(conn, "INSERT INTO announcement_comments (announcement_id, commenter_name, comment, timestamp) "
+                  "VALUES (?, ?, ?, ?)",
+            [(int(a) + 1, names[c], comments[t], ts) for a, c, t, ts in zip(ann, commenter, text, _iso(commented))])
+
+    _log(conn, [(ts, "Announcement Posted", titles[a], "System", None) for a, ts in enumerate(_iso(posted))])
+    _log(conn, [(ts, "Comment", f"{names[c]} on '{titles[a]}'", "System", None)
+                for a, c, ts in zip(ann.tolist(), commenter, _iso(commented))])
+    _event(conn, [(ts, "announcement.posted", None, {"announcement_id": a + 1, "text": f"📢 New announcement: {titles[a]}"})
+                  for a, ts in enumerate(_iso(posted))])
+    return count
+
+
+def _ea_versions(conn, p, seed, now):
+    rng = _rng(seed, "ea_versions")
+    count = max(1, p.months // 2)
+    start = now - np.timedelta64(int(p.months * 30.44 * 86400), "s")
+    uploaded = np.sort(_between(rng, np.full(count, start), np.full(count, now)))
+    versions = [f"v{1 + k // 4}.{k % 4}" for k in range(count)]
+    _insert(conn, "INSERT INTO ea_versions (version, file_name, upload_date, notes) VALUES (?, ?, ?, ?)",
+            [(v, f"KMFX_EA_{v}.ex5", day, "Bug fixes and faster order handling")
+             for v, day in zip(versions, _days(uploaded))])
+    _log(conn, [(ts, "EA Version Uploaded", f"{v} - KMFX_EA_{v}.ex5", "System", None)
+                for v, ts in zip(versions, _iso(uploaded))])
+    return count
+
+
+def _sessions(conn, p, seed, now, clients):
+    """Login / logout logs: clients with a login, the owner and the admins."""
+    rng = _rng(seed, "logs")
+    logins = clients["logins"]
+    owner = np.repeat(logins, _activity(rng, len(logins), p.logs, p.skew))
+    when = _between(rng, clients["added"][owner], np.full(len(owner), now))
+    logout = rng.random(len(owner)) < 0.3
+    names = clients["names"]
+    _log(conn, _rows(len(owner), lambda s: (
+        (ts, "Logout" if out else "Login", f"Client {names[i]} logged {'out' if out else 'in'}", "Client", i + 1)
+        for i, ts, out in zip(owner[s].tolist(), _iso(when[s]), logout[s]))))
+    staff = int(rng.poisson(2 * p.months * 30))
+    start = now - np.timedelta64(int(p.months * 30.44 * 86400), "s")
+    staff_when = _between(rng, np.full(staff, start), np.full(staff, now))
+    who = rng.integers(0, len(ADMINS) + 1, staff)
+    _log(conn, [(ts, "Login", "Owner logged in" if w == 0 else f"Admin {ADMINS[w - 1][0]} logged in",
+                 "Owner" if w == 0 else "Admin", None) for ts, w in zip(_iso(staff_when), who)])
+
+
+# === BUILD ===
+def generate(path, profile=Profile(), seed=0, today=None, progress=print):
+    """Create ``path`` (which must not exist) filled with ``profile``.  Returns row counts per table."""
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+    today = today or datetime.date.today()
+    now = np.datetime64(f"{today.isoformat()}T18:00:00", "s")
+    conn = sqlite3.connect(path)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    # A throw-away file until it is complete: no fsync per transaction, a page cache that
+    # holds the hot indexes of a million clients, and sorts that spill to disk
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")
+    conn.execute("PRAGMA temp_store=FILE")
+    migrations.run_migrations(conn)
+    # Indexed once at the end instead of row by row: the rebuild is the fast way to fill an FTS5 index
+    for table in search.INDEXES:
+        conn.execute(f"DROP TRIGGER trg_{table}_fts_insert")
+    for sql in STAGING:
+        conn.execute(sql)
+    started = time.perf_counter()
+
+    def step(what):
+        progress(f"{time.perf_counter() - started:7.1f}s  {what}")
+
+    clients = _clients(conn, profile, seed, now, _password_hash(seed))
+    step(f"{profile.clients:,} clients, licenses and logins")
+    entries, bonuses = _profits(conn, profile, seed, now, clients)
+    step(f"{entries:,} profits and {bonuses:,} referral bonuses posted")
+    step(f"{_withdrawals(conn, profile, seed, now, clients):,} withdrawals")
+    _messages(conn, profile, seed, now, clients)
+    _notifications(conn, profile, seed, now, clients)
+    _files(conn, profile, seed, now, clients)
+    _announcements(conn, profile, seed, now, clients)
+    _ea_versions(conn, profile, seed, now)
+    _sessions(conn, profile, seed, now, clients)
+    step("messages, notifications, files, announcements")
+
+    logs, events = _unstage(conn)
+    search.rebuild(conn)
+    for sql in search.SCHEMA:
+        conn.execute(sql)
+    conn.commit()
+    # Months past the retention window are archived, as the daily job would have done
+    archived = retention.archive(conn, now=now.astype(datetime.datetime))
+    step(f"{logs:,} logs ({archived:,} archived), {events:,} events, search indexes")
+
+    ledger.reconcile(conn)
+    conn.execute("PRAGMA optimize")
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in migrations.VERSIONED_TABLES + ["ledger_entries", "referral_closure", "events"]}
+    counts["logs (archived)"] = archived
+    conn.close()
+    return counts
+
+
+def verify(path):
+    """Problems found by the consistency checks of the derived tables (empty when it is consistent)."""
+    conn = sqlite3.connect(path)
+    problems = [f"kpi {row}" for row in kpi.verify(conn)]
+    problems += [f"referral closure {row}" for row in referrals.verify(conn)[:10]]
+    problems += [f"ledger {row}" for row in ledger.verify(conn)[:10]]
+    problems += [f"search {row}" for row in search.verify(conn)]
+    conn.close()
+    return problems
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m core.synthetic", description=__doc__.split("\n")[0])
+    parser.add_argument("tier", choices=list(TIERS), help="number of clients: 1k, 100k or 1m")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--today", type=datetime.date.fromisoformat, default=None,
+                        help="last day of the history (default: today)")
+    parser.add_argument("--out", help="database to create (default: kmfx_synthetic_<tier>_<seed>.db)")
+    parser.add_argument("--force", action="store_true", help="replace --out if it exists")
+    defaults = Profile()
+    for field in Profile._fields[1:]:
+        value = getattr(defaults, field)
+        parser.add_argument(f"--{field}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    out = args.out or f"kmfx_synthetic_{args.tier}_{args.seed}.db"
+    if args.force:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(out + suffix):
+                os.remove(out + suffix)
+    profile = Profile(TIERS[args.tier], *(getattr(args, field) for field in Profile._fields[1:]))
+    print(f"{out}: {profile}")
+    try:
+        counts = generate(out, profile, args.seed, args.today)
+    except FileExistsError as e:
+        sys.exit(f"{e} (use --force to replace it)")
+    for table, count in counts.items():
+        print(f"{table:>24} {count:>12,}")
+    problems = verify(out)
+    print("Derived tables consistent." if not problems else "\n".join(problems))
+    sys.exit(1 if problems else 0)
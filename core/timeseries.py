@@ -0,0 +1,101 @@
+"""Pre-aggregated profit time series for the charts.
+
+Bucketing happens in SQLite (GROUP BY on the indexed date column) and the
+results are cached until the profits table changes, so a chart gets back a few
+hundred numbers instead of the whole profits table.  Series are returned as
+plain lists (``{"x": [...], "<column>": [...]}``) ready to hand to plotly.
+"""
+from core.cache import versioned_cache
+from core.db import get_conn
+
+# SQL expression turning profits.date into the bucket label
+BUCKETS = {
+    "day": "date(date)",
+    "week": "date(date, '-6 days', 'weekday 1')",   # Monday of that week
+    "month": "strftime('%Y-%m', date)",
+}
+
+SCHEMA = [
+    # Covering index: the revenue series never touches the table itself
+    "CREATE INDEX IF NOT EXISTS idx_profits_date_shares ON profits(date, your_share, referral_bonus)",
+]
+
+
+def _bucket_expr(bucket):
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket {bucket!r} (expected one of {', '.join(BUCKETS)})")
+    return BUCKETS[bucket]
+
+
+@versioned_cache("profits")
+def revenue_series(bucket="month", start=None, end=None):
+    """Owner revenue (your_share + referral_bonus) per bucket."""
+    where, params = ["date IS NOT NULL"], []
+    if start:
+        where.append("date >= ?")
+        params.append(str(start))
+    if end:
+        where.append("date <= ?")
+        params.append(str(end))
+    expr = _bucket_expr(bucket)
+    if bucket == "month" and not params:
+        # Already rolled up by the KPI triggers (core/kpi.py)
+        sql = "SELECT month, your_share, referral_bonus FROM revenue_monthly ORDER BY month"
+    else:
+        # Group by the raw indexed date first (streams the covering index, no
+        # per-row date math), then bucket the few thousand distinct days
+        sql = f"""
+            SELECT {expr} AS bucket, COALESCE(SUM(your_share), 0), COALESCE(SUM(referral_bonus), 0)
+            FROM (
+                SELECT date, SUM(your_share) AS your_share, SUM(referral_bonus) AS referral_bonus
+                FROM profits
+                WHERE {' AND '.join(where)}
+                GROUP BY date
+            )
+            GROUP BY bucket
+            HAVING bucket IS NOT NULL
+            ORDER BY bucket
+        """
+    rows = get_conn().execute(sql, params).fetchall()
+    series = {
+        "x": [r[0] for r in rows],
+        "your_share": [r[1] for r in rows],
+        "referral_bonus": [r[2] for r in rows],
+    }
+    series["total"] = [a + b for a, b in zip(series["your_share"], series["referral_bonus"])]
+    return series
+
+
+@versioned_cache("profits")
+def client_profit_series(client_id, bucket="day"):
+    """Per-bucket profit, client share and referral bonus for one client."""
+    expr = _bucket_expr(bucket)
+    rows = get_conn().execute(f"""
+        SELECT {expr} AS bucket, SUM(profit), COALESCE(SUM(client_share), 0), COALESCE(SUM(referral_bonus), 0)
+        FROM (
+            SELECT date, SUM(profit) AS profit, SUM(client_share) AS client_share,
+                   SUM(referral_bonus) AS referral_bonus
+            FROM profits
+            WHERE client_id = ? AND profit IS NOT NULL
+            GROUP BY date
+        )
+        GROUP BY bucket
+        HAVING bucket IS NOT NULL
+        ORDER BY bucket
+    """, (int(client_id),)).fetchall()
+    return {
+        "x": [r[0] for r in rows],
+        "profit": [r[1] for r in rows],
+        "client_share": [r[2] for r in rows],
+        "referral_bonus": [r[3] for r in rows],
+    }
+
+
+def client_equity_series(client_id, start_balance=0.0, bucket="day"):
+    """Equity curve: start balance plus the running sum of recorded profit."""
+    series = client_profit_series(client_id, bucket)
+    equity, running = [], float(start_balance or 0)
+    for p in series["profit"]:
+        running += p
+        equity.append(running)
+    return {"x": series["x"], "equity": equity}
@@ -0,0 +1,55 @@
+"""Checks of the core modules, run against a throw-away synthetic database.
+
+Each check is a module of this package.  It generates a small database with
+core/synthetic.py in a temporary directory, points the connection pool at it
+(``KMFX_DB_PATH``) and exercises one module the way the pages and background
+threads use it.  It prints what it verified and exits 1 if anything is off.
+The core modules are imported only once the database exists, so each check
+runs in a process of its own:
+
+    python -m scripts                    # every check (run from the app directory)
+    python -m scripts.query_plans        # one of them
+"""
+import contextlib
+import os
+import sys
+import tempfile
+
+CLIENTS = 500
+
+
+@contextlib.contextmanager
+def scratch_database(clients=CLIENTS, seed=0):
+    """Path of a synthetic database of ``clients`` clients, deleted on exit.  Call it before
+    importing anything from core: core/db.py reads ``KMFX_DB_PATH`` once."""
+    if "core.db" in sys.modules:
+        raise RuntimeError("scratch_database() must run before core.db is imported")
+    with tempfile.TemporaryDirectory(prefix="kmfx-check-") as directory:
+        path = os.path.join(directory, "kmfx_check.db")
+        os.environ["KMFX_DB_PATH"] = path
+        from core import synthetic
+        synthetic.generate(path, synthetic.Profile(clients=clients), seed=seed, progress=lambda message: None)
+        try:
+            yield path
+        finally:
+            # Write what the background writers hold while the file still exists
+            from core import auditlog, db, perf, slowlog
+            auditlog.flush()
+            perf.flush()
+            slowlog.flush()
+            db.get_pool().close_all()
+
+
+class Checker:
+    """Collects the outcome of each check; ``exit()`` ends the process with 1 if one failed."""
+
+    def __init__(self):
+        self.failed = 0
+
+    def check(self, ok, what):
+        print(f"{'ok  ' if ok else 'FAIL'} {what}")
+        self.failed += not ok
+        return ok
+
+    def exit(self):
+        sys.exit(1 if self.failed else 0)
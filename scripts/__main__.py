@@ -0,0 +1,28 @@
+"""Run every check of the package, each in a process of its own.
+
+    python -m scripts [name ...]        # run from the app directory
+"""
+import subprocess
+import sys
+import time
+
+CHECKS = ["query_plans", "referral_closure", "event_feed", "audit_log", "profit_postings", "idle_sessions",
+          "connection_pool", "schema_bootstrap", "revenue_rollup", "profit_import", "statement_cache",
+          "client_grid", "ledger_posting"]
+
+
+def main(args):
+    failed = []
+    for name in args or CHECKS:
+        print(f"=== {name}")
+        started = time.perf_counter()
+        code = subprocess.call([sys.executable, "-m", f"scripts.{name}"])
+        print(f"=== {name}: {'passed' if code == 0 else 'FAILED'} in {time.perf_counter() - started:.1f}s\n")
+        if code:
+            failed.append(name)
+    print(f"{len(args or CHECKS) - len(failed)} passed, {len(failed)} failed{': ' + ', '.join(failed) if failed else ''}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
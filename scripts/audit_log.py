@@ -0,0 +1,128 @@
+"""No-loss check of the buffered audit logger (core/auditlog.py).
+
+* Concurrent callers log through a small queue while another connection
+  holds the write lock for a while: every entry ends up in ``logs``
+  exactly once, queued or written inline, and ``close()`` returns only
+  once they are all in.
+* A process that logs and exits at once (no ``flush()``): the exit hook
+  writes everything it queued.
+* A full queue while the database stays locked: ``flush(timeout)`` gives
+  up after its timeout instead of waiting for room, and ``close()`` waits
+  for callers still waiting for room, so their entries are written too.
+* An entry the database refuses for good (a value it cannot store) costs
+  its batch, counted as ``failed``, and the writer keeps going: entries
+  logged after it are written.
+
+    python -m scripts.audit_log [--callers N] [--entries N]
+"""
+import subprocess
+import sys
+import threading
+import time
+
+from scripts import Checker, scratch_database
+
+CALLERS = 8
+ENTRIES = 500                # per caller
+LOCK_SECONDS = 1.5           # under the 5 s busy timeout: writes wait, they do not fail
+
+# Logs and exits straight away; atexit has to write the queue
+_EXITING = """
+import sys
+from core import auditlog
+for i in range(int(sys.argv[1])):
+    auditlog.log("Check Exit", f"exit entry {i}")
+"""
+
+
+def _count(conn, action):
+    return conn.execute("SELECT COUNT(*), COUNT(DISTINCT details) FROM logs WHERE action = ?", (action,)).fetchone()
+
+
+def main(args):
+    callers = int(args[args.index("--callers") + 1]) if "--callers" in args else CALLERS
+    entries = int(args[args.index("--entries") + 1]) if "--entries" in args else ENTRIES
+    checker = Checker()
+    with scratch_database():
+        from core import auditlog, db
+        conn = db.connect()
+
+        # Concurrent callers, queue of 100, the database locked for a while
+        logger = auditlog.AuditLogger(interval_ms=50, batch=200, size=100, overflow="block")
+        blocker = db.connect()
+        blocker.execute("BEGIN IMMEDIATE")
+        unlock = threading.Timer(LOCK_SECONDS, blocker.rollback)
+        unlock.start()
+
+        def call(caller):
+            for i in range(entries):
+                logger.log("Check Concurrent", f"caller {caller} entry {i}", "System")
+        threads = [threading.Thread(target=call, args=(c,)) for c in range(callers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.close()
+        unlock.join()
+        blocker.close()
+        stats = logger.stats()
+        total, distinct = _count(conn, "Check Concurrent")
+        print(f"{callers} callers x {entries} entries in {time.perf_counter() - started:.1f}s: "
+              f"{stats['written']} written in {stats['batches']} batches, {stats['inline']} inline, "
+              f"peak queue {stats['max_depth']}/{stats['capacity']}")
+        checker.check(total == distinct == callers * entries, f"{total} of {callers * entries} entries "
+                      f"in logs, {total - distinct} duplicated")
+        checker.check(stats["written"] + stats["inline"] == callers * entries and not stats["failed"],
+                      "stats count every entry as written or inline, none failed")
+        checker.check(not stats["running"], "close() stopped the writer thread")
+
+        # A process that exits without flushing
+        exit_entries = 2000
+        code = subprocess.call([sys.executable, "-c", _EXITING, str(exit_entries)])
+        total, distinct = _count(conn, "Check Exit")
+        checker.check(code == 0 and total == distinct == exit_entries,
+                      f"exit without flush(): {total} of {exit_entries} entries written by the exit hook")
+
+        # A full queue behind a locked database: flush() keeps to its timeout, close() loses nothing
+        logger = auditlog.AuditLogger(interval_ms=50, batch=5, size=5, overflow="block")
+        blocker = db.connect()
+        blocker.execute("BEGIN IMMEDIATE")
+        waiting = [threading.Thread(target=logger.log, args=("Check Full", f"entry {i}")) for i in range(20)]
+        for thread in waiting:
+            thread.start()
+        time.sleep(0.2)
+        started = time.perf_counter()
+        flushed = logger.flush(timeout=0.5)
+        took = time.perf_counter() - started
+        checker.check(not flushed and took < 1.0, f"flush(timeout=0.5) on a full queue returned False in {took:.2f}s")
+        unlock = threading.Timer(LOCK_SECONDS, blocker.rollback)
+        unlock.start()
+        logger.close(timeout=30)
+        for thread in waiting:
+            thread.join()
+        unlock.join()
+        blocker.close()
+        total, distinct = _count(conn, "Check Full")
+        checker.check(total == distinct == 20 and not logger.stats()["running"],
+                      f"close() with callers waiting for room: {total} of 20 entries written, writer stopped")
+
+        # A value SQLite cannot bind: the batch is dropped, the writer keeps draining
+        logger = auditlog.AuditLogger(interval_ms=50)
+        logger.log("Check Failed", {"not": "a string"})
+        logger.flush(timeout=10)
+        for i in range(100):
+            logger.log("Check After Failure", f"entry {i}")
+        flushed = logger.flush(timeout=10)
+        stats = logger.stats()
+        logger.close()
+        total, _ = _count(conn, "Check After Failure")
+        checker.check(stats["failed"] == 1 and _count(conn, "Check Failed")[0] == 0,
+                      f"the refused entry was dropped and counted ({stats['failed']} failed)")
+        checker.check(flushed and total == 100, f"the writer kept going: {total} of 100 later entries written")
+        conn.close()
+    checker.exit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,103 @@
+"""All Clients grid: the whole clients table formatted in pandas vs one page from SQL.
+
+Client Management's "All Clients" tab used to load every client, copy the
+frame, format three currency columns and two dates with per-row
+conversions and hand it all to ``st.dataframe``.  It now asks
+``queries.client_page`` / ``queries.client_count`` for the one page on
+screen, filtered, sorted and paged in SQL, and leaves the currency and date
+formats to the column config.
+
+Each view is timed cold (no cache) up to the bytes ``st.dataframe`` sends
+to the browser, ``--runs`` times: the old full load, then the first page,
+the last page, a sort by equity and a name search, with the default page of
+50 rows.  A page has to be the same rows, in the same order, as the slice
+of the whole table sorted the same way in pandas.
+
+    python -m scripts.client_grid [--clients N] [--runs N]    # --clients 50000 for the 50k benchmark
+"""
+import sys
+import time
+
+import pandas as pd
+
+from scripts import CLIENTS, Checker, scratch_database
+
+RUNS = 5
+PAGE_SIZE = 50
+
+
+def _old_grid(conn):
+    # The tab as it was: the whole table, copied and formatted row by row
+    df_clients = pd.read_sql("SELECT * FROM clients", conn)
+    display = df_clients.copy()
+    display['current_equity'] = display['current_equity'].apply(lambda x: f"${x:,.2f}")
+    display['withdrawable_balance'] = display['withdrawable_balance'].apply(lambda x: f"${x:,.2f}")
+    display['start_balance'] = display['start_balance'].apply(lambda x: f"${x:,.2f}")
+    display['add_date'] = pd.to_datetime(display['add_date'], errors='coerce').dt.strftime('%b %d, %Y')
+    display['expiry'] = pd.to_datetime(display['expiry'], errors='coerce').dt.strftime('%b %d, %Y')
+    cols = ['name', 'type', 'mobile_number', 'address', 'accounts', 'referral_code', 'referred_by',
+            'current_equity', 'withdrawable_balance', 'start_balance', 'add_date', 'expiry']
+    return display[[c for c in cols if c in display.columns]]
+
+
+def _new_grid(text="", sort="Name", descending=False, page=1):
+    # The tab now: a count, one page, dates parsed for the DateColumn
+    from core import queries
+    total = queries.client_count(text, None)
+    offset = (min(page, max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)) - 1) * PAGE_SIZE
+    display = queries.client_page(text, None, sort, descending, PAGE_SIZE, offset)
+    display['add_date'] = pd.to_datetime(display['add_date'], errors='coerce')
+    display['expiry'] = pd.to_datetime(display['expiry'], errors='coerce')
+    return display
+
+
+def _timed(view, runs):
+    from streamlit.dataframe_util import convert_pandas_df_to_arrow_bytes
+    started = time.perf_counter()
+    for _ in range(runs):
+        frame = view()
+        sent = convert_pandas_df_to_arrow_bytes(frame.drop(columns=["id"], errors="ignore"))
+    return (time.perf_counter() - started) / runs, frame, len(sent)
+
+
+def main(args):
+    clients = int(args[args.index("--clients") + 1]) if "--clients" in args else CLIENTS
+    runs = int(args[args.index("--runs") + 1]) if "--runs" in args else RUNS
+    checker = Checker()
+    with scratch_database(clients=clients):
+        from core.db import get_conn
+        conn = get_conn()
+        everyone = pd.read_sql("SELECT * FROM clients", conn)
+        last_page = (len(everyone) + PAGE_SIZE - 1) // PAGE_SIZE
+        name = everyone["name"].iloc[len(everyone) // 2].split()[0]
+
+        before, _, sent = _timed(lambda: _old_grid(conn), runs)
+        print(f"{len(everyone):,} clients, {runs} runs per view")
+        print(f"{'whole table':<20} {before * 1000:9.2f} ms, {sent / 1024:9,.0f} KiB to the browser")
+        slowest = 0.0
+        for label, kwargs, key in [
+            ("first page", {}, ["name", "id"]),
+            ("last page", {"page": last_page}, ["name", "id"]),
+            ("top equity", {"sort": "Equity", "descending": True}, ["current_equity", "id"]),
+            (f"search '{name}'", {"text": name}, None),
+        ]:
+            after, page, sent = _timed(lambda: _new_grid(**kwargs), runs)
+            slowest = max(slowest, after)
+            print(f"{label:<20} {after * 1000:9.2f} ms, {sent / 1024:9,.0f} KiB to the browser "
+                  f"({before / max(after, 1e-9):.0f}x faster)")
+            if key:
+                descending = kwargs.get("descending", False)
+                start = (kwargs.get("page", 1) - 1) * PAGE_SIZE
+                expected = everyone.sort_values(key, ascending=not descending, kind="stable")["id"]
+                checker.check(page["id"].tolist() == expected.iloc[start:start + PAGE_SIZE].tolist(),
+                              f"{label}: the same {len(page)} clients, in the same order, as pandas")
+            else:
+                checker.check(len(page) and page["name"].str.contains(name).all(),
+                              f"{label}: {len(page)} clients on the page, every one matching")
+        checker.check(slowest < before, f"the slowest page view is {before / max(slowest, 1e-9):.0f}x faster "
+                      f"than the whole table")
+    checker.exit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,130 @@
+"""Read / write throughput of N simulated sessions: one shared connection vs the pool.
+
+The app used to open a single module-level connection (rollback journal,
+default pragmas) that every session thread shared.  Sharing one connection
+between threads is only safe one call at a time, so the "shared" run puts a
+lock around it, the way such an app has to.  The "pool" run gives every
+session thread its own connection from core/db.py (WAL, busy timeout,
+synchronous=NORMAL, bigger page cache).
+
+Each session loops for ``--seconds``: ``READS_PER_WRITE`` page reads
+(the session's client row, its earnings totals, its notification
+signature), then one write transaction (a notification, committed).
+Reported: reads and writes per second and the read latency, which
+includes waiting for the shared connection or a writer.
+
+    python -m scripts.connection_pool [--sessions N] [--seconds N]
+"""
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+
+from scripts import Checker, scratch_database
+
+SESSIONS = 8
+SECONDS = 5.0
+READS_PER_WRITE = 9
+
+READS = [
+    "SELECT * FROM clients WHERE id = ?",
+    "SELECT COUNT(*), COALESCE(SUM(client_share), 0), COALESCE(SUM(referral_bonus), 0) FROM profits WHERE client_id = ?",
+    "SELECT COALESCE(MAX(id), 0), COUNT(*), COALESCE(SUM(read = 0), 0) FROM notifications WHERE client_id = ?",
+]
+WRITE = ("INSERT INTO notifications (client_id, title, message, category, date, read) "
+         "VALUES (?, 'Check', ?, 'System', datetime('now'), 0)")
+
+
+def _run(sessions, seconds, client_ids, borrow, give_back):
+    """Sessions hammering through ``borrow() -> (conn, lock)``.  Returns (reads, writes, latencies, errors)."""
+    reads, writes, latencies, errors = [0], [0], [], []
+    counted = threading.Lock()
+    start = threading.Barrier(sessions)
+
+    def session(number):
+        rng = random.Random(number)
+        start.wait()
+        deadline = time.monotonic() + seconds
+        try:
+            while time.monotonic() < deadline:
+                client_id = rng.choice(client_ids)
+                for i in range(READS_PER_WRITE):
+                    started = time.perf_counter()
+                    conn, lock = borrow()
+                    with lock:
+                        conn.execute(READS[i % len(READS)], (client_id,)).fetchall()
+                    elapsed = time.perf_counter() - started
+                    with counted:
+                        reads[0] += 1
+                        latencies.append(elapsed)
+                conn, lock = borrow()
+                with lock:
+                    conn.execute(WRITE, (client_id, f"session {number}"))
+                    conn.commit()
+                with counted:
+                    writes[0] += 1
+        except Exception as e:
+            errors.append(f"session {number}: {e!r}")
+        finally:
+            give_back()
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return reads[0], writes[0], latencies, errors
+
+
+def main(args):
+    sessions = int(args[args.index("--sessions") + 1]) if "--sessions" in args else SESSIONS
+    seconds = float(args[args.index("--seconds") + 1]) if "--seconds" in args else SECONDS
+    checker = Checker()
+    with scratch_database() as path:
+        from core.db import get_conn, release_conn
+        client_ids = [r[0] for r in get_conn().execute("SELECT id FROM clients")]
+        before = get_conn().execute("SELECT COUNT(*) FROM notifications").fetchone()[0]
+
+        # The old setup on a copy of its own: rollback journal, default pragmas, one connection
+        shared_path = os.path.join(os.path.dirname(path), "shared.db")
+        get_conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        shutil.copy(path, shared_path)
+        shared = sqlite3.connect(shared_path, check_same_thread=False)
+        shared.execute("PRAGMA journal_mode=DELETE")
+        shared_lock = threading.Lock()
+        own = threading.local()
+
+        def pooled():
+            # A connection of the thread's own: its lock is never contended
+            if not hasattr(own, "lock"):
+                own.lock = threading.Lock()
+            return get_conn(), own.lock
+
+        results = {}
+        for name, borrow, give_back in [("shared", lambda: (shared, shared_lock), lambda: None),
+                                        ("pool", pooled, release_conn)]:
+            reads, writes, latencies, errors = _run(sessions, seconds, client_ids, borrow, give_back)
+            latencies.sort()
+            p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+            results[name] = (reads, writes)
+            print(f"{name:<7} {sessions} sessions x {seconds:g}s: {reads / seconds:>8,.0f} reads/s "
+                  f"{writes / seconds:>7,.0f} writes/s  read latency p50 "
+                  f"{statistics.median(latencies) * 1000 if latencies else 0:.2f} ms, p95 {p95 * 1000:.2f} ms")
+            checker.check(not errors, f"{name}: no session failed{': ' + errors[0] if errors else ''}")
+        shared_count = shared.execute("SELECT COUNT(*) FROM notifications").fetchone()[0] - before
+        pool_count = get_conn().execute("SELECT COUNT(*) FROM notifications").fetchone()[0] - before
+        shared.close()
+        checker.check(shared_count == results["shared"][1] and pool_count == results["pool"][1],
+                      f"every write committed ({shared_count} shared, {pool_count} pooled)")
+        checker.check(results["pool"][0] > results["shared"][0] and results["pool"][1] > results["shared"][1],
+                      f"the pool moves more: reads x{results['pool'][0] / max(results['shared'][0], 1):.1f}, "
+                      f"writes x{results['pool'][1] / max(results['shared'][1], 1):.1f}")
+    checker.exit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
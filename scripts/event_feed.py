@@ -0,0 +1,130 @@
+"""Ordering check of the change feed under concurrent writers and readers.
+
+Writer threads post messages the way the Messages page does: the message
+row and its ``message.to_client`` event in one transaction, one in
+``ROLLBACK_EVERY`` rolled back, some holding the transaction open a little.
+Every ``ANNOUNCE_EVERY``-th post is an ``announcement.posted`` event for
+everybody instead.  Meanwhile subscribers poll with a small page size: one
+for all topics, one per client for that client's topics.  At the end:
+
+* each subscriber got every committed event it is meant to see exactly
+  once, in id order, and nothing else;
+* no event of a rolled-back transaction was ever seen, and the message of
+  every event seen exists;
+* each writer's events appear in the order its transactions committed.
+
+    python -m scripts.event_feed [--writers N] [--posts N]
+"""
+import random
+import sys
+import threading
+import time
+
+from scripts import Checker, scratch_database
+
+WRITERS = 6
+POSTS = 150                  # per writer
+ROLLBACK_EVERY = 7
+ANNOUNCE_EVERY = 5
+CLIENTS = 4                  # clients the messages go to, each with a subscriber
+PAGE = 7                     # poll page size, small so the feed is read in several pages
+
+
+def main(args):
+    writers = int(args[args.index("--writers") + 1]) if "--writers" in args else WRITERS
+    posts = int(args[args.index("--posts") + 1]) if "--posts" in args else POSTS
+    checker = Checker()
+    with scratch_database():
+        from core import events
+        from core.db import get_conn, release_conn
+        client_ids = [r[0] for r in get_conn().execute("SELECT id FROM clients ORDER BY id LIMIT ?", (CLIENTS,))]
+        topics = ("message.to_client", "announcement.posted")
+        subscribers = [("everything", events.Subscription(topics, cursor=events.latest_id(get_conn())))]
+        subscribers += [(f"client {i}", events.Subscription(topics, client_id=i, cursor=subscribers[0][1].cursor))
+                        for i in client_ids]
+        received = {name: [] for name, _ in subscribers}
+        committed, rolled_back, errors = [], [], []
+        lock = threading.Lock()
+        writing = threading.Event()
+        writing.set()
+
+        def write(writer):
+            rng = random.Random(writer)
+            conn = get_conn()
+            try:
+                for seq in range(posts):
+                    client_id = rng.choice(client_ids)
+                    if seq % ANNOUNCE_EVERY == 0:
+                        topic, to = "announcement.posted", None
+                    else:
+                        topic, to = "message.to_client", client_id
+                    message_id = conn.execute("""
+                        INSERT INTO messages (from_admin, to_client_id, message, timestamp, read)
+                        VALUES ('Check', ?, ?, datetime('now'), 0)
+                    """, (client_id, f"writer {writer} post {seq}")).lastrowid
+                    event_id = events.publish(conn, topic, to, writer=writer, seq=seq, message_id=message_id)
+                    if rng.random() < 0.2:
+                        time.sleep(0.002)    # commit late: later ids may be taken meanwhile
+                    if seq % ROLLBACK_EVERY == ROLLBACK_EVERY - 1:
+                        conn.rollback()
+                        with lock:
+                            rolled_back.append((writer, seq))
+                    else:
+                        conn.commit()
+                        with lock:
+                            committed.append((event_id, topic, to, writer, seq))
+            except Exception as e:
+                errors.append(f"writer {writer}: {e!r}")
+            finally:
+                release_conn()
+
+        def read(name, subscription):
+            conn = get_conn()
+            try:
+                while True:
+                    done = not writing.is_set()    # read once more after the writers stopped
+                    received[name].extend(subscription.poll(conn, limit=PAGE))
+                    if done and subscription.cursor >= events.latest_id(conn):
+                        return
+            except Exception as e:
+                errors.append(f"subscriber {name}: {e!r}")
+            finally:
+                release_conn()
+
+        readers = [threading.Thread(target=read, args=s) for s in subscribers]
+        threads = [threading.Thread(target=write, args=(w,)) for w in range(writers)]
+        started = time.perf_counter()
+        for thread in readers + threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writing.clear()
+        for thread in readers:
+            thread.join()
+        print(f"{len(committed)} events committed, {len(rolled_back)} rolled back by {writers} writers "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        checker.check(not errors, f"no writer or subscriber failed{': ' + '; '.join(errors[:3]) if errors else ''}")
+        committed.sort()
+        for name, subscription in subscribers:
+            got = [e.id for e in received[name]]
+            expected = [e[0] for e in committed if subscription.client_id is None or e[2] in (None, subscription.client_id)]
+            checker.check(got == expected, f"{name}: {len(got)} events, each committed one exactly once in id order"
+                          + ("" if got == expected else f" (missing {sorted(set(expected) - set(got))[:5]}, "
+                                                        f"extra {sorted(set(got) - set(expected))[:5]})"))
+        # A rolled-back id is handed out again, so events are told apart by their payload
+        seen = {e.id: e for batch in received.values() for e in batch}
+        posts_seen = {(e.payload["writer"], e.payload["seq"]) for e in seen.values()}
+        checker.check(not set(rolled_back) & posts_seen, "no event of a rolled-back transaction was seen")
+        messages = dict(get_conn().execute("SELECT id, message FROM messages WHERE from_admin = 'Check'").fetchall())
+        checker.check(all(messages.get(e.payload["message_id"]) == f"writer {e.payload['writer']} post {e.payload['seq']}"
+                          for e in seen.values()), "the message of every event seen exists")
+        in_order = all(
+            [e[4] for e in committed if e[3] == writer] == sorted(e[4] for e in committed if e[3] == writer)
+            for writer in range(writers))
+        checker.check(in_order, "each writer's events are in the order its transactions committed")
+    checker.exit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,159 @@
+"""CPU cost of idle client sessions: full reruns every second vs fragment polling.
+
+An idle client tab used to keep the Notifications page alive by sleeping a
+second and rerunning the whole script, bootstrap included.  It now sits
+still; two ``st.fragment(run_every=POLL_SECONDS)`` blocks poll instead: the
+event feed toasts (streamlit_app.py) and the notification list
+(views/notification_center.py), which re-reads its rows only when the
+signature query moves.
+
+Both patterns are run for ``--sessions`` client sessions at once, each on a
+thread of its own, for ``--seconds`` each, with Streamlit's AppTest:
+
+* reruns: the whole app on the Notifications page, once a second per session;
+* polling: one tick of the two fragments (the feed poll, then the
+  Notifications page, whose run is the fragment body plus its header) every
+  ``POLL_SECONDS`` per session, started at random offsets.
+
+AppTest keeps one runtime per process, so the runs of all sessions take
+turns; each still starts on its own schedule.  The process CPU time over
+the window (every thread) is reported per client, as ms of CPU per second
+of idling, less what the process burns over the same window with no session
+(background writers) and less AppTest's own cost per run (measured on an
+empty script), which a real server does not pay.
+
+    python -m scripts.idle_sessions [--sessions N] [--seconds N]
+"""
+import os
+import random
+import sys
+import threading
+import time
+
+from scripts import Checker, scratch_database
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+SESSIONS = 8
+SECONDS = 10.0
+RERUN_SECONDS = 1.0          # the old countdown: sleep one second, rerun the script
+
+
+def _empty():
+    # What AppTest itself costs per run, whatever the script
+    import streamlit as st
+    st.empty()
+
+
+def _fragment_tick():
+    # One run_every tick of both fragments of an idle client session
+    import streamlit as st
+
+    from core import events
+    from core.db import get_conn, release_conn
+    from views import notification_center
+
+    if 'event_sub' not in st.session_state:
+        st.session_state.event_sub = events.Subscription(events.CLIENT_TOPICS, client_id=st.session_state.client_id)
+    for event in st.session_state.event_sub.poll(get_conn()):
+        st.toast(event.payload.get('text', event.topic))
+    notification_center.render("Notifications")
+    release_conn()
+
+
+def _idle(make, period, seconds, sessions, rng):
+    """Run ``sessions`` AppTests, each every ``period`` seconds, for ``seconds``.
+    Returns (CPU seconds, runs, errors)."""
+    tests = [make(i) for i in range(sessions)]
+    for at in tests:
+        at.run()                 # first visit: imports and the page's first load, not idling
+    runs, errors = [0], []
+    lock = threading.Lock()      # AppTest's runtime is a process-wide singleton: one run at a time
+    start = threading.Barrier(sessions + 1)
+
+    def session(at, offset):
+        start.wait()
+        deadline = time.monotonic() + seconds
+        next_run = time.monotonic() + offset
+        while True:
+            time.sleep(max(0.0, next_run - time.monotonic()))
+            if time.monotonic() >= deadline:
+                return
+            with lock:
+                at.run()
+                runs[0] += 1
+                if at.exception:
+                    errors.append(at.exception[0].message)
+            next_run += period
+
+    threads = [threading.Thread(target=session, args=(at, rng.uniform(0, period))) for at in tests]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    cpu = time.process_time()
+    for thread in threads:
+        thread.join()
+    return time.process_time() - cpu, runs[0], errors
+
+
+def main(args):
+    sessions = int(args[args.index("--sessions") + 1]) if "--sessions" in args else SESSIONS
+    seconds = float(args[args.index("--seconds") + 1]) if "--seconds" in args else SECONDS
+    rng = random.Random(0)
+    checker = Checker()
+    with scratch_database():
+        # The menu is a custom component AppTest cannot click: it answers the page under test
+        import streamlit_option_menu
+        streamlit_option_menu.option_menu = lambda menu_title=None, options=(), **kw: (
+            "Notifications" if "Notifications" in options else options[0])
+        from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+        from streamlit.testing.v1 import AppTest, app_test, local_script_runner
+
+        from core import notifications
+        from core.db import get_conn
+
+        # The server compiles the main script once per process; AppTest would on every run
+        script_cache = ScriptCache()
+        app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+        client_ids = rng.sample([r[0] for r in get_conn().execute("SELECT id FROM clients")], sessions)
+
+        def session(at, client_id):
+            at.secrets["KEEP_ALIVE"] = False
+            for key, value in dict(authenticated=True, is_owner=False, is_admin=False,
+                                   client_id=client_id, current_client=None).items():
+                at.session_state[key] = value
+            return at
+
+        cpu = time.process_time()
+        time.sleep(seconds)
+        baseline = time.process_time() - cpu
+        at = AppTest.from_function(_empty, default_timeout=120)
+        at.run()
+        cpu = time.process_time()
+        for _ in range(20):
+            at.run()
+        harness = (time.process_time() - cpu) / 20
+        print(f"no session: {baseline:.2f}s CPU in {seconds:g}s; AppTest harness: {harness * 1000:.1f} ms CPU per run")
+
+        results = {}
+        for name, make, period in [
+            ("reruns", lambda i: session(AppTest.from_file(APP, default_timeout=120), client_ids[i]), RERUN_SECONDS),
+            ("polling", lambda i: session(AppTest.from_function(_fragment_tick, default_timeout=120), client_ids[i]),
+             notifications.POLL_SECONDS),
+        ]:
+            cpu, runs, errors = _idle(make, period, seconds, sessions, rng)
+            net = max(0.0, cpu - baseline - runs * harness)
+            per_client = net / sessions / seconds * 1000
+            results[name] = per_client
+            print(f"{name:<8} {sessions} sessions x {seconds:g}s, one run every {period:g}s: {runs} runs, "
+                  f"{cpu:.2f}s CPU ({net / max(runs, 1) * 1000:.1f} ms per run without the harness) -> "
+                  f"{per_client:.1f} ms CPU per idle client per second "
+                  f"({per_client / 10:.2f}% of a core)")
+            checker.check(not errors and runs, f"{name}: {runs} runs, none raised{': ' + errors[0] if errors else ''}")
+        checker.check(results["polling"] < results["reruns"],
+                      f"fragment polling costs {results['reruns'] / max(results['polling'], 1e-9):.0f}x less CPU "
+                      f"per idle client than a rerun every second")
+    checker.exit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
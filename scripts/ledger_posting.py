@@ -0,0 +1,152 @@
+"""Ledger posting throughput and how long reconciliation holds the write lock (core/ledger.py).
+
+Balances used to move with scattered ``UPDATE clients SET x = x + ?`` and a
+commit each.  Every movement is now an entry appended by ``ledger.post`` in
+one ``BEGIN IMMEDIATE`` transaction, with the projection on ``clients``
+updated by a trigger.
+
+* Posting: ``--postings`` single movements (a withdrawal paid, a bonus, an
+  adjustment) are applied the old way on a copy of the database and through
+  ``ledger.post`` (with and without an idempotency key), then as one batch
+  posting.  Both copies have to end with the same balances, and the ledger
+  has to verify clean.
+* Reconciliation: ``ledger.reconcile`` runs while a session keeps posting
+  one movement at a time.  The verify reads without the write lock and the
+  snapshots move ``RECONCILE_CHUNK`` clients per transaction, so postings
+  only wait for one chunk at a time.  Reported: the reconcile time and
+  what each posting alongside took; none may fail, and no drift is found.
+
+    python -m scripts.ledger_posting [--clients N] [--postings N]
+"""
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+
+from scripts import CLIENTS, Checker, scratch_database
+
+POSTINGS = 2000
+TOLERANCE = 1e-6
+
+
+def _movements(rng, client_ids, count):
+    """(client_id, equity, withdrawable) of ``count`` small money movements."""
+    moves = []
+    for _ in range(count):
+        amount = round(rng.uniform(1, 200), 2)
+        moves.append(rng.choice([(rng.choice(client_ids), 0.0, -amount),      # withdrawal paid
+                                 (rng.choice(client_ids), 0.0, amount),       # referral bonus
+                                 (rng.choice(client_ids), amount, 0.0)]))     # adjustment
+    return moves
+
+
+def _old_update(conn, client_id, equity, withdrawable):
+    # The in-place update the pages used to run, one commit per movement
+    conn.execute("""UPDATE clients
+                    SET current_equity = current_equity + ?,
+                        withdrawable_balance = withdrawable_balance + ?
+                    WHERE id = ?""", (equity, withdrawable, client_id))
+    conn.commit()
+
+
+def _timed(apply, moves):
+    started = time.perf_counter()
+    for move in moves:
+        apply(*move)
+    return time.perf_counter() - started
+
+
+def main(args):
+    clients = int(args[args.index("--clients") + 1]) if "--clients" in args else CLIENTS
+    count = int(args[args.index("--postings") + 1]) if "--postings" in args else POSTINGS
+    rng = random.Random(0)
+    checker = Checker()
+    with scratch_database(clients=clients) as path:
+        from core import ledger
+        from core.db import connect, get_conn
+        conn = get_conn()
+        client_ids = [r[0] for r in conn.execute("SELECT id FROM clients")]
+        moves = _movements(rng, client_ids, count)
+
+        # === Posting throughput ===
+        old_path = os.path.join(os.path.dirname(path), "in_place.db")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        shutil.copy(path, old_path)
+        old = connect(old_path)
+        before = _timed(lambda *move: _old_update(old, *move), moves)
+        # Twice more, untimed: the ledger below gets the movements three times
+        for _ in range(2):
+            old.executemany("UPDATE clients SET current_equity = current_equity + ?, "
+                            "withdrawable_balance = withdrawable_balance + ? WHERE id = ?",
+                            [(equity, withdrawable, client_id) for client_id, equity, withdrawable in moves])
+        old.commit()
+
+        def post(client_id, equity, withdrawable, key=None):
+            ledger.post(conn, [ledger.Entry(client_id, equity, withdrawable, "adjustment", memo="check")], key=key)
+        after = _timed(post, moves)
+        keys = iter(range(count))
+        keyed = _timed(lambda *move: post(*move, key=ledger.posting_key("check", next(keys))), moves)
+        started = time.perf_counter()
+        ledger.post(conn, [ledger.Entry(client_id, equity, withdrawable, "adjustment", memo="check batch")
+                           for client_id, equity, withdrawable in moves])
+        batch = time.perf_counter() - started
+
+        print(f"{count} movements over {len(client_ids)} clients")
+        for label, seconds in [("UPDATE in place", before), ("ledger.post", after),
+                               ("ledger.post + key", keyed), ("one batch posting", batch)]:
+            print(f"{label:<18} {seconds:7.3f}s  {count / seconds:>9,.0f} movements/s")
+        print(f"ledger.post costs {after / before:.1f}x the in-place UPDATE per movement, "
+              f"a batch posting {batch / before:.2f}x")
+        ledger_balances = ledger.balances(conn)
+        old_after = dict((cid, (eq, wd)) for cid, eq, wd in old.execute(
+            "SELECT id, current_equity, withdrawable_balance FROM clients"))
+        old.close()
+        off = [cid for cid in old_after if abs(old_after[cid][0] - ledger_balances[cid][0]) > TOLERANCE
+               or abs(old_after[cid][1] - ledger_balances[cid][1]) > TOLERANCE]
+        checker.check(len(old_after) == len(client_ids) and not off,
+                      f"the ledger ends with the balances the in-place updates reach ({len(off)} clients off)")
+        problems = ledger.verify(conn)
+        checker.check(not problems, f"the ledger verifies clean ({len(problems)} problems)")
+
+        # === Reconciliation next to a posting session ===
+        waits, errors = [], []
+        posting = threading.Event()
+        posting.set()
+
+        def session():
+            own = connect()
+            try:
+                for client_id, equity, withdrawable in moves:
+                    if not posting.is_set():
+                        break
+                    started = time.perf_counter()
+                    ledger.post(own, [ledger.Entry(client_id, equity, withdrawable, "adjustment", memo="check")])
+                    waits.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(repr(e))
+            finally:
+                own.close()
+        reconciler = connect()
+        poster = threading.Thread(target=session)
+        poster.start()
+        time.sleep(0.05)
+        started = time.perf_counter()
+        drift = ledger.reconcile(reconciler)
+        took = time.perf_counter() - started
+        posting.clear()
+        poster.join()
+        reconciler.close()
+        waits.sort()
+        print(f"reconcile of {len(client_ids)} clients ({ledger.RECONCILE_CHUNK} per write transaction): "
+              f"{took * 1000:.1f} ms; {len(waits)} postings alongside, p50 {waits[len(waits) // 2] * 1000:.2f} ms, "
+              f"max {waits[-1] * 1000:.2f} ms")
+        checker.check(not drift and not errors and waits,
+                      f"reconcile saw no drift and every posting alongside went through{': ' + errors[0] if errors else ''}")
+        checker.check(not ledger.verify(conn), "the ledger still verifies clean after the reconcile")
+    checker.exit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
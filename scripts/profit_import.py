@@ -0,0 +1,135 @@
+"""Profit posting throughput: the old one-client-at-a-time button vs the batch engine.
+
+Month-end profits used to be recorded one client at a time with the
+"RECORD PROFIT / LOSS" button: a query for the client, a query per upline
+level for the bonus walk, an INSERT and an UPDATE per bonus and per profit,
+and a commit per client.  ``profits.post_profits`` now computes a whole
+batch with vectorized joins against the bonus chains and writes it in one
+transaction.
+
+The same ``--entries`` profits and losses are posted both ways, each on a
+copy of the same database: the old loop as it was (without its messages),
+and ``post_profits`` in one call.  Both have to write the same profits
+rows, in the same order, and leave every balance the same, bit for bit.
+
+    python -m scripts.profit_import [--clients N] [--entries N]
+"""
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+
+from scripts import CLIENTS, Checker, scratch_database
+
+ENTRIES = 500
+DATE = "2026-01-31"
+
+
+def _old_button(conn, client_id, profit, rec_date):
+    # The RECORD PROFIT / LOSS handler, as it was, minus its st.* messages
+    c = conn.cursor()
+    client = pd.read_sql(f"SELECT * FROM clients WHERE id = {client_id}", conn).iloc[0].to_dict()
+    if client['type'].strip() == "Pioneer":
+        client_share = profit * 0.75 if profit > 0 else 0.0
+    else:
+        client_share = profit * 0.65 if profit > 0 else 0.0
+    owner_share = profit - client_share
+    referral_total = 0.0
+    if profit > 0 and client['type'].strip() == "Regular":
+        current_id = client_id
+        level = 1
+        while level <= 3:
+            upline_query = pd.read_sql(f"SELECT referred_by FROM clients WHERE id = {current_id}", conn)
+            if upline_query.empty:
+                break
+            upline_referred_by = upline_query.iloc[0]['referred_by']
+            if pd.isna(upline_referred_by) or upline_referred_by in (0, None):
+                break
+            pioneer_id = int(upline_referred_by)
+            pioneer_row = pd.read_sql(f"SELECT name, type FROM clients WHERE id = {pioneer_id}", conn)
+            if pioneer_row.empty:
+                break
+            if pioneer_row.iloc[0]['type'].strip() != "Pioneer":
+                break
+            rate = {1: 0.06, 2: 0.03, 3: 0.01}[level]
+            bonus = profit * rate
+            referral_total += bonus
+            c.execute("""INSERT INTO profits
+                         (client_id, profit, date, referral_bonus, client_share, your_share)
+                         VALUES (?, ?, ?, ?, ?, ?)""",
+                      (pioneer_id, 0.0, rec_date, bonus, 0.0, 0.0))
+            c.execute("""UPDATE clients
+                         SET withdrawable_balance = withdrawable_balance + ?
+                         WHERE id = ?""",
+                      (bonus, pioneer_id))
+            current_id = pioneer_id
+            level += 1
+    owner_share -= referral_total
+    c.execute("""INSERT INTO profits
+                 (client_id, profit, date, client_share, your_share)
+                 VALUES (?, ?, ?, ?, ?)""",
+              (client_id, profit, rec_date, client_share, owner_share))
+    c.execute("""UPDATE clients
+                 SET current_equity = current_equity + ?,
+                     withdrawable_balance = withdrawable_balance + ?
+                 WHERE id = ?""",
+              (profit, client_share, client_id))
+    conn.commit()
+
+
+def _written(conn, after_id):
+    return conn.execute("""SELECT client_id, profit, date, client_share, your_share, COALESCE(referral_bonus, 0)
+                           FROM profits WHERE id > ? ORDER BY id""", (after_id,)).fetchall()
+
+
+def _balances(conn):
+    return conn.execute("SELECT id, current_equity, withdrawable_balance FROM clients ORDER BY id").fetchall()
+
+
+def main(args):
+    clients = int(args[args.index("--clients") + 1]) if "--clients" in args else CLIENTS
+    count = int(args[args.index("--entries") + 1]) if "--entries" in args else ENTRIES
+    rng = random.Random(0)
+    checker = Checker()
+    with scratch_database(clients=clients) as path:
+        from core import profits
+        from core.db import get_conn
+        conn = get_conn()
+        client_ids = [r[0] for r in conn.execute("SELECT id FROM clients")]
+        entries = [(rng.choice(client_ids), round(rng.uniform(-300, 900), 2) or 1.0, DATE) for _ in range(count)]
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM profits").fetchone()[0]
+
+        # The old button on a copy of its own, with the connection the app used to open
+        loop_path = os.path.join(os.path.dirname(path), "loop.db")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        shutil.copy(path, loop_path)
+        old = sqlite3.connect(loop_path, check_same_thread=False)
+        started = time.perf_counter()
+        for client_id, profit, date in entries:
+            _old_button(old, client_id, profit, date)
+        before = time.perf_counter() - started
+
+        started = time.perf_counter()
+        postings, bonuses, replayed = profits.post_profits(conn, entries)
+        after = time.perf_counter() - started
+
+        rows = len(postings) + len(bonuses)
+        print(f"{count} entries, {rows} profits rows ({len(bonuses)} bonuses)")
+        print(f"one at a time: {before:8.3f}s  {count / before:>9,.0f} entries/s")
+        print(f"batch:         {after:8.3f}s  {count / after:>9,.0f} entries/s")
+        written_old, written_new = _written(old, last_id), _written(conn, last_id)
+        checker.check(not replayed and written_old == written_new and len(written_new) == rows,
+                      f"both wrote the same {len(written_new)} profits rows, in the same order")
+        off = sum(a != b for a, b in zip(_balances(old), _balances(conn)))
+        checker.check(off == 0, f"every balance is the same, bit for bit ({off} clients differ)")
+        old.close()
+        checker.check(after < before, f"the batch engine posts {before / max(after, 1e-9):.0f}x faster")
+    checker.exit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
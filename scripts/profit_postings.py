@@ -0,0 +1,189 @@
+"""Concurrency and idempotency check of profit posting (core/profits.py, core/ledger.py).
+
+* Racing retries: several threads post the same batch with the same key at
+  the same moment.  Exactly one writes it; the others get ``replayed``,
+  with the postings and bonuses the writing one returned.
+* Parallel postings: threads post batches with keys of their own while the
+  ledger reconcile (core/ledger.py) moves the snapshots forward.  The
+  balances move by exactly what the returned postings and bonuses say,
+  the ledger verifies clean and reconcile never reports drift.  A posting
+  that waited out the busy timeout is retried with its key, as a user
+  clicking again would be: it still posts once.
+* Failure: a posting that raises inside its transaction leaves nothing
+  behind, not even its key, so the retry with the same key goes through.
+
+    python -m scripts.profit_postings [--threads N] [--batches N]
+"""
+import random
+import sqlite3
+import sys
+import threading
+import time
+
+from scripts import Checker, scratch_database
+
+THREADS = 8
+BATCHES = 25                 # per thread
+BATCH_SIZE = 20
+TOLERANCE = 1e-6
+ATTEMPTS = 5                 # tries of one posting that keeps finding the database locked
+RECONCILE_PAUSE = 0.05       # seconds between reconcile passes
+
+
+def _batch(rng, client_ids):
+    return [(rng.choice(client_ids), round(rng.uniform(-300, 900), 2) or 1.0, "2026-01-15")
+            for _ in range(BATCH_SIZE)]
+
+
+def _deltas(postings, bonuses):
+    """{client_id: [equity, withdrawable]} a posting moves, from what post_profits returned."""
+    moved = {}
+    for client_id, profit, share in postings[["client_id", "profit", "client_share"]].itertuples(index=False):
+        delta = moved.setdefault(int(client_id), [0.0, 0.0])
+        delta[0] += profit
+        delta[1] += share
+    for pioneer_id, bonus in bonuses[["pioneer_id", "bonus"]].itertuples(index=False):
+        moved.setdefault(int(pioneer_id), [0.0, 0.0])[1] += bonus
+    return moved
+
+
+def _locked(error):
+    return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+
+def _counts(conn):
+    return conn.execute("SELECT (SELECT COUNT(*) FROM profits), (SELECT COUNT(*) FROM ledger_entries), "
+                        "(SELECT COUNT(*) FROM posting_keys)").fetchone()
+
+
+def main(args):
+    threads = int(args[args.index("--threads") + 1]) if "--threads" in args else THREADS
+    batches = int(args[args.index("--batches") + 1]) if "--batches" in args else BATCHES
+    rng = random.Random(0)
+    checker = Checker()
+    with scratch_database():
+        from core import ledger, profits
+        from core.db import connect, get_conn, release_conn
+        conn = get_conn()
+        client_ids = [r[0] for r in conn.execute("SELECT id FROM clients")]
+        errors = []
+
+        # === Racing retries of one batch ===
+        batch, key = _batch(rng, client_ids), ledger.posting_key("check", "race")
+        before = _counts(conn)
+        start = threading.Barrier(threads)
+        outcomes = []
+
+        def retry():
+            try:
+                start.wait()
+                outcomes.append(profits.post_profits(get_conn(), batch, key=key))
+            except Exception as e:
+                errors.append(f"retry: {e!r}")
+            finally:
+                release_conn()
+        workers = [threading.Thread(target=retry) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        written = [o for o in outcomes if not o[2]]
+        after = _counts(conn)
+        rows = len(written[0][0]) + len(written[0][1]) if written else 0
+        checker.check(not errors and len(written) == 1 and len(outcomes) == threads,
+                      f"{threads} racing retries: {len(written)} posted, {len(outcomes) - len(written)} replayed"
+                      f"{': ' + errors[0] if errors else ''}")
+        checker.check(after == (before[0] + rows, before[1] + rows, before[2] + 1),
+                      f"the batch was written once: {after[0] - before[0]} profits rows for {rows} postings")
+        same = [o for o in outcomes if o[2] and written and o[0].equals(written[0][0]) and o[1].equals(written[0][1])]
+        checker.check(len(same) == len(outcomes) - len(written),
+                      f"{len(same)} of {len(outcomes) - len(written)} replays returned the postings and bonuses written")
+
+        # === Parallel postings with their own keys, reconcile running ===
+        balances_before = ledger.balances(conn)
+        results, drift, retries = [], [], []
+        posting = threading.Event()
+        posting.set()
+
+        def post(thread):
+            thread_rng = random.Random(thread)
+            try:
+                for i in range(batches):
+                    entries, key = _batch(thread_rng, client_ids), ledger.posting_key("check", thread, i)
+                    for attempt in range(ATTEMPTS):
+                        try:
+                            postings, bonuses, replayed = profits.post_profits(get_conn(), entries, key=key)
+                            break
+                        except sqlite3.OperationalError as e:
+                            if not _locked(e) or attempt == ATTEMPTS - 1:
+                                raise
+                            retries.append(key)
+                    results.append((postings, bonuses, replayed, attempt))
+            except Exception as e:
+                errors.append(f"thread {thread}: {e!r}")
+            finally:
+                release_conn()
+
+        def reconcile():
+            own = connect()
+            try:
+                while posting.is_set():
+                    try:
+                        drift.extend(ledger.reconcile(own, chunk=100))
+                    except sqlite3.OperationalError as e:
+                        if not _locked(e):
+                            raise
+                        retries.append("reconcile")    # the scheduler tries again on its next run
+                    time.sleep(RECONCILE_PAUSE)
+            except Exception as e:
+                errors.append(f"reconcile: {e!r}")
+            finally:
+                own.close()
+        reconciler = threading.Thread(target=reconcile)
+        workers = [threading.Thread(target=post, args=(t,)) for t in range(threads)]
+        reconciler.start()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        posting.clear()
+        reconciler.join()
+
+        expected = dict(balances_before)
+        for postings, bonuses, _, _ in results:
+            for client_id, (equity, withdrawable) in _deltas(postings, bonuses).items():
+                expected[client_id] = (expected[client_id][0] + equity, expected[client_id][1] + withdrawable)
+        balances_after = ledger.balances(conn)
+        off = [cid for cid in expected if abs(expected[cid][0] - balances_after[cid][0]) > TOLERANCE
+               or abs(expected[cid][1] - balances_after[cid][1]) > TOLERANCE]
+        # Only a retry may find its key posted: the attempt before it committed, then reported locked
+        checker.check(not errors and len(results) == threads * batches and not any(r[2] and not r[3] for r in results),
+                      f"{len(results)} of {threads * batches} parallel batches posted, "
+                      f"{len(retries)} retried after the busy timeout{': ' + errors[0] if errors else ''}")
+        checker.check(not off, f"balances moved by exactly the returned postings ({len(off)} clients off)")
+        problems = ledger.verify(conn)
+        checker.check(not problems and not drift, f"ledger verifies clean, reconcile saw no drift "
+                      f"({len(problems)} problems, {len(drift)} drift)")
+
+        # === A posting that fails inside its transaction ===
+        before = _counts(conn)
+        key = ledger.posting_key("check", "failure")
+
+        def failing(conn):
+            conn.execute("INSERT INTO profits (client_id, profit, date, client_share, your_share, referral_bonus) "
+                         "VALUES (?, 1, '2026-01-15', 0.65, 0.35, 0)", (client_ids[0],))
+            raise RuntimeError("posting failed half-way")
+        try:
+            profits.record(conn, failing, key=key)
+            raised = False
+        except RuntimeError:
+            raised = True
+        checker.check(raised and _counts(conn) == before, "a failed posting wrote nothing, not even its key")
+        postings, bonuses, replayed = profits.post_profits(conn, _batch(rng, client_ids), key=key)
+        checker.check(not replayed and _counts(conn)[2] == before[2] + 1, "its retry with the same key posted")
+        checker.check(profits.post_profits(conn, batch, key=key)[2], "a third try with that key is a replay")
+    checker.exit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
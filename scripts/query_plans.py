@@ -0,0 +1,92 @@
+"""Query plans of the hot lookups with and without the indexes of migration 2.
+
+Each lookup is run through the module the pages call, and the statements it
+executes are captured with the statement observer of core/db.py.  Each one
+is then explained twice: on the migrated schema ("after"), and again with
+the migration 2 indexes dropped inside a transaction that is rolled back
+("before").  A lookup fails if its "after" plan still scans a whole table
+or builds an automatic index.  A "before" plan that does neither means a
+later index covers the lookup too.
+
+    python -m scripts.query_plans [--clients N]
+"""
+import re
+import sys
+
+from scripts import CLIENTS, Checker, scratch_database
+
+_INDEX_NAME = re.compile(r"CREATE (?:UNIQUE )?INDEX IF NOT EXISTS (\w+)")
+_SCANNED = re.compile(r"^\s*SCAN (?:TABLE )?(\w+)(?: AS \w+)?$", re.MULTILINE)
+
+
+def _scanned_tables(conn, plan):
+    """Tables ``plan`` reads row by row without an index (CTEs and subqueries are not tables)."""
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return sorted(set(_SCANNED.findall(plan)) & tables)
+
+
+def _hot_lookups(conn, client_id):
+    from core import notifications, queries, referrals
+    return [
+        ("profit history of a client", lambda: queries.profit_history(client_id)),
+        ("earnings totals of a client", lambda: queries.earnings_totals(client_id)),
+        ("message thread of a client", lambda: queries.message_thread(client_id)),
+        ("notification badge of a client", lambda: notifications.signature(conn, client_id)),
+        ("pending withdrawals", queries.pending_withdrawals),
+        ("recent audit log", lambda: queries.recent_logs(20)),
+        ("referral walk (closure check)", lambda: referrals.expected_pairs(conn)),
+    ]
+
+
+def main(args):
+    clients = int(args[args.index("--clients") + 1]) if "--clients" in args else CLIENTS
+    checker = Checker()
+    with scratch_database(clients):
+        from core import db, migrations, slowlog
+        conn = db.get_conn()
+        index_names = [name for version, _, steps in migrations.MIGRATIONS if version == 2
+                       for step in steps for name in _INDEX_NAME.findall(step)]
+        client_id = conn.execute("""
+            SELECT client_id FROM profits GROUP BY client_id ORDER BY COUNT(*) DESC LIMIT 1
+        """).fetchone()[0]
+
+        captured = []
+        db.observe(lambda sql, params, seconds, rows: captured.append((sql, params)))
+        lookups = []
+        for label, run in _hot_lookups(conn, client_id):
+            start = len(captured)
+            run()
+            lookups.append((label, captured[start:]))
+
+        # Not observed, so explaining does not add to ``captured``.  Two connections: a cached
+        # EXPLAIN statement is not prepared again after a schema change, even a rolled back one
+        plans, without = db.connect(), db.connect()
+        print(f"migration 2 indexes: {', '.join(index_names)}\n")
+        for label, statements in lookups:
+            for sql, params in statements:
+                after, _ = slowlog.explain(plans, sql, params)
+                without.execute("BEGIN")
+                for name in index_names:
+                    without.execute(f"DROP INDEX {name}")
+                before, _ = slowlog.explain(without, sql, params)
+                before_scan = _scanned_tables(without, before)
+                without.rollback()
+                after_scan = _scanned_tables(plans, after)
+                print(f"{label}: {' '.join(sql.split())[:110]}")
+                print("  before:\n" + "\n".join("    " + line for line in before.splitlines()))
+                print("  after:\n" + "\n".join("    " + line for line in after.splitlines()))
+                used = [name for name in index_names if name in after]
+                # An automatic index is built by every run of the statement: a missing index too
+                checker.check(not after_scan and "AUTOMATIC" not in after, f"{label}: "
+                              + (f"scans {', '.join(after_scan)}" if after_scan else "no full table scan")
+                              + (", builds an automatic index" if "AUTOMATIC" in after else "")
+                              + (f" (uses {', '.join(used)})" if used else "")
+                              + (f", scanned {', '.join(before_scan)} without migration 2" if before_scan else "")
+                              + (", built an automatic index without migration 2" if "AUTOMATIC" in before else ""))
+        plans.close()
+        without.close()
+    checker.exit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,123 @@
+"""Property check of the referral closure table against the recursive CTE.
+
+Random edits of the referral forest (sign-ups under any upline, moves of a
+client and its subtree, detaching, deleting, Pioneer/Regular flips) are
+committed one at a time, the way the Client Management page makes them.
+After each one:
+
+* ``referral_closure`` equals the pairs of the recursive walk over
+  ``clients.referred_by`` (``referrals.verify``);
+* ``get_upline``, ``subtree_ids`` and ``subtree_count`` of a random client
+  agree with that walk;
+* a move the walk says would close a cycle is refused by the trigger, and
+  only those (``would_create_cycle`` predicts both);
+* the bonus chain cache, told about edits through ``changed()`` like the
+  page does, gives the chains the walk gives.
+
+    python -m scripts.referral_closure [--edits N] [--seed N]
+"""
+import random
+import sqlite3
+import sys
+
+from scripts import Checker, scratch_database
+
+EDITS = 400
+WEIGHTS = {"signup": 3, "move": 5, "detach": 1, "delete": 1, "flip": 2}
+
+
+def _chain(pairs, types, client_id, rates, max_depth):
+    """Bonus chain of ``client_id`` from the walk: Pioneer uplines, nearest first, until the first that is not."""
+    chain = []
+    for depth, ancestor in sorted((d, a) for (a, c), d in pairs.items() if c == client_id and 1 <= d <= max_depth):
+        if types.get(ancestor) != "Pioneer":
+            break
+        chain.append((ancestor, depth, rates[depth]))
+    return chain
+
+
+def main(args):
+    edits = int(args[args.index("--edits") + 1]) if "--edits" in args else EDITS
+    seed = int(args[args.index("--seed") + 1]) if "--seed" in args else 0
+    rng = random.Random(seed)
+    checker = Checker()
+    with scratch_database(seed=seed):
+        from core import referrals
+        from core.db import get_conn
+        conn = get_conn()
+        counts = dict.fromkeys(list(WEIGHTS) + ["refused"], 0)
+        failures = []
+
+        def fail(message):
+            failures.append(message)
+            checker.check(False, message)
+
+        for n in range(edits):
+            ids = [r[0] for r in conn.execute("SELECT id FROM clients")]
+            client_id, other = rng.choice(ids), rng.choice(ids)
+            edit = rng.choices(list(WEIGHTS), list(WEIGHTS.values()))[0]
+            edited = client_id
+            if edit == "signup":
+                upline = rng.choice([other, other, None, 0, max(ids) + 1000])
+                edited = conn.execute("""
+                    INSERT INTO clients (name, type, referred_by, referral_code, add_date)
+                    VALUES (?, ?, ?, ?, date('now'))
+                """, (f"Check {n}", rng.choice(["Pioneer", "Regular"]), upline, f"check{n}")).lastrowid
+            elif edit == "move":
+                if rng.random() < 0.3:
+                    # Under itself or its own downline: the moves the trigger must refuse
+                    other = rng.choice(referrals.subtree_ids(conn, client_id, include_self=True))
+                cycle = (client_id, other) in referrals.expected_pairs(conn)
+                if referrals.would_create_cycle(conn, client_id, other) != cycle:
+                    fail(f"edit {n}: would_create_cycle({client_id}, {other}) != {cycle}")
+                try:
+                    conn.execute("UPDATE clients SET referred_by = ? WHERE id = ?", (other, client_id))
+                    refused = False
+                except sqlite3.IntegrityError:
+                    refused = True
+                if refused != cycle:
+                    fail(f"edit {n}: move of {client_id} under {other} {'refused' if refused else 'accepted'}, "
+                         f"cycle={cycle}")
+                if refused:
+                    edit = "refused"
+            elif edit == "detach":
+                conn.execute("UPDATE clients SET referred_by = ? WHERE id = ?", (rng.choice([None, 0]), client_id))
+            elif edit == "delete":
+                conn.execute("DELETE FROM clients WHERE id = ?", (client_id,))
+            else:
+                conn.execute("UPDATE clients SET type = CASE type WHEN 'Pioneer' THEN 'Regular' ELSE 'Pioneer' END "
+                             "WHERE id = ?", (client_id,))
+            conn.commit()
+            counts[edit] += 1
+            if edit in ("move", "detach", "flip"):
+                referrals.bonus_uplines.changed(conn, edited)
+
+            drift = referrals.verify(conn)
+            if drift:
+                fail(f"edit {n} ({edit} {edited}): {len(drift)} closure rows differ, e.g. {drift[:3]}")
+                break
+            pairs = referrals.expected_pairs(conn)
+            types = dict(conn.execute("SELECT id, type FROM clients").fetchall())
+            probe = rng.choice(list(types))
+            upline = [(u["id"], u["depth"]) for u in referrals.get_upline(conn, probe, max_depth=len(types))]
+            expected_upline = sorted(((a, d) for (a, c), d in pairs.items() if c == probe and d >= 1),
+                                     key=lambda pair: pair[1])
+            downline = sorted(d for (a, d), depth in pairs.items() if a == probe and depth >= 1)
+            if (upline != expected_upline or sorted(referrals.subtree_ids(conn, probe)) != downline
+                    or referrals.subtree_count(conn, probe) != len(downline)):
+                fail(f"edit {n}: lookups of client {probe} differ from the walk")
+            sample = rng.sample(list(types), min(50, len(types)))
+            cached = referrals.bonus_uplines.get_many(conn, sample)
+            walked = {i: _chain(pairs, types, i, referrals.REFERRAL_RATES, referrals.MAX_BONUS_DEPTH) for i in sample}
+            if cached != walked:
+                wrong = [i for i in sample if cached[i] != walked[i]]
+                fail(f"edit {n} ({edit} {edited}): cached bonus chains differ for {wrong[:5]}")
+
+        print(", ".join(f"{count} {edit}" for edit, count in counts.items()))
+        checker.check(not failures, f"{n + 1} edits: closure, lookups, cycle guard and bonus chains match the walk")
+        checker.check(counts["refused"] > 0 and counts["delete"] > 0, "the edits included refused moves and deletes")
+    checker.exit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
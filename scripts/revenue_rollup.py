@@ -0,0 +1,95 @@
+"""Monthly revenue rollup: pandas on the whole profits table vs core/timeseries.py.
+
+The owner's "Revenue Growth" chart used to read every profits row, run
+``pd.to_datetime`` on the dates and group them by ``strftime('%Y-%m')`` in
+Python on every page view.  It now asks ``timeseries.revenue_series``,
+which reads the month rows the KPI triggers keep up to date (core/kpi.py),
+or groups a date range in SQLite on the covering date index, and caches
+the result until profits change.
+
+Timed per page view, over ``--runs`` views each:
+
+* pandas: the old read + to_datetime + groupby;
+* SQL, cold: ``revenue_series`` with its cache emptied before each view,
+  for the whole history (the month rollup) and for the last year (a GROUP
+  BY on the index), by month, week and day;
+* SQL, cached: the same call again with profits unchanged.
+
+Every SQL series has to match the pandas one, bucket for bucket.  The
+profits table holds about 12 rows per client: ``--clients 8500`` for 100k
+rows, ``--clients 420000`` for 5M.
+
+    python -m scripts.revenue_rollup [--clients N] [--runs N]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from scripts import CLIENTS, Checker, scratch_database
+
+RUNS = 20
+TOLERANCE = 1e-6
+_PANDAS_BUCKETS = {"month": "%Y-%m", "week": None, "day": "%Y-%m-%d"}
+
+
+def _pandas_series(conn, bucket="month", start=None):
+    # The old chart, as it was, with the date range and buckets of the new API
+    df_profits = pd.read_sql("SELECT profit, client_share, your_share, referral_bonus, date, client_id FROM profits", conn)
+    df_profits['date'] = pd.to_datetime(df_profits['date'], errors='coerce')
+    if start:
+        df_profits = df_profits[df_profits['date'] >= pd.Timestamp(start)]
+    if bucket == "week":
+        label = (df_profits['date'] - pd.to_timedelta(df_profits['date'].dt.weekday, unit="D")).dt.strftime('%Y-%m-%d')
+    else:
+        label = df_profits['date'].dt.strftime(_PANDAS_BUCKETS[bucket])
+    monthly = df_profits.groupby(label)[['your_share', 'referral_bonus']].sum().reset_index()
+    monthly = monthly.sort_values('date')
+    monthly['total'] = monthly['your_share'] + monthly['referral_bonus']
+    return monthly
+
+
+def _same(series, frame):
+    return (series["x"] == frame["date"].tolist()
+            and all(abs(a - b) <= TOLERANCE * max(1.0, abs(b)) for a, b in zip(series["total"], frame["total"])))
+
+
+def _timed(fn, runs):
+    started = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return (time.perf_counter() - started) / runs, result
+
+
+def main(args):
+    clients = int(args[args.index("--clients") + 1]) if "--clients" in args else CLIENTS
+    runs = int(args[args.index("--runs") + 1]) if "--runs" in args else RUNS
+    checker = Checker()
+    with scratch_database(clients=clients):
+        from core import timeseries
+        from core.db import get_conn
+        conn = get_conn()
+        rows, last = conn.execute("SELECT COUNT(*), MAX(date) FROM profits").fetchone()
+        year_ago = (pd.Timestamp(last) - pd.DateOffset(years=1)).strftime("%Y-%m-%d")
+        print(f"{rows:,} profits rows, {runs} views each")
+
+        def cold(bucket, start):
+            timeseries.revenue_series.clear()
+            return timeseries.revenue_series(bucket, start=start)
+
+        for bucket, start in [("month", None), ("month", year_ago), ("week", year_ago), ("day", year_ago)]:
+            span = "all history" if start is None else f"since {start}"
+            before, frame = _timed(lambda: _pandas_series(conn, bucket, start), runs)
+            after, series = _timed(lambda: cold(bucket, start), runs)
+            cached, again = _timed(lambda: timeseries.revenue_series(bucket, start=start), runs)
+            print(f"{bucket:<5} {span:<17} {len(series['x']):>4} buckets: pandas {before * 1000:8.2f} ms, "
+                  f"SQL {after * 1000:7.2f} ms, cached {cached * 1000:6.3f} ms per view")
+            checker.check(_same(series, frame) and again == series,
+                          f"{bucket} series {span}: SQL matches pandas, bucket for bucket")
+            checker.check(after < before, f"{bucket} series {span}: SQL is {before / max(after, 1e-9):.1f}x faster "
+                          f"than pandas, {before / max(cached, 1e-9):.0f}x once cached")
+    checker.exit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
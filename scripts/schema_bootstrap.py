@@ -0,0 +1,127 @@
+"""Per-rerun cost of the schema setup: on every rerun vs once per process.
+
+Streamlit re-executes the whole script on every click.  The app used to
+open its connection, try the eight ``ALTER TABLE ... ADD COLUMN`` of its
+"safe column addition", run the fifteen ``CREATE TABLE IF NOT EXISTS`` and
+create the upload folders on each of them.  That now happens in
+``bootstrap()`` (streamlit_app.py), an ``st.cache_resource`` that runs the
+versioned migrations (core/migrations.py) once per server process.
+
+Both are timed over ``--reruns`` reruns on an up-to-date database:
+
+* every rerun: the old block, as it was;
+* once per process: the bootstrap body (its own connection, the migrations,
+  the schema version, the folders) behind ``st.cache_resource``; its first
+  call, on a database with no schema yet, is timed on its own.
+
+    python -m scripts.schema_bootstrap [--reruns N]
+"""
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import warnings
+
+from scripts import Checker, scratch_database
+
+RERUNS = 200
+
+# The old "safe column addition" block, run before the tables on every rerun
+_OLD_COLUMNS = [
+    ("clients", "current_equity", "REAL DEFAULT 0"),
+    ("clients", "withdrawable_balance", "REAL DEFAULT 0"),
+    ("clients", "referred_by", "INTEGER"),
+    ("clients", "address", "TEXT"),
+    ("clients", "mobile_number", "TEXT"),
+    ("clients", "referral_code", "TEXT UNIQUE"),
+    ("notifications", "read", "INTEGER DEFAULT 0"),
+    ("announcements", "likes", "INTEGER DEFAULT 0"),
+]
+_FOLDERS = ["uploaded_files", "uploaded_files/messages", "uploaded_files/client_files", "uploaded_files/announcements"]
+
+
+def _old_rerun(path, root):
+    from core.migrations import BASE_TABLES
+    conn = sqlite3.connect(path, check_same_thread=False)
+    c = conn.cursor()
+    for table, column, definition in _OLD_COLUMNS:
+        try:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            conn.commit()
+        except sqlite3.OperationalError:
+            pass
+    for sql in BASE_TABLES:
+        c.execute(sql)
+    conn.commit()
+    for folder in _FOLDERS:
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+    return conn
+
+
+def _timed(rerun, reruns):
+    started = time.perf_counter()
+    for _ in range(reruns):
+        rerun()
+    return (time.perf_counter() - started) / reruns
+
+
+def main(args):
+    reruns = int(args[args.index("--reruns") + 1]) if "--reruns" in args else RERUNS
+    checker = Checker()
+    with scratch_database() as path, tempfile.TemporaryDirectory(prefix="kmfx-folders-") as root:
+        # st.cache_resource outside a server: it caches all the same, and says so
+        warnings.filterwarnings("ignore")
+        logging.getLogger("streamlit").setLevel(logging.ERROR)
+        import streamlit as st
+
+        from core import migrations
+        from core.db import connect
+
+        boots = []
+
+        def boot(db_path):
+            db = connect(db_path)
+            try:
+                applied = migrations.run_migrations(db)
+                version = migrations.current_version(db)
+            finally:
+                db.close()
+            for folder in _FOLDERS:
+                os.makedirs(os.path.join(root, folder), exist_ok=True)
+            boots.append(applied)
+            return {"ready": True, "schema_version": version, "migrations_applied": applied}
+        bootstrap = st.cache_resource(show_spinner=False)(boot)
+
+        # First call of a process on an empty database: the whole schema
+        fresh = os.path.join(root, "fresh.db")
+        started = time.perf_counter()
+        boot(fresh)
+        cold = time.perf_counter() - started
+        conn = sqlite3.connect(fresh)
+        version = migrations.current_version(conn)
+        conn.close()
+        checker.check(boots[-1] and version == migrations.LATEST_VERSION,
+                      f"a fresh database is migrated to version {migrations.LATEST_VERSION} in {cold * 1000:.1f} ms "
+                      f"(once per process)")
+
+        opened = []
+        before = _timed(lambda: opened.append(_old_rerun(path, root)), reruns)
+        for conn in opened:
+            conn.close()
+        boots.clear()
+        after = _timed(lambda: bootstrap(path), reruns)
+        status = bootstrap(path)
+        print(f"every rerun:      {before * 1000:.3f} ms per rerun (connect, 8 ALTERs, 15 CREATEs, folders)")
+        print(f"once per process: {after * 1000:.3f} ms per rerun (st.cache_resource hit)")
+        checker.check(len(boots) == 1 and boots[0] == [],
+                      f"the bootstrap body ran {len(boots)} time(s) over {reruns + 1} reruns, applied nothing")
+        checker.check(status["ready"] and status["schema_version"] == migrations.LATEST_VERSION,
+                      f"the cached status is ready at schema version {status['schema_version']}")
+        checker.check(after < before, f"the schema setup costs {before / max(after, 1e-9):.0f}x less per rerun")
+    checker.exit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,104 @@
+"""Parse / plan cost of the hottest page queries: f-string SQL vs parameterized SQL.
+
+The pages used to build their SQL with the id baked in (``... WHERE id =
+{client_id}``): every call is a new statement for SQLite to parse and plan.
+core/queries.py and core/notifications.py now send one constant string with
+``?`` placeholders per query, which the sqlite3 statement cache
+(``STATEMENT_CACHE_SIZE`` in core/db.py) prepares once per connection.
+
+Each hot query is captured with the statement observer of core/db.py as the
+pages run it, for two different clients: its text must not change.  It is
+then timed on one connection for every client in turn, ``--rounds`` times:
+
+* f-string: the id written into the SQL, as the pages used to;
+* parameterized, no cache: the constant SQL on a connection without a
+  statement cache, so it is prepared on every call too;
+* parameterized: the constant SQL through the statement cache.
+
+All three have to return the same rows.
+
+    python -m scripts.statement_cache [--clients N] [--rounds N]
+"""
+import sqlite3
+import sys
+import time
+
+from scripts import CLIENTS, Checker, scratch_database
+
+ROUNDS = 5
+
+
+def _hot_queries(conn):
+    from core import notifications, queries
+    return [
+        ("client row", queries.client_by_id),
+        ("client name", queries.client_name),
+        ("earnings totals", queries.earnings_totals),
+        ("profit history", queries.profit_history),
+        ("client withdrawals", queries.client_withdrawals),
+        ("notification badge", lambda client_id: notifications.signature(conn, client_id)),
+    ]
+
+
+def _timed(conn, calls, rounds):
+    """Seconds per call of ``(sql, params)`` on ``conn``, and the rows of the first round."""
+    rows = []
+    started = time.perf_counter()
+    for round_ in range(rounds):
+        for sql, params in calls:
+            fetched = conn.execute(sql, params).fetchall()
+            if not round_:
+                rows.append(fetched)
+    return (time.perf_counter() - started) / (rounds * len(calls)), rows
+
+
+def main(args):
+    clients = int(args[args.index("--clients") + 1]) if "--clients" in args else CLIENTS
+    rounds = int(args[args.index("--rounds") + 1]) if "--rounds" in args else ROUNDS
+    checker = Checker()
+    with scratch_database(clients=clients) as path:
+        from core import db
+        from core.db import PRAGMAS, STATEMENT_CACHE_SIZE, get_conn
+        captured = []
+        db.observe(lambda sql, params, seconds, rows: captured.append((sql, params)))
+        client_ids = [r[0] for r in get_conn().execute("SELECT id FROM clients ORDER BY id")]
+
+        cached = db.connect()
+        uncached = sqlite3.connect(path, cached_statements=0)
+        for pragma in PRAGMAS:
+            uncached.execute(pragma)
+        print(f"{len(client_ids)} clients x {rounds} rounds per query, statement cache of {STATEMENT_CACHE_SIZE}")
+        totals = [0.0, 0.0, 0.0]
+        hot = _hot_queries(get_conn())
+        for name, query in hot:
+            statements = []
+            for client_id in client_ids[:2]:
+                captured.clear()
+                query(client_id)
+                statements.append(captured[-1])
+            (sql, params), (other_sql, _) = statements
+            checker.check(sql == other_sql and "?" in sql and params,
+                          f"{name}: one constant statement with placeholders for every client")
+
+            baked = [(sql.replace("?", str(int(client_id))), ()) for client_id in client_ids]
+            bound = [(sql, (client_id,)) for client_id in client_ids]
+            before, before_rows = _timed(cached, baked, rounds)
+            prepared, prepared_rows = _timed(uncached, bound, rounds)
+            after, after_rows = _timed(cached, bound, rounds)
+            for i, seconds in enumerate((before, prepared, after)):
+                totals[i] += seconds
+            print(f"{name:<19} f-string {before * 1e6:7.1f} us, parameterized {prepared * 1e6:7.1f} us "
+                  f"without the cache, {after * 1e6:7.1f} us with it")
+            checker.check(before_rows == prepared_rows == after_rows, f"{name}: the same rows all three ways")
+        cached.close()
+        uncached.close()
+        print(f"{'all of them':<19} f-string {totals[0] * 1e6:7.1f} us, parameterized {totals[1] * 1e6:7.1f} us "
+              f"without the cache, {totals[2] * 1e6:7.1f} us with it")
+        checker.check(totals[2] < totals[0], f"the statement cache saves {(1 - totals[2] / totals[0]) * 100:.0f}% "
+                      f"of the time of the f-string queries ({(totals[0] - totals[2]) * 1e6:.1f} us per page load "
+                      f"of the {len(hot)})")
+    checker.exit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,52 @@
+"""Page registry of the dashboard.
+
+Every menu entry maps to a module of this package with a ``render(selected)``
+function.  The module is imported the first time its page is shown, so a
+rerun loads and runs only the code of the selected page; later reruns reuse
+the imported module.  Menu entries without a module render nothing.
+
+Every page run is measured by core/perf.py (see the owner's Performance page).
+"""
+import importlib
+import uuid
+
+import streamlit as st
+
+from core import perf
+
+PAGES = {
+    "Dashboard Home": "home",
+    "Client Management": "client_management",
+    "Profit Sharing": "profit_sharing",
+    "Profit & Earnings": "profit_sharing",
+    "License Generator": "license_generator",
+    "File Vault": "file_vault",
+    "My Files": "file_vault",
+    "Announcements": "announcements",
+    "Messages": "messages",
+    "Notifications": "notification_center",
+    "Withdrawals": "withdrawals",
+    "My Referrals": "my_referrals",
+    "EA Versions": "ea_versions",
+    "Reports & Export": "reports",
+    "Audit Logs": "audit_logs",
+    "Admin Management": "admin_management",
+    "My Profile": "my_profile",
+    "Performance": "performance",
+}
+
+
+def page_module(selected):
+    """The module of a menu entry (imported on first use), or None."""
+    name = PAGES.get(selected)
+    return importlib.import_module(f"{__name__}.{name}") if name else None
+
+
+def render(selected):
+    module = page_module(selected)
+    if module is None:
+        return
+    role = "owner" if st.session_state.get("is_owner") else "admin" if st.session_state.get("is_admin") else "client"
+    session = st.session_state.setdefault("session_key", uuid.uuid4().hex)
+    with perf.page_run(selected, role, profile=perf.profiling(session)):
+        module.render(selected)
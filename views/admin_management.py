@@ -0,0 +1,126 @@
+# ------------------------- SUPER ULTIMATE ADMIN MANAGEMENT (FULLY FIXED - DELETE WORKS 100%) -------------------------
+import sqlite3
+
+import streamlit as st
+
+from core import queries
+from core.auth import hash_password
+from core.db import get_conn
+from views.common import add_log
+
+
+def render(selected):
+    conn = get_conn()
+    c = conn.cursor()
+    if not st.session_state.is_owner:
+        st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+        st.error("🚫 Access Denied")
+        st.write("Admin Management is only available to Owner.")
+        st.markdown("</div>", unsafe_allow_html=True)
+    else:
+        st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+        st.header("👤 Admin Management")
+        st.markdown("#### Create and manage admin accounts with full control")
+
+        # Always fresh admins list
+        admins = queries.admins()
+
+        col1, col2 = st.columns([1, 1])
+
+        # === CREATE NEW ADMIN ===
+        with col1:
+            st.subheader("➕ Create New Admin")
+            with st.form("create_admin_form", clear_on_submit=True):
+                admin_name = st.text_input("Full Name *")
+                admin_username = st.text_input("Username *", placeholder="e.g. admin_john")
+                admin_password = st.text_input("Password *", type="password")
+                confirm_password = st.text_input("Confirm Password *", type="password")
+
+                if st.form_submit_button("✅ CREATE ADMIN", type="primary", use_container_width=True):
+                    if not all([admin_name.strip(), admin_username.strip(), admin_password, confirm_password]):
+                        st.error("All fields are required!")
+                    elif admin_password != confirm_password:
+                        st.error("Passwords do not match!")
+                    elif len(admin_password) < 8:
+                        st.error("Password must be at least 8 characters!")
+                    else:
+                        try:
+                            hashed_pw = hash_password(admin_password)
+                            c.execute("""INSERT INTO admins (username, password, name)
+                                         VALUES (?, ?, ?)""",
+                                      (admin_username.strip(), hashed_pw, admin_name.strip()))
+                            conn.commit()
+                            add_log("Admin Created", f"Username: {admin_username} | Name: {admin_name}")
+                            st.success(f"✅ Admin '{admin_username}' created successfully!")
+                            st.rerun()
+                        except sqlite3.IntegrityError:
+                            st.error("Username already exists!")
+                        except Exception as e:
+                            st.error(f"Error: {e}")
+
+        # === CURRENT ADMINS LIST ===
+        with col2:
+            st.subheader("👥 Current Admins")
+            if admins.empty:
+                st.info("No admin accounts yet. Create one on the left.")
+            else:
+                # Session state to track admin selected for deletion
+                if 'admin_to_delete' not in st.session_state:
+                    st.session_state.admin_to_delete = None
+
+                for _, admin in admins.iterrows():
+                    with st.expander(f"👤 {admin['name'] or 'No name set'} • @{admin['username']}"):
+                        st.write(f"**ID:** {admin['id']}")
+                        st.write(f"**Username:** {admin['username']}")
+                        st.write(f"**Name:** {admin['name'] or 'Not set'}")
+
+                        if st.button("🗑️ Delete Admin", key=f"del_btn_{admin['id']}", type="secondary"):
+                            st.session_state.admin_to_delete = {
+                                'id': admin['id'],
+                                'username': admin['username'],
+                                'name': admin['name'] or 'No name'
+                            }
+                            st.rerun()
+
+                # === CONFIRMATION SECTION (OUTSIDE LOOP - NO KEY CONFLICT) ===
+                if st.session_state.admin_to_delete:
+                    del_info = st.session_state.admin_to_delete
+                    st.markdown("---")
+                    st.error(f"⚠️ You are about to **permanently delete** the following admin:")
+                    st.write(f"**Name:** {del_info['name']}")
+                    st.write(f"**Username:** @{del_info['username']}")
+                    st.write(f"**ID:** {del_info['id']}")
+                    st.warning("This action cannot be undone!")
+
+                    col_confirm, col_cancel = st.columns(2)
+                    with col_confirm:
+                        if st.button("🔥 YES, DELETE PERMANENTLY", type="primary", use_container_width=True):
+                            try:
+                                c.execute("DELETE FROM admins WHERE id = ?", (del_info['id'],))
+                                conn.commit()
+                                add_log("Admin Deleted", f"Username: {del_info['username']}")
+                                st.success(f"✅ Admin '@{del_info['username']}' deleted permanently.")
+                                st.session_state.admin_to_delete = None
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"Error deleting admin: {e}")
+
+                    with col_cancel:
+                        if st.button("❌ Cancel", type="secondary", use_container_width=True):
+                            st.session_state.admin_to_delete = None
+                            st.rerun()
+
+        # === OWNER INFO ===
+        st.markdown("---")
+        st.subheader("👑 Owner Account (Master)")
+        st.info("""
+        **Owner privileges cannot be modified or deleted here.**
+       
+        • Full system access
+        • Can create/delete admins
+        • Login via Owner Master Password only
+       
+        Change password directly in code for security.
+        """)
+
+        st.markdown("</div>", unsafe_allow_html=True)
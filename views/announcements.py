@@ -0,0 +1,153 @@
+# ------------------------- SUPER ULTIMATE ANNOUNCEMENTS (WITH PROPER COMMENTS & DELETE) -------------------------
+import datetime
+import os
+
+import streamlit as st
+
+from core import events, queries, search
+from core.db import get_conn
+from views.common import add_log
+
+
+def render(selected):
+    conn = get_conn()
+    c = conn.cursor()
+    st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+
+    if st.session_state.is_owner or st.session_state.is_admin:
+        # ====================== POST NEW ANNOUNCEMENT ======================
+        st.header("📢 Announcements")
+        st.markdown("#### Post updates with images and files")
+
+        with st.form("post_announcement", clear_on_submit=True):
+            title = st.text_input("Title *")
+            message = st.text_area("Message *", height=200)
+            files = st.file_uploader("Attach images or files", accept_multiple_files=True)
+
+            if st.form_submit_button("📢 POST ANNOUNCEMENT", type="primary"):
+                if not title.strip() or not message.strip():
+                    st.error("Title and message are required!")
+                else:
+                    try:
+                        poster = "Owner" if st.session_state.is_owner else "Admin"
+                        c.execute("""INSERT INTO announcements 
+                                     (title, message, date, posted_by, likes)
+                                     VALUES (?, ?, ?, ?, 0)""",
+                                  (title, message, datetime.date.today().isoformat(), poster))
+                        ann_id = c.lastrowid
+
+                        if files:
+                            for file in files:
+                                safe_name = f"{ann_id}_{file.name}"
+                                path = f"uploaded_files/announcements/{safe_name}"
+                                with open(path, "wb") as f:
+                                    f.write(file.getbuffer())
+                                c.execute("""INSERT INTO announcement_files 
+                                             (announcement_id, file_name, original_name)
+                                             VALUES (?, ?, ?)""",
+                                          (ann_id, safe_name, file.name))
+
+                        events.publish(conn, "announcement.posted", announcement_id=ann_id,
+                                       text=f"📢 New announcement: {title}")
+                        conn.commit()
+                        add_log("Announcement Posted", title)
+                        st.success("Announcement posted successfully!")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error: {e}")
+
+        st.markdown("---")
+
+    # ====================== DISPLAY ANNOUNCEMENTS (ALL USERS) ======================
+    st.subheader("Latest Announcements")
+
+    announcement_search = st.text_input("🔍 Search announcements", key="ann_search")
+    if search.match_expression(announcement_search):
+        announcements = queries.search_announcements(announcement_search, 20)
+    else:
+        announcements = queries.recent_announcements(20)
+
+    if announcements.empty:
+        st.info("No announcements match your search." if announcement_search.strip()
+                else "No announcements yet. Stay tuned for updates!")
+    else:
+        for _, ann in announcements.iterrows():
+            with st.expander(f"📢 {ann['title']} • {ann['date']} • by {ann['posted_by']} • ❤️ {ann['likes']} likes", expanded=True):
+                st.write(ann['message'])
+
+                # === IMAGE PREVIEWS ===
+                atts = queries.announcement_attachments(ann['id'])
+                images = []
+                files = []
+
+                for _, att in atts.iterrows():
+                    path = f"uploaded_files/announcements/{att['file_name']}"
+                    if os.path.exists(path):
+                        if att['original_name'].lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp')):
+                            images.append((path, att['original_name']))
+                        else:
+                            files.append((path, att['original_name']))
+
+                if images:
+                    st.markdown("**Images:**")
+                    cols = st.columns(min(3, len(images)))
+                    for i, (img_path, name) in enumerate(images):
+                        with cols[i % 3]:
+                            st.image(img_path, caption=name, use_column_width=True)
+
+                if files:
+                    st.markdown("**Files:**")
+                    for file_path, name in files:
+                        with open(file_path, "rb") as f:
+                            st.download_button(f"📎 {name}", f.read(), file_name=name, use_container_width=True)
+
+                # === LIKE BUTTON ===
+                if st.button(f"❤️ Like ({ann['likes']})", key=f"like_{ann['id']}"):
+                    c.execute("UPDATE announcements SET likes = likes + 1 WHERE id = ?", (ann['id'],))
+                    conn.commit()
+                    st.rerun()
+
+                # === COMMENTS SECTION ===
+                st.markdown("**💬 Comments**")
+
+                # Post new comment
+                with st.form(key=f"comment_form_{ann['id']}", clear_on_submit=True):
+                    comment_text = st.text_input("Write a comment...", key=f"input_{ann['id']}")
+                    col_send, _ = st.columns([1, 4])
+                    with col_send:
+                        send = st.form_submit_button("Send")
+
+                    if send and comment_text.strip():
+                        commenter = (st.session_state.current_client['name'] 
+                                     if not (st.session_state.is_owner or st.session_state.is_admin) 
+                                     else "Owner/Admin")
+                        c.execute("""INSERT INTO announcement_comments 
+                                     (announcement_id, commenter_name, comment, timestamp)
+                                     VALUES (?, ?, ?, ?)""",
+                                  (ann['id'], commenter, comment_text.strip(), datetime.datetime.now().isoformat()))
+                        conn.commit()
+                        add_log("Comment", f"{commenter} on '{ann['title']}'")
+                        st.success("Comment posted!")
+                        st.rerun()
+
+                # Display comments
+                comments = queries.announcement_comments(ann['id'])
+
+                if not comments.empty:
+                    for _, com in comments.iterrows():
+                        col_name, col_comment, col_delete = st.columns([2, 6, 1])
+                        with col_name:
+                            st.caption(f"**{com['commenter_name']}** • {com['timestamp'][:16].replace('T', ' ')}")
+                        with col_comment:
+                            st.write(com['comment'])
+                        with col_delete:
+                            if st.session_state.is_owner or st.session_state.is_admin:
+                                if st.button("🗑️", key=f"del_com_{com['id']}"):
+                                    c.execute("DELETE FROM announcement_comments WHERE id = ?", (com['id'],))
+                                    conn.commit()
+                                    add_log("Comment Deleted", f"ID {com['id']} on announcement {ann['id']}")
+                                    st.rerun()
+                else:
+                    st.caption("No comments yet. Be the first!")
+
+    st.markdown("</div>", unsafe_allow_html=True)
@@ -0,0 +1,128 @@
+# ------------------------- SUPER ULTIMATE AUDIT LOGS (FULLY FIXED - NO ERRORS) -------------------------
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+from core import lookup, queries
+from core.db import get_conn
+from views.common import load_log_actions, load_log_archive_range, load_log_count, load_log_date_range, load_log_user_types
+
+
+def render(selected):
+    if not st.session_state.is_owner:
+        st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+        st.error("🚫 Access Denied")
+        st.write("Audit Logs are only available to Owner.")
+        st.markdown("</div>", unsafe_allow_html=True)
+    else:
+        st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+        st.header("📜 Audit Logs")
+        st.markdown("#### Complete system activity history with advanced filtering")
+
+        live_bounds = load_log_date_range()
+        archive_bounds = load_log_archive_range()
+        date_bounds = [ts for ts in live_bounds + archive_bounds if ts]
+
+        if not date_bounds:
+            st.info("No activity logged yet. All actions will appear here in real-time.")
+        else:
+            # Filters (options come from index seeks, not from loading the table)
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                action_filter = st.multiselect(
+                    "Filter by Action",
+                    options=load_log_actions(),
+                    default=[]
+                )
+            with col2:
+                type_filter = st.multiselect(
+                    "Filter by User Type",
+                    options=load_log_user_types(),
+                    default=[]
+                )
+            with col3:
+                search_text = st.text_input("Search in Details")
+            with col4:
+                min_date = pd.to_datetime(min(date_bounds)).date()
+                max_date = pd.to_datetime(max(date_bounds)).date()
+                date_range = st.date_input(
+                    "Date Range",
+                    value=(min_date, max_date),
+                    min_value=min_date,
+                    max_value=max_date
+                )
+            if archive_bounds[0]:
+                # Archived months are read only when the date range reaches into them
+                live_start = pd.to_datetime(live_bounds[0]).date() if live_bounds[0] else max_date
+                st.caption(f"🗄️ Entries before {live_start:%b %d, %Y} are archived by month - "
+                           f"narrow the date range after that day for the fastest search.")
+
+            # === FILTERS -> SQL WHERE, PAGES FETCHED ON DEMAND BY KEYSET ===
+            start_date = date_range[0] if date_range and date_range[0] > min_date else None
+            end_date = date_range[1] if date_range and len(date_range) == 2 and date_range[1] < max_date else None
+            log_filter = (tuple(action_filter), tuple(type_filter), start_date, end_date, search_text)
+
+            # New filter -> back to the newest page
+            if st.session_state.get('al_filter') != log_filter:
+                st.session_state.al_filter = log_filter
+                st.session_state.al_cursors = [None]
+                st.session_state.pop('al_export', None)
+            cursors = st.session_state.al_cursors
+
+            page_logs = queries.log_page(*log_filter, cursor=cursors[-1], limit=queries.LOG_PAGE_SIZE + 1)
+            has_older = len(page_logs) > queries.LOG_PAGE_SIZE
+            page_logs = page_logs.head(queries.LOG_PAGE_SIZE)
+
+            # Display count
+            total_logs = load_log_count()
+            matching = load_log_count(*log_filter) if any(log_filter) else total_logs
+            st.success(f"📊 Showing {len(page_logs)} of {matching:,} matching log entries (out of {total_logs:,} total) • page {len(cursors)}")
+
+            # Formatted display
+            display_logs = page_logs.copy()
+            display_logs['timestamp'] = pd.to_datetime(display_logs['timestamp'], errors='coerce').dt.strftime('%b %d, %Y • %H:%M:%S')
+
+            # === CLIENT NAMES: ONE BATCH LOOKUP FOR THE WHOLE PAGE ===
+            client_names = lookup.clients.names(page_logs['user_id'])
+            display_logs['client'] = display_logs['user_id'].map(client_names).fillna("")
+
+            # Final columns
+            display_cols = ['timestamp', 'action', 'details', 'user_type', 'client']
+            display_logs = display_logs[[col for col in display_cols if col in display_logs.columns]]
+
+            if display_logs.empty:
+                st.info("No log entries match these filters.")
+            else:
+                st.dataframe(display_logs, use_container_width=True, hide_index=True)
+
+            nav_newer, nav_older = st.columns(2)
+            with nav_newer:
+                if st.button("⬅️ Newer", disabled=len(cursors) == 1, use_container_width=True):
+                    cursors.pop()
+                    st.rerun()
+            with nav_older:
+                if st.button("Older ➡️", disabled=not has_older, use_container_width=True):
+                    last = page_logs.iloc[-1]
+                    cursors.append((last['timestamp'], int(last['id'])))
+                    st.rerun()
+
+            # Export buttons: the CSV is written straight from the cursor, and only when asked for
+            exp_filtered, exp_all = st.columns(2)
+            with exp_filtered:
+                if st.button("📄 Prepare Filtered Logs CSV", use_container_width=True):
+                    st.session_state.al_export = ("Filtered", queries.logs_csv(*log_filter))
+            with exp_all:
+                if st.button("📄 Prepare ALL Logs CSV", use_container_width=True):
+                    st.session_state.al_export = ("Full", queries.logs_csv())
+            if st.session_state.get('al_export'):
+                kind, csv_logs = st.session_state.al_export
+                st.download_button(
+                    f"📥 Export {'Filtered' if kind == 'Filtered' else 'ALL'} Logs CSV",
+                    csv_logs,
+                    f"KMFX_{'Audit_Logs_Filtered' if kind == 'Filtered' else 'Full_Audit_Logs'}_{datetime.date.today().isoformat()}.csv",
+                    "text/csv",
+                    use_container_width=True
+                )
+
+        st.markdown("</div>", unsafe_allow_html=True)
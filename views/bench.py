@@ -0,0 +1,99 @@
+"""Per-page latency of the dashboard script, measured with Streamlit's AppTest.
+
+It first reports what compiling ``streamlit_app.py`` costs: Streamlit parses
+the main script, rewrites it for "magic" output and compiles it once per
+server process and again whenever the file changes.  Then, for every page
+of the owner and client menus, it runs the whole script the way a browser
+session would and reports:
+
+* first visit: the first run that shows the page, including the import of
+  its module (the first page of all also pays for bootstrap and migrations);
+* rerun p50 / max: the same page run again, e.g. after a widget click.
+
+It also lists the page modules each first visit imported, which shows that
+a run only loads the page it renders.  The script writes nothing on
+its own, but bootstrap runs pending migrations and starts the background jobs
+(log archiving, ledger check), so point it at a copy of the database.
+
+    python -m views.bench [db] [--rounds N]     # run from the app directory
+"""
+import os
+import statistics
+import sys
+import time
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+ROUNDS = 7
+
+OWNER_PAGES = ["Dashboard Home", "Client Management", "Profit Sharing", "License Generator", "File Vault",
+               "Announcements", "Messages", "Notifications", "Withdrawals", "EA Versions", "Reports & Export",
+               "Audit Logs", "Admin Management"]
+CLIENT_PAGES = ["Dashboard Home", "My Profile", "Profit & Earnings", "My Files", "My Referrals",
+                "Announcements", "Notifications", "Messages", "Withdrawals"]
+
+
+def _loaded_pages():
+    return {name.split(".", 1)[1] for name in sys.modules
+            if name.startswith("views.") and name not in ("views.common", "views.bench")}
+
+
+def main(args):
+    rounds = ROUNDS
+    if "--rounds" in args:
+        i = args.index("--rounds")
+        rounds = int(args[i + 1])
+        del args[i:i + 2]
+    if args:
+        os.environ["KMFX_DB_PATH"] = args[0]
+
+    # The menu is a custom component, which AppTest cannot click: it always
+    # answers the page under test instead
+    import streamlit_option_menu
+    page = {"name": None}
+    streamlit_option_menu.option_menu = lambda menu_title=None, options=(), **kw: (
+        page["name"] if page["name"] in options else options[0])
+
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import AppTest, app_test, local_script_runner
+    from core.db import get_conn
+
+    started = time.perf_counter()
+    ScriptCache().get_bytecode(APP)
+    print(f"compile {os.path.basename(APP)}: {(time.perf_counter() - started) * 1000:.0f} ms (once per process / file change)")
+    # AppTest compiles the main script again on every run; the server keeps one cache per process
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+
+    row = get_conn().execute("SELECT id, name, type FROM clients ORDER BY type != 'Pioneer', id LIMIT 1").fetchone()
+    sessions = [("owner", OWNER_PAGES, dict(is_owner=True, is_admin=False, client_id=None, current_client=None))]
+    if row:
+        sessions.append(("client", CLIENT_PAGES, dict(is_owner=False, is_admin=False, client_id=row[0],
+                                                      current_client={"id": row[0], "name": row[1], "type": row[2]})))
+    else:
+        print("No clients in the database: client pages skipped.")
+
+    print(f"{'page':<32} {'first visit':>12} {'rerun p50':>10} {'rerun max':>10}  imported")
+    for role, pages, state in sessions:
+        for name in pages:
+            page["name"] = name
+            at = AppTest.from_file(APP, default_timeout=120)
+            at.secrets["KEEP_ALIVE"] = False
+            at.session_state["authenticated"] = True
+            for key, value in state.items():
+                at.session_state[key] = value
+            loaded = _loaded_pages()
+            started = time.perf_counter()
+            at.run()
+            first = time.perf_counter() - started
+            reruns = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                at.run()
+                reruns.append(time.perf_counter() - started)
+            failed = f"  FAILED: {at.exception[0].message}" if at.exception else ""
+            print(f"{role + ': ' + name:<32} {first * 1000:>9.0f} ms {statistics.median(reruns) * 1000:>7.0f} ms "
+                  f"{max(reruns) * 1000:>7.0f} ms  {', '.join(sorted(_loaded_pages() - loaded))}{failed}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,265 @@
+# ------------------------- SUPER ULTIMATE CLIENT MANAGEMENT (FINAL FIXED - REFERRALS WORK ON CREATE, REALTIME, NO BUGS) -------------------------
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+from core import ledger, queries, referrals
+from core.auth import hash_password
+from core.db import get_conn
+from views.common import add_log, generate_referral_code, load_client_count, load_client_page, load_clients
+
+
+def render(selected):
+    if not (st.session_state.is_owner or st.session_state.is_admin):
+        return
+    conn = get_conn()
+    c = conn.cursor()
+    st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+    st.header("👥 Client Management")
+    st.markdown("#### Complete client control center")
+
+    df_clients = load_clients()
+
+    tab1, tab2, tab3, tab4 = st.tabs(["🔍 All Clients", "➕ Add Client", "✏️ Edit Client", "🔑 Set Login"])
+
+    with tab1:
+        st.subheader("All Clients")
+        client_search = st.text_input("Search by Name, Mobile, Address, or Referral Code", key="cm_search",
+                                      help="Matches the start of words, e.g. 'jo' finds 'John', '0917' finds a mobile number.")
+
+        # === SERVER-SIDE GRID: FILTER, SORT AND PAGE IN SQL, ONE PAGE RENDERED AT A TIME ===
+        f1, f2, f3, f4 = st.columns([2, 2, 1, 1])
+        with f1:
+            type_filter = st.selectbox("Type", ["All", "Regular", "Pioneer"], key="cm_type")
+        with f2:
+            sort_by = st.selectbox("Sort by", list(queries.CLIENT_SORTS), key="cm_sort")
+        with f3:
+            sort_desc = st.toggle("Descending", key="cm_desc")
+        with f4:
+            page_size = st.selectbox("Rows", [25, 50, 100, 250], index=1, key="cm_page_size")
+
+        client_type = None if type_filter == "All" else type_filter
+        total_matches = load_client_count(client_search, client_type)
+
+        # New filter -> back to page 1, and drop an export built for the old one
+        grid_filter = (client_search, client_type, sort_by, sort_desc, page_size)
+        if st.session_state.get('cm_filter') != grid_filter:
+            st.session_state.cm_filter = grid_filter
+            st.session_state.cm_page = 1
+            st.session_state.pop('cm_export', None)
+
+        if total_matches == 0:
+            st.info("No clients found.")
+        else:
+            page_count = (total_matches + page_size - 1) // page_size
+            page = st.number_input(f"Page (of {page_count:,})", min_value=1, max_value=page_count, step=1, key="cm_page")
+            offset = (page - 1) * page_size
+            display = load_client_page(client_search, client_type, sort_by, sort_desc, page_size, offset)
+            display['add_date'] = pd.to_datetime(display['add_date'], errors='coerce')
+            display['expiry'] = pd.to_datetime(display['expiry'], errors='coerce')
+            display = display.drop(columns=['id'])
+
+            st.caption(f"Showing {offset + 1:,}–{offset + len(display):,} of {total_matches:,} clients")
+            st.dataframe(
+                display,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    'name': 'Name', 'type': 'Type', 'mobile_number': 'Mobile', 'address': 'Address',
+                    'accounts': 'Accounts', 'referral_code': 'Referral Code',
+                    'referred_by': st.column_config.NumberColumn('Referred By (ID)', format="%d"),
+                    'current_equity': st.column_config.NumberColumn('Equity', format="$%.2f"),
+                    'withdrawable_balance': st.column_config.NumberColumn('Withdrawable', format="$%.2f"),
+                    'start_balance': st.column_config.NumberColumn('Start Balance', format="$%.2f"),
+                    'add_date': st.column_config.DateColumn('Joined', format="MMM DD, YYYY"),
+                    'expiry': st.column_config.DateColumn('Expiry', format="MMM DD, YYYY"),
+                }
+            )
+
+            # Export is built on demand, not on every rerun
+            if st.button("📥 Prepare CSV Export", use_container_width=True):
+                st.session_state.cm_export = queries.client_export(client_search, client_type).to_csv(index=False).encode()
+            if st.session_state.get('cm_export'):
+                st.download_button("📥 Export CSV", st.session_state.cm_export, "KMFX_Clients.csv", "text/csv",
+                                   use_container_width=True)
+
+    with tab2:
+        st.subheader("Add New Client")
+        with st.form("add_client_form", clear_on_submit=True):
+            c1, c2 = st.columns(2)
+            with c1:
+                name = st.text_input("Full Name *")
+                mobile = st.text_input("Mobile Number *")
+                client_type = st.selectbox("Type *", ["Regular", "Pioneer"])
+                accounts = st.text_input("Accounts *")
+            with c2:
+                address = st.text_area("Address *")
+                start_bal = st.number_input("Starting Balance ($)", min_value=0.0, value=10000.0, step=500.0)
+                expiry = st.date_input("Expiry Date", value=datetime.date.today() + datetime.timedelta(days=365))
+
+            # === FINAL ROBUST REFERRAL FIX (WORKS ON CREATE) ===
+            pioneers_df = queries.pioneer_options()
+            
+            if pioneers_df.empty:
+                st.info("No Pioneer clients yet. Add a Pioneer first to enable referrals.")
+                referred_by = 0
+                ref_display = "No Referral"
+            else:
+                ref_options = ["None"] + pioneers_df['name'].tolist()
+                ref_name = st.selectbox("Referred By (Pioneer)", ref_options, index=0)
+                
+                if ref_name == "None":
+                    referred_by = 0
+                    ref_display = "No Referral"
+                else:
+                    # Safe & exact match
+                    matched = pioneers_df[pioneers_df['name'] == ref_name]
+                    if not matched.empty:
+                        referred_by = int(matched['id'].iloc[0])
+                        ref_display = ref_name
+                    else:
+                        st.error("Selected Pioneer not found. Please try again.")
+                        referred_by = 0
+                        ref_display = "Error"
+
+            submit = st.form_submit_button("➕ ADD CLIENT", type="primary")
+
+            if submit:
+                if not all([name.strip(), mobile.strip(), address.strip(), accounts.strip()]):
+                    st.error("All required fields must be filled!")
+                else:
+                    try:
+                        def add_client(conn):
+                            cur = conn.execute("""INSERT INTO clients
+                                                  (name, type, accounts, expiry, start_balance, current_equity,
+                                                   withdrawable_balance, add_date, referred_by, address, mobile_number)
+                                                  VALUES (?, ?, ?, ?, ?, 0, 0, ?, ?, ?, ?)""",
+                                               (name.strip(), client_type, accounts.strip(), expiry.isoformat(),
+                                                start_bal, datetime.date.today().isoformat(),
+                                                referred_by, address.strip(), mobile.strip()))
+                            new_id = cur.lastrowid
+                            conn.execute("UPDATE clients SET referral_code = ? WHERE id = ?",
+                                         (generate_referral_code(name.strip(), new_id), new_id))
+                            # The starting balance is the client's first ledger entry
+                            return [ledger.Entry(new_id, start_bal, 0.0, "opening", "clients", new_id, "start balance")]
+
+                        new_id = ledger.post(conn, add_client)[0].client_id
+                        ref_code = generate_referral_code(name.strip(), new_id)
+
+                        add_log("Client Added", f"{name} ({client_type}) | Referred by: {ref_display} (ID: {referred_by})")
+
+                        st.success(f"✅ Client '{name}' added successfully!\n\n"
+                                   f"Referral Code: `{ref_code}`\n"
+                                   f"Referred by: {ref_display} (DB ID: {referred_by})")
+                        st.rerun()
+
+                    except Exception as e:
+                        st.error(f"Error adding client: {e}")
+                        print(f"Add client error: {e}")
+
+    with tab3:
+        st.subheader("Edit Client")
+        if df_clients.empty:
+            st.info("No clients to edit.")
+        else:
+            client_map = dict(zip(df_clients['name'], df_clients['id']))
+            sel_name = st.selectbox("Select Client", options=list(client_map.keys()))
+            client_id = client_map[sel_name]
+            client = df_clients[df_clients['id'] == client_id].iloc[0].to_dict()
+
+            with st.form("edit_client_form"):
+                c1, c2 = st.columns(2)
+                with c1:
+                    new_name = st.text_input("Name", value=client['name'])
+                    new_mobile = st.text_input("Mobile", value=client.get('mobile_number', ''))
+                    new_type = st.selectbox("Type", ["Regular", "Pioneer"], index=0 if client['type'] == "Regular" else 1)
+                    new_accounts = st.text_input("Accounts", value=client['accounts'] or "")
+                with c2:
+                    new_address = st.text_area("Address", value=client.get('address', ''))
+                    exp_date = pd.to_datetime(client['expiry'], errors='coerce') or datetime.date.today() + datetime.timedelta(days=365)
+                    new_expiry = st.date_input("Expiry", value=exp_date)
+
+                # Referral in Edit - SAME ROBUST FIX
+                pioneers_df = queries.pioneer_options()
+                current_ref_name = "None"
+                if client.get('referred_by') and client['referred_by'] != 0:
+                    current_ref_name = queries.client_name(client['referred_by']) or "None"
+
+                ref_options = ["None"] + pioneers_df['name'].tolist()
+                ref_index = ref_options.index(current_ref_name) if current_ref_name in ref_options else 0
+                ref_name = st.selectbox("Referred By (Pioneer)", ref_options, index=ref_index)
+
+                referred_by = 0
+                if ref_name != "None":
+                    matched = pioneers_df[pioneers_df['name'] == ref_name]
+                    if not matched.empty:
+                        referred_by = int(matched['id'].iloc[0])
+
+                st.info(f"Equity: ${client['current_equity']:,.2f} | Withdrawable: ${client['withdrawable_balance']:,.2f}")
+
+                if st.form_submit_button("💾 Save Changes", type="primary"):
+                    if referrals.would_create_cycle(conn, client_id, referred_by):
+                        st.error(f"{ref_name} is in {client['name']}'s own downline - pick a different upline.")
+                    else:
+                        try:
+                            old_name = client['name']
+                            c.execute("""UPDATE clients
+                                         SET name=?, type=?, accounts=?, expiry=?, address=?, mobile_number=?, referred_by=?
+                                         WHERE id=?""",
+                                      (new_name.strip(), new_type, new_accounts.strip(), new_expiry.isoformat(),
+                                       new_address.strip(), new_mobile.strip(), referred_by, client_id))
+
+                            if new_name.strip().lower() != old_name.lower():
+                                new_ref_code = generate_referral_code(new_name.strip(), client_id)
+                                c.execute("UPDATE clients SET referral_code = ? WHERE id = ?", (new_ref_code, client_id))
+
+                            conn.commit()
+
+                            # Bonus chains through this client changed: refresh just its subtree
+                            old_ref = 0 if pd.isna(client.get('referred_by')) else int(client['referred_by'])
+                            if new_type != client['type'] or referred_by != old_ref:
+                                referrals.bonus_uplines.changed(conn, client_id)
+
+                            add_log("Client Updated", f"ID {client_id} | {new_name} | Referred by: {ref_name}")
+
+                            st.success("Updated successfully!")
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Error: {e}")
+
+    with tab4:
+        st.subheader("Set Client Login")
+        if df_clients.empty:
+            st.info("No clients yet.")
+        else:
+            client_map = dict(zip(df_clients['name'], df_clients['id']))
+            sel_name = st.selectbox("Select Client", options=list(client_map.keys()), key="login_sel")
+            client_id = client_map[sel_name]
+
+            with st.form("set_login_form"):
+                username = st.text_input("Username *")
+                pw1 = st.text_input("Password *", type="password")
+                pw2 = st.text_input("Confirm Password *", type="password")
+
+                if st.form_submit_button("🔐 Set Login", type="primary"):
+                    if not username or not pw1:
+                        st.error("Username and password required!")
+                    elif pw1 != pw2:
+                        st.error("Passwords do not match!")
+                    elif len(pw1) < 8:
+                        st.error("Password must be at least 8 characters!")
+                    else:
+                        try:
+                            hashed = hash_password(pw1)
+                            c.execute("INSERT OR REPLACE INTO users (client_id, username, password) VALUES (?, ?, ?)",
+                                      (client_id, username.strip(), hashed))
+                            conn.commit()
+
+                            add_log("Client Login Set", f"Client {sel_name} | Username: {username}")
+                            st.success("Login credentials set!")
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Error: {e}")
+
+    st.markdown("</div>", unsafe_allow_html=True)
@@ -0,0 +1,190 @@
+"""Helpers shared by the page modules: audit logging, the cached loaders, theme
+colours and the session's client record."""
+import re
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from core import auditlog, queries, rowversion
+from core.cache import versioned_cache
+from core import db
+from core.db import get_conn
+
+# Theme colours, the same ones the global CSS in streamlit_app.py is built from
+THEMES = {
+    "dark": {"bg": "#0f172a", "surface": "rgba(30, 41, 59, 0.6)", "text": "#e2e8f0",
+             "accent": "#3b82f6", "border": "rgba(148, 163, 184, 0.3)"},
+    "light": {"bg": "#f8fafc", "surface": "rgba(255, 255, 255, 0.7)", "text": "#1e293b",
+              "accent": "#2563eb", "border": "rgba(0, 0, 0, 0.1)"},
+}
+
+
+def theme_colors():
+    return THEMES[st.session_state.get("theme", "dark")]
+
+
+def add_log(action, details="", user_type="System", user_id=None):
+    # Queued and written in batches by a background thread (core/auditlog.py)
+    try:
+        auditlog.log(action, details, user_type, user_id)
+    except Exception as e:
+        print(f"Log error: {e}")
+
+# === CACHED LOADERS (REALTIME: INVALIDATED BY TABLE CHANGE COUNTERS, SHARED BY ALL SESSIONS) ===
+@versioned_cache("clients")
+def load_clients():
+    df = queries.all_clients()
+    numeric_cols = ['start_balance', 'current_equity', 'withdrawable_balance']
+    for col in numeric_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df
+
+@versioned_cache("profits")
+def load_profits_summary():
+    return queries.profits_summary()
+
+@versioned_cache("clients")
+def load_client_page(text, client_type, sort, descending, limit, offset):
+    return queries.client_page(text, client_type, sort, descending, limit, offset)
+
+@versioned_cache("clients")
+def load_client_count(text, client_type):
+    return queries.client_count(text, client_type)
+
+@versioned_cache("messages", "clients")
+def load_conversations():
+    return queries.conversations()
+
+@versioned_cache("logs")
+def load_log_count(*log_filter):
+    return queries.log_count(*log_filter)
+
+@versioned_cache("logs")
+def load_log_actions():
+    return queries.log_actions()
+
+@versioned_cache("logs")
+def load_log_user_types():
+    return queries.log_user_types()
+
+@versioned_cache("logs")
+def load_log_date_range():
+    return queries.log_date_range()
+
+@versioned_cache("logs")
+def load_log_archive_range():
+    return queries.log_archive_range()
+
+# Derived from load_clients(), like everything client pages show about clients:
+# a client run then reads the clients table once at most (refresh_current_client)
+@versioned_cache("clients")
+def load_active_client_count(today):
+    # Same rule as before: no / unparseable expiry counts as active
+    expiry = pd.to_datetime(load_clients()['expiry'], errors='coerce', format='ISO8601')
+    return int((expiry.isna() | (expiry.dt.strftime('%Y-%m-%d') > today)).sum())
+
+@versioned_cache("clients")
+def load_top_clients(limit=5):
+    top = load_clients().nlargest(limit, 'current_equity')
+    return top[['name', 'type', 'current_equity']].reset_index(drop=True)
+
+# Non-cached for logs (always fresh)
+def load_recent_logs():
+    return queries.recent_logs(20)
+
+# === OPTIMIZED REFERRAL CODE (FAST & SAFE) ===
+def generate_referral_code(name, client_id):
+    base = ''.join(e for e in name.lower().replace(" ", "") if e.isalnum())
+    code_base = f"{base}{client_id}"
+    
+    existing = queries.referral_codes_with_prefix(code_base)
+    
+    suffixes = []
+    for code in existing:
+        if code.startswith(code_base):
+            suffix = code[len(code_base):]
+            if suffix.isdigit():
+                suffixes.append(int(suffix))
+    
+    counter = 1
+    while counter in suffixes:
+        counter += 1
+    
+    return code_base if counter == 1 else f"{code_base}{counter}"
+
+# === REFRESH CURRENT CLIENT (SESSION SNAPSHOT, REVALIDATED ONCE PER RUN - core/rowversion.py) ===
+_snapshot_lock = threading.Lock()
+_snapshot_stats = {"checks": 0, "reloads": 0, "runs": 0, "reads": 0, "max_reads_per_run": 0}
+# Statements that read the clients table (client_versions is a table of its own)
+_READS_CLIENTS = re.compile(r"\b(?:FROM|JOIN)\s+clients\b", re.IGNORECASE)
+_run_reads = threading.local()
+
+
+def _count_clients_reads(sql, params, seconds, rows):
+    # Statement observer (core/db.py): every clients read of a counted run, whoever makes it
+    if getattr(_run_reads, "count", None) is None or not _READS_CLIENTS.search(sql):
+        return
+    _run_reads.count += 1
+    with _snapshot_lock:
+        _snapshot_stats['reads'] += 1
+        _snapshot_stats['max_reads_per_run'] = max(_snapshot_stats['max_reads_per_run'], _run_reads.count)
+
+
+db.observe(_count_clients_reads)
+
+
+def count_clients_reads(enabled):
+    """Start counting the clients reads of the run on this thread (client sessions), or stop."""
+    _run_reads.count = 0 if enabled else None
+    if enabled:
+        with _snapshot_lock:
+            _snapshot_stats['runs'] += 1
+
+
+def refresh_current_client():
+    """Bring st.session_state.current_client up to date, at most one clients read per run.
+
+    The first call of a run compares the row's counter in client_versions with
+    the one the snapshot was read at, and takes the row again only if it
+    moved.  Later calls in the same run (menu, then the page) return at once.
+    The row comes from the shared load_clients() frame, the one source of
+    clients data on client pages: the only clients read a run can make is that
+    frame's reload after a change, whoever in the process asks for it first.
+    """
+    client_id = st.session_state.get('client_id')
+    if not client_id:
+        return
+    run = st.session_state.get('run_serial', 0)
+    snapshot = st.session_state.get('client_snapshot')
+    if snapshot is None or snapshot['client_id'] != client_id:
+        snapshot = {'client_id': client_id, 'version': None, 'run': None}
+    if snapshot['run'] == run and st.session_state.get('current_client') is not None:
+        return
+    snapshot['run'] = run
+    try:
+        # Counter first: a write landing in between only makes the copy look older than it is
+        version = rowversion.client_version(get_conn(), client_id)
+        stale = version != snapshot['version'] or st.session_state.get('current_client') is None
+        if stale:
+            clients = load_clients()
+            client_data = clients[clients['id'] == client_id]
+            if not client_data.empty:
+                st.session_state.current_client = client_data.iloc[0].to_dict()
+                snapshot['version'] = version
+        with _snapshot_lock:
+            _snapshot_stats['checks'] += 1
+            _snapshot_stats['reloads'] += int(stale)
+    except Exception as e:
+        st.error("Error refreshing profile data. Please re-login.")
+        print(f"Refresh client error: {e}")
+    st.session_state.client_snapshot = snapshot
+
+
+def client_snapshot_stats():
+    """Process-wide counters: revalidations and row reloads of refresh_current_client, then
+    the client runs counted, the statements they ran against clients (any page, any
+    helper, cache misses included) and the most any single run made."""
+    with _snapshot_lock:
+        return dict(_snapshot_stats)
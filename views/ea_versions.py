@@ -0,0 +1,98 @@
+# ------------------------- SUPER ULTIMATE EA VERSIONS MANAGEMENT (OWNER ONLY) -------------------------
+import datetime
+import os
+
+import streamlit as st
+
+from core import queries
+from core.db import get_conn
+from views.common import add_log
+
+
+def render(selected):
+    conn = get_conn()
+    c = conn.cursor()
+    if not st.session_state.is_owner:
+        st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+        st.error("🚫 Access Denied")
+        st.write("EA Versions Management is only available to Owner.")
+        st.markdown("</div>", unsafe_allow_html=True)
+    else:
+        st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+        st.header("🤖 EA Versions Management")
+        st.markdown("#### Upload and distribute new EA builds securely")
+
+        # Upload form
+        with st.form("upload_ea_form", clear_on_submit=True):
+            version_name = st.text_input("Version Name *", placeholder="e.g. v3.5 Ultimate Pro")
+            release_notes = st.text_area("Release Notes (optional)", placeholder="List new features, fixes, improvements...")
+            ea_file = st.file_uploader(
+                "Upload EA File (.ex4, .ex5, .mq4, .mq5)",
+                type=["ex4", "ex5", "mq4", "mq5"],
+                key="ea_upload"
+            )
+
+            upload_btn = st.form_submit_button("📤 UPLOAD NEW VERSION", type="primary", use_container_width=True)
+
+            if upload_btn:
+                if not version_name.strip():
+                    st.error("Version name is required!")
+                elif not ea_file:
+                    st.error("Please select an EA file to upload!")
+                else:
+                    try:
+                        # Safe filename
+                        safe_filename = f"KMFX_EA_{version_name.replace(' ', '_').replace('.', '_')}_{ea_file.name}"
+                        file_path = f"uploaded_files/{safe_filename}"
+
+                        # Save file
+                        with open(file_path, "wb") as f:
+                            f.write(ea_file.getbuffer())
+
+                        # Save to database
+                        c.execute("""INSERT INTO ea_versions 
+                                     (version, file_name, upload_date, notes)
+                                     VALUES (?, ?, ?, ?)""",
+                                  (version_name.strip(), safe_filename,
+                                   datetime.date.today().isoformat(), release_notes.strip() or "No notes"))
+                        conn.commit()
+
+                        add_log("EA Version Uploaded", f"{version_name} - {ea_file.name}")
+                        st.success(f"✅ EA Version '{version_name}' uploaded successfully!")
+
+                        # Show immediate preview
+                        st.balloons()
+
+                    except Exception as e:
+                        st.error(f"Error uploading EA: {e}")
+
+        st.markdown("---")
+
+        # Available versions list
+        st.subheader("Available EA Versions")
+
+        versions = queries.ea_versions()
+
+        if versions.empty:
+            st.info("No EA versions uploaded yet. Upload the first one above!")
+        else:
+            for _, v in versions.iterrows():
+                with st.expander(f"📦 {v['version']} • Uploaded: {v['upload_date']}", expanded=False):
+                    if v['notes']:
+                        st.write(f"**Release Notes:**\n{v['notes']}")
+
+                    file_path = f"uploaded_files/{v['file_name']}"
+                    if os.path.exists(file_path):
+                        with open(file_path, "rb") as f:
+                            st.download_button(
+                                label="📥 Download EA File",
+                                data=f.read(),
+                                file_name=v['file_name'],
+                                mime="application/octet-stream",
+                                use_container_width=True,
+                                key=f"ea_dl_{v.name}"
+                            )
+                    else:
+                        st.error("File missing on server. Contact developer.")
+
+        st.markdown("</div>", unsafe_allow_html=True)
@@ -0,0 +1,117 @@
+# ------------------------- SUPER ULTIMATE FILE VAULT / MY FILES -------------------------
+import datetime
+import os
+
+import streamlit as st
+
+from core import queries
+from core.db import get_conn
+from views.common import add_log, load_clients
+
+
+def render(selected):
+    conn = get_conn()
+    c = conn.cursor()
+    st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+
+    if st.session_state.is_owner or st.session_state.is_admin:
+        # ====================== OWNER / ADMIN VIEW ======================
+        st.header("📁 File Vault")
+        st.markdown("#### Securely send files to clients")
+
+        df_clients = load_clients()
+        if df_clients.empty:
+            st.info("No clients available yet. Add them in Client Management first.")
+        else:
+            # Client selector
+            client_options = {row['name']: row['id'] for _, row in df_clients.iterrows()}
+            selected_name = st.selectbox(
+                "Select Client to Send Files",
+                options=list(client_options.keys())
+            )
+            client_id = client_options[selected_name]
+
+            # File upload form
+            with st.form("send_files_form", clear_on_submit=True):
+                notes = st.text_area("Notes (optional)", placeholder="e.g. Latest EA update instructions")
+                uploaded_files = st.file_uploader(
+                    "Choose files to send",
+                    accept_multiple_files=True,
+                    key="admin_upload"
+                )
+
+                send = st.form_submit_button("📤 SEND FILES TO CLIENT", type="primary", use_container_width=True)
+
+                if send:
+                    if not uploaded_files:
+                        st.error("Please select at least one file.")
+                    else:
+                        try:
+                            sender = "Owner" if st.session_state.is_owner else "Admin"
+                            for file in uploaded_files:
+                                safe_filename = f"{client_id}_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}_{file.name}"
+                                file_path = f"uploaded_files/client_files/{safe_filename}"
+                                with open(file_path, "wb") as f:
+                                    f.write(file.getbuffer())
+
+                                c.execute("""INSERT INTO client_files 
+                                             (client_id, file_name, original_name, upload_date, sent_by, notes)
+                                             VALUES (?, ?, ?, ?, ?, ?)""",
+                                          (client_id, safe_filename, file.name,
+                                           datetime.date.today().isoformat(), sender, notes or ""))
+
+                            conn.commit()
+                            add_log("Files Sent", f"{len(uploaded_files)} file(s) to client ID {client_id} ({selected_name})")
+                            st.success(f"✅ {len(uploaded_files)} file(s) sent successfully to {selected_name}!")
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Error sending files: {e}")
+
+            # Recent sent files to this client
+            st.markdown("---")
+            st.subheader("Recently Sent to This Client")
+            recent_sent = queries.client_files(client_id, 10)
+
+            if not recent_sent.empty:
+                for _, row in recent_sent.iterrows():
+                    st.markdown(f"**{row['original_name']}** • Sent on {row['upload_date']} by {row['sent_by']}")
+                    if row['notes']:
+                        st.caption(f"Notes: {row['notes']}")
+            else:
+                st.info("No files sent to this client yet.")
+
+    else:
+        # ====================== CLIENT VIEW ======================
+        st.header("📁 My Files")
+        st.markdown("#### Files sent to you by the team")
+
+        client_id = st.session_state.client_id
+
+        files = queries.client_files(client_id)
+
+        if files.empty:
+            st.info("No files have been sent to you yet.\n\n"
+                    "New EA updates, instructions, and resources will appear here.")
+        else:
+            st.success(f"You have {len(files)} file(s) available")
+
+            for _, row in files.iterrows():
+                with st.expander(f"📎 {row['original_name']} • Sent on {row['upload_date']} by {row['sent_by']}"):
+                    if row['notes']:
+                        st.write(f"**Notes:** {row['notes']}")
+
+                    file_path = f"uploaded_files/client_files/{row['file_name']}"
+                    if os.path.exists(file_path):
+                        with open(file_path, "rb") as f:
+                            st.download_button(
+                                label="📥 Download File",
+                                data=f.read(),
+                                file_name=row['original_name'],
+                                mime="application/octet-stream",
+                                use_container_width=True,
+                                key=f"client_dl_{row.name}"
+                            )
+                    else:
+                        st.error("File not found on server. Contact support.")
+
+    st.markdown("</div>", unsafe_allow_html=True)
@@ -0,0 +1,144 @@
+# ------------------------- SUPER ULTIMATE DASHBOARD HOME (LATEST FIXED - REALTIME KPIs) -------------------------
+import datetime
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from core import auditlog, kpi, queries, timeseries
+from core.cache import cache_stats
+from core.db import get_conn
+from views.common import client_snapshot_stats, load_active_client_count, load_top_clients, refresh_current_client, theme_colors
+
+
+def render(selected):
+    conn = get_conn()
+    accent = theme_colors()["accent"]
+    st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+    st.header("📊 KMFX Elite Command Center")
+
+    # === KPIs - REALTIME FROM TRIGGER-MAINTAINED AGGREGATES (core/kpi.py), NO FULL TABLE LOADS ===
+    kpis = kpi.read_totals(conn)
+    total_revenue = kpis['total_revenue']
+    total_paid = kpis['withdrawals_paid']  # CRITICAL FIX: Only count PAID (not Approved)
+    pending_wd = kpis['withdrawals_pending']
+    total_clients = kpis['total_clients']
+    active_clients = load_active_client_count(datetime.date.today().isoformat())
+    total_licenses = kpis['licenses_issued']
+    revenue = timeseries.revenue_series("month")
+
+    col1, col2, col3, col4, col5, col6 = st.columns(6)
+    col1.metric("💰 Total Revenue", f"${total_revenue:,.2f}")
+    col2.metric("✅ Paid Withdrawals", f"${total_paid:,.2f}")  # Now realtime!
+    col3.metric("⏳ Pending Requests", f"${pending_wd:,.2f}")
+    col4.metric("👥 Total Clients", total_clients)
+    col5.metric("🟢 Active Clients", active_clients)
+    col6.metric("🔑 Licenses Issued", total_licenses)
+
+    if st.session_state.is_owner:
+        stats = cache_stats()
+        st.caption(f"⚡ Data cache: {stats['hit_rate']:.0%} hit rate • {stats['hits']} hits / {stats['misses']} misses • {stats['entries']} entries")
+        log_stats = auditlog.stats()
+        st.caption(f"📝 Audit log queue: {log_stats['depth']}/{log_stats['capacity']} waiting (peak {log_stats['max_depth']}) • "
+                   f"{log_stats['written']} written in {log_stats['batches']} batches • "
+                   f"{log_stats['inline']} inline • {log_stats['dropped']} dropped • {log_stats['failed']} failed")
+        snap_stats = client_snapshot_stats()
+        st.caption(f"👤 Client sessions: {snap_stats['checks']} revalidations • {snap_stats['reloads']} row reloads • "
+                   f"{snap_stats['reads']} clients reads in {snap_stats['runs']} reruns • "
+                   f"at most {snap_stats['max_reads_per_run']} in one rerun")
+
+    st.markdown("---")
+    # === 2 COLUMN LAYOUT ===
+    col_left, col_right = st.columns(2)
+    with col_left:
+        st.subheader("📈 Revenue Growth (Your Share + Referral Bonuses)")
+        if revenue['x']:
+            fig = px.area(x=revenue['x'], y=revenue['total'],
+                          color_discrete_sequence=[accent])
+            fig.update_layout(
+                template="plotly_dark" if st.session_state.theme == "dark" else "plotly_white",
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+                xaxis_title="Month",
+                yaxis_title="Revenue ($)",
+                showlegend=False,
+                height=500
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("Revenue will appear here after first profit recorded.")
+
+        st.subheader("🏆 Top 5 Performing Clients")
+        top = load_top_clients(5)
+        if not top.empty:
+            top['current_equity'] = top['current_equity'].apply(lambda x: f"${x:,.0f}")
+            top = top.rename(columns={'name': 'Client', 'type': 'Type', 'current_equity': 'Equity'})
+            st.dataframe(top, use_container_width=True, hide_index=True)
+        else:
+            st.info("Clients will appear as they grow their equity.")
+
+    with col_right:
+        st.subheader("📊 Profit Sources Breakdown")
+        if revenue['x']:
+            sources = pd.DataFrame({
+                'Source': ['Your Share', 'Referral Bonuses'],
+                'Amount': [kpis['revenue_your_share'], kpis['revenue_referral_bonus']]
+            })
+            fig_pie = px.pie(sources, values='Amount', names='Source',
+                            color_discrete_sequence=[accent, "#f59e0b"],
+                            hole=0.4)
+            fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+            fig_pie.update_layout(
+                template="plotly_dark" if st.session_state.theme == "dark" else "plotly_white",
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+                showlegend=False,
+                height=400
+            )
+            st.plotly_chart(fig_pie, use_container_width=True)
+        else:
+            st.info("Profit sources will show after recording profits.")
+
+        st.subheader("💳 Recent Withdrawals")
+        recent_wd = queries.recent_withdrawals(8)
+        if not recent_wd.empty:
+            for _, wd in recent_wd.iterrows():
+                status = "✅ Paid" if wd['status'] == 'Paid' else "👍 Approved" if wd['status'] == 'Approved' else "⏳ Pending" if wd['status'] == 'Pending' else "❌ Rejected"
+                st.markdown(f"{status} **${wd['amount']:,.2f}** • {wd['date_requested']}")
+        else:
+            st.info("No withdrawal activity yet.")
+
+    # === CLIENT PERSONAL DASHBOARD ===
+    if not (st.session_state.is_owner or st.session_state.is_admin):
+        st.markdown("---")
+        st.subheader("🌟 Your Personal Dashboard")
+        refresh_current_client()
+        client = st.session_state.current_client
+        client_id = client['id']
+        
+        record_count, share_total, bonus_total = queries.earnings_totals(client_id)
+        
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("💰 Current Equity", f"${client['current_equity']:,.2f}")
+        col2.metric("💸 Withdrawable", f"${client['withdrawable_balance']:,.2f}")
+        total_earned = share_total + bonus_total
+        col3.metric("🌟 Total Earned", f"${total_earned:,.2f}")
+        col4.metric("📊 Profit Records", record_count)
+
+        # Daily equity points aggregated in SQL (core/timeseries.py)
+        equity = timeseries.client_equity_series(client_id, client.get('start_balance', 0), bucket="day")
+        if equity['x']:
+            fig_client = px.line(x=equity['x'], y=equity['equity'], title="Your Equity Growth Journey", color_discrete_sequence=[accent])
+            fig_client.update_layout(
+                template="plotly_dark" if st.session_state.theme == "dark" else "plotly_white",
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+                height=450,
+                xaxis_title="Date",
+                yaxis_title="Equity ($)"
+            )
+            st.plotly_chart(fig_client, use_container_width=True)
+        else:
+            st.info("Your equity growth chart will appear after your first profit is recorded.")
+
+    st.markdown("</div>", unsafe_allow_html=True)
@@ -0,0 +1,204 @@
+# ------------------------- SUPER ULTIMATE MESSAGES SYSTEM (FULLY FIXED) -------------------------
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+from core import events, queries, search
+from core.db import get_conn
+from views.common import add_log, load_conversations
+
+
+def render(selected):
+    conn = get_conn()
+    c = conn.cursor()
+    st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+
+    # Define accent color based on current theme (SAFE INSIDE BLOCK)
+    if st.session_state.theme == "dark":
+        accent_color = "#3b82f6"  # Blue for dark
+        bubble_bg_client = "rgba(15, 25, 50, 0.8)"
+    else:
+        accent_color = "#2563eb"  # Blue for light
+        bubble_bg_client = "rgba(255, 255, 255, 0.9)"
+
+    # ====================== OWNER / ADMIN VIEW ======================
+    if st.session_state.is_owner or st.session_state.is_admin:
+        st.header("💬 Messages Center")
+        st.markdown("#### Private support chat with clients")
+
+        conversations = load_conversations()
+
+        if conversations.empty:
+            st.info("No messages yet. Clients will appear here when they send a message.")
+        else:
+            total_unread = conversations['unread'].sum()
+            if total_unread > 0:
+                st.success(f"📬 You have {total_unread} unread message(s)")
+
+            message_search = st.text_input("🔍 Search all messages", key="msg_search")
+            if search.match_expression(message_search):
+                hits = queries.search_messages(message_search)
+                if hits.empty:
+                    st.info("No messages match your search.")
+                else:
+                    hits['from'] = hits['from_admin'].fillna(hits['name'])
+                    hits['timestamp'] = pd.to_datetime(hits['timestamp'], errors='coerce').dt.strftime('%b %d, %Y %H:%M')
+                    st.dataframe(hits[['name', 'from', 'message', 'timestamp']].rename(columns={'name': 'conversation'}),
+                                 use_container_width=True, hide_index=True)
+
+            client_map = dict(zip(conversations['name'], conversations['id']))
+            unread = conversations.drop_duplicates('name').set_index('name')['unread'].to_dict()
+            selected_name = st.selectbox(
+                "Select Client Conversation",
+                options=list(client_map.keys()),
+                format_func=lambda x: f"{x} {'🟢 ' + str(unread[x]) + ' new' if unread[x] > 0 else ''}"
+            )
+            selected_id = client_map[selected_name]
+
+            # Mark as read
+            c.execute("UPDATE messages SET read = 1 WHERE from_client_id = ? AND read = 0", (selected_id,))
+            conn.commit()
+
+            # Chat thread
+            thread = queries.message_thread(selected_id)
+
+            chat_container = st.container()
+            with chat_container:
+                for _, msg in thread.iterrows():
+                    time_str = pd.to_datetime(msg['timestamp']).strftime('%b %d, %H:%M')
+                    if msg['from_client_id']:
+                        # Client message
+                        st.markdown(f"""
+                        <div style="text-align: left; margin: 15px 0;">
+                            <div style="display: inline-block; background: {bubble_bg_client}; padding: 12px 18px; border-radius: 18px; max-width: 70%; backdrop-filter: blur(10px);">
+                                <p style="margin:0;"><strong>{selected_name}</strong><br>{msg['message']}</p>
+                                <small style="opacity: 0.7;">{time_str}</small>
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+                    else:
+                        # Admin message
+                        sender = msg['from_admin'] or "Support"
+                        st.markdown(f"""
+                        <div style="text-align: right; margin: 15px 0;">
+                            <div style="display: inline-block; background: {accent_color}; padding: 12px 18px; border-radius: 18px; max-width: 70%; color: white;">
+                                <p style="margin:0;"><strong>You ({sender})</strong><br>{msg['message']}</p>
+                                <small style="opacity: 0.8;">{time_str}</small>
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+
+            # Reply form
+            st.markdown("---")
+            with st.form("reply_form", clear_on_submit=True):
+                reply_text = st.text_area("Type your reply", height=100)
+                reply_files = st.file_uploader("Attach files", accept_multiple_files=True, key=f"reply_files_{selected_id}")
+
+                if st.form_submit_button("📤 Send Reply", type="primary", use_container_width=True):
+                    if not reply_text and not reply_files:
+                        st.error("Write a message or attach a file.")
+                    else:
+                        try:
+                            sender = "Owner" if st.session_state.is_owner else "Admin"
+                            c.execute("""INSERT INTO messages 
+                                         (from_admin, to_client_id, message, timestamp)
+                                         VALUES (?, ?, ?, ?)""",
+                                      (sender, selected_id, reply_text or "", datetime.datetime.now().isoformat()))
+                            msg_id = c.lastrowid
+
+                            if reply_files:
+                                for file in reply_files:
+                                    safe_name = f"{msg_id}_{file.name}"
+                                    path = f"uploaded_files/messages/{safe_name}"
+                                    with open(path, "wb") as f:
+                                        f.write(file.getbuffer())
+                                    c.execute("""INSERT INTO message_attachments 
+                                                 (message_id, file_name, original_name)
+                                                 VALUES (?, ?, ?)""",
+                                              (msg_id, safe_name, file.name))
+
+                            events.publish(conn, "message.to_client", selected_id, message_id=msg_id,
+                                           text=f"✉️ New message from {sender}")
+                            conn.commit()
+                            add_log("Message Sent", f"To client {selected_name}")
+                            st.success("Reply sent!")
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Error: {e}")
+
+    # ====================== CLIENT VIEW ======================
+    else:
+        st.header("💬 Support Messages")
+        st.markdown("#### Chat with the KMFX team")
+
+        client_id = st.session_state.client_id
+
+        thread = queries.client_message_thread(client_id)
+
+        chat_container = st.container()
+        with chat_container:
+            if thread.empty:
+                st.info("No messages yet. Start the conversation below!")
+            else:
+                for _, msg in thread.iterrows():
+                    time_str = pd.to_datetime(msg['timestamp']).strftime('%b %d, %H:%M')
+                    if msg['from_admin']:
+                        # Admin message
+                        st.markdown(f"""
+                        <div style="text-align: left; margin: 15px 0;">
+                            <div style="display: inline-block; background: {accent_color}; padding: 12px 18px; border-radius: 18px; max-width: 70%; color: white;">
+                                <strong>Support Team</strong><br>{msg['message']}<br>
+                                <small style="opacity: 0.8;">{time_str}</small>
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+                    else:
+                        # Client message
+                        st.markdown(f"""
+                        <div style="text-align: right; margin: 15px 0;">
+                            <div style="display: inline-block; background: {bubble_bg_client}; padding: 12px 18px; border-radius: 18px; max-width: 70%; backdrop-filter: blur(10px);">
+                                <strong>You</strong><br>{msg['message']}<br>
+                                <small style="opacity: 0.7;">{time_str}</small>
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+
+        # Send message form
+        st.markdown("---")
+        with st.form("client_message_form", clear_on_submit=True):
+            client_message = st.text_area("Your message to support", height=100)
+            client_files = st.file_uploader("Attach files", accept_multiple_files=True, key="client_upload")
+
+            if st.form_submit_button("📤 Send Message", type="primary", use_container_width=True):
+                if not client_message and not client_files:
+                    st.error("Write a message or attach a file.")
+                else:
+                    try:
+                        c.execute("""INSERT INTO messages 
+                                     (from_client_id, message, timestamp)
+                                     VALUES (?, ?, ?)""",
+                                  (client_id, client_message or "", datetime.datetime.now().isoformat()))
+                        msg_id = c.lastrowid
+
+                        if client_files:
+                            for file in client_files:
+                                safe_name = f"{msg_id}_{file.name}"
+                                path = f"uploaded_files/messages/{safe_name}"
+                                with open(path, "wb") as f:
+                                    f.write(file.getbuffer())
+                                c.execute("""INSERT INTO message_attachments 
+                                             (message_id, file_name, original_name)
+                                             VALUES (?, ?, ?)""",
+                                          (msg_id, safe_name, file.name))
+
+                        events.publish(conn, "message.from_client", client_id, message_id=msg_id,
+                                       text=f"✉️ New message from {st.session_state.current_client['name']}")
+                        conn.commit()
+                        add_log("Message Received", f"From client ID {client_id}")
+                        st.success("Message sent to support!")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error: {e}")
+
+    st.markdown("</div>", unsafe_allow_html=True)
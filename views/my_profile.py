@@ -0,0 +1,143 @@
+# ------------------------- SUPER ULTIMATE MY PROFILE (REAL-TIME BALANCE FIX) -------------------------
+import pandas as pd
+import streamlit as st
+
+from core import queries
+from core.auth import check_password, hash_password
+from core.db import get_conn
+from views.common import add_log, refresh_current_client, theme_colors
+
+
+def render(selected):
+    conn = get_conn()
+    c = conn.cursor()
+    colors = theme_colors()
+    accent = colors["accent"]
+    surface_color = colors["surface"]
+    border_color = colors["border"]
+    st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+
+    if st.session_state.is_owner or st.session_state.is_admin:
+        st.info("👑 This page is for client personal profile only.")
+        st.write("Owner/Admin accounts are managed separately.")
+    else:
+        st.header("👤 My Profile")
+        st.markdown("#### Personal information and account settings")
+
+        # === CRITICAL FIX: FORCE REFRESH CLIENT DATA FROM DATABASE EVERY TIME ===
+        refresh_current_client()  # This line is the key!
+        client = st.session_state.current_client
+        client_id = client['id']
+
+        # Profile Avatar & Basic Info
+        with st.container():
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                st.markdown(f"""
+                <div style="
+                    text-align: center;
+                    padding: 20px;
+                    background: {surface_color};
+                    border-radius: 16px;
+                    backdrop-filter: blur(10px);
+                    border: 1px solid {border_color};
+                ">
+                    <div style="
+                        width: 120px;
+                        height: 120px;
+                        background: {accent};
+                        color: white;
+                        border-radius: 50%;
+                        display: flex;
+                        align-items: center;
+                        justify-content: center;
+                        font-size: 3rem;
+                        font-weight: bold;
+                        margin: 0 auto 16px;
+                    ">
+                        {client['name'][0].upper()}
+                    </div>
+                    <h3>{client['name']}</h3>
+                    <p style="margin: 4px 0; color: #94a3b8;">{client['type']} Member</p>
+                    <p style="margin: 4px 0;">ID: {client_id}</p>
+                </div>
+                """, unsafe_allow_html=True)
+
+            with col2:
+                st.markdown(f"""
+                <div style="
+                    background: {surface_color};
+                    backdrop-filter: blur(10px);
+                    border-radius: 16px;
+                    padding: 24px;
+                    height: 100%;
+                    border: 1px solid {border_color};
+                ">
+                    <h4>📋 Account Details</h4>
+                    <table style="width: 100%; font-size: 1.1rem;">
+                        <tr><td><strong>Referral Code</strong></td><td><code>{client.get('referral_code', 'N/A')}</code></td></tr>
+                        <tr><td><strong>Mobile Number</strong></td><td>{client.get('mobile_number', 'Not set')}</td></tr>
+                        <tr><td><strong>Address</strong></td><td>{client.get('address', 'Not set')}</td></tr>
+                        <tr><td><strong>Accounts</strong></td><td>{client.get('accounts', 'Not set')}</td></tr>
+                        <tr><td><strong>Join Date</strong></td><td>{pd.to_datetime(client.get('add_date')).strftime('%b %d, %Y') if client.get('add_date') else 'N/A'}</td></tr>
+                        <tr><td><strong>Expiry Date</strong></td><td>{pd.to_datetime(client.get('expiry')).strftime('%b %d, %Y') if client.get('expiry') else 'No expiry'}</td></tr>
+                    </table>
+                </div>
+                """, unsafe_allow_html=True)
+
+        st.markdown("---")
+
+        # === EARNINGS SUMMARY (REAL-TIME) ===
+        st.subheader("💰 Earnings Summary")
+        _, total_client_share, total_referral = queries.earnings_totals(client_id)
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Your Share from Profits", f"${total_client_share:,.2f}")
+        col2.metric("Referral Bonuses", f"${total_referral:,.2f}")
+        col3.metric("Total Earnings", f"${total_client_share + total_referral:,.2f}")
+
+        # === CURRENT BALANCES (REAL-TIME FROM REFRESH) ===
+        st.markdown("---")
+        st.subheader("💳 Current Balances")
+        col1, col2 = st.columns(2)
+        col1.metric("Current Equity", f"${client['current_equity']:,.2f}")
+        col2.metric("Withdrawable Balance", f"${client['withdrawable_balance']:,.2f}")
+
+        # === CHANGE PASSWORD ===
+        st.markdown("---")
+        st.subheader("🔐 Change Password")
+        with st.form("change_password_form"):
+            current_pw = st.text_input("Current Password", type="password")
+            new_pw = st.text_input("New Password", type="password")
+            confirm_pw = st.text_input("Confirm New Password", type="password")
+
+            if st.form_submit_button("💾 UPDATE PASSWORD", type="primary", use_container_width=True):
+                if not all([current_pw, new_pw, confirm_pw]):
+                    st.error("All fields are required!")
+                elif new_pw != confirm_pw:
+                    st.error("Passwords do not match!")
+                elif len(new_pw) < 8:
+                    st.error("Password must be at least 8 characters!")
+                else:
+                    try:
+                        current_hash = queries.client_password(client_id)
+                        if current_hash and check_password(current_pw, current_hash):
+                            hashed = hash_password(new_pw)
+                            c.execute("UPDATE users SET password = ? WHERE client_id = ?", (hashed, client_id))
+                            conn.commit()
+                            add_log("Password Changed", f"Client ID {client_id}")
+                            st.success("✅ Password updated successfully!")
+                            st.balloons()
+                        else:
+                            st.error("Current password incorrect!")
+                    except Exception as e:
+                        st.error(f"Error: {e}")
+
+        # === LOGOUT ===
+        st.markdown("---")
+        if st.button("🚪 Logout from this device", type="secondary", use_container_width=True):
+            add_log("Logout", f"Client {client['name']} logged out")
+            st.session_state.clear()
+            st.rerun()
+
+    st.markdown("</div>", unsafe_allow_html=True)
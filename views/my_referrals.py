@@ -0,0 +1,171 @@
+# ------------------------- SUPER ULTIMATE MY REFERRALS (FINAL FIXED - NO NAMEERROR, PERFECT TREE) -------------------------
+import pandas as pd
+import streamlit as st
+
+from core import queries, referrals
+from core.db import get_conn
+from views.common import load_clients, refresh_current_client, theme_colors
+
+
+def render(selected):
+    conn = get_conn()
+    accent = theme_colors()["accent"]
+    st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+    
+    if st.session_state.is_owner or st.session_state.is_admin:
+        st.info("👑 This page is exclusive for Pioneer members.")
+        st.write("Pioneers can view their downline and referral earnings here.")
+        st.stop()
+    
+    refresh_current_client()
+    client = st.session_state.current_client
+    
+    if client['type'] != "Pioneer":
+        st.error("🚫 Access Denied")
+        st.write("My Referrals is only available to Pioneer members.")
+        st.stop()
+    
+    st.header("🌳 My Referrals")
+    st.markdown("#### Your downline network & referral earnings")
+    
+    client_id = client['id']
+    
+    # === STATS ===
+    ref_bonus_total = queries.earnings_totals(client_id)[2]
+    
+    direct_refs = referrals.subtree_count(conn, client_id, max_depth=1)
+    total_downline = referrals.subtree_count(conn, client_id)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("🎁 Total Referral Bonus", f"${ref_bonus_total:,.2f}")
+    col2.metric("👥 Direct Referrals", direct_refs)
+    col3.metric("🌐 Total Downline", total_downline)
+    col4.metric("🔗 Your Referral Code", f"`{client.get('referral_code', 'N/A')}`")
+    
+    st.code(f"https://yourdomain.com/register?ref={client.get('referral_code', 'yourcode')}", language="text")
+    
+    st.markdown("---")
+    
+    # === FIXED REFERRAL TREE (NO NAMEERROR) ===
+    st.subheader("🌿 Your Referral Tree")
+    st.markdown("#### Visual network of your growing downline")
+
+    # One closure query for the whole downline, named from the shared clients frame, nested in memory
+    clients = load_clients()
+    tree_data = referrals.build_tree(referrals.get_subtree(conn, client_id, clients), client_id)
+
+    if not tree_data:
+        st.info("🌱 Your downline is growing! Share your referral code to build your powerful network.")
+    else:
+        def display_tree(nodes, prefix="", is_last=True, depth=0):
+            for i, node in enumerate(nodes):
+                is_last_node = i == len(nodes) - 1
+                branch = "└── " if is_last_node else "├── "
+                connector = "    " if is_last_node else "│   "
+
+                badge = "👑 <span style='color:#fbbf24; font-weight:bold;'>Pioneer Leader</span>" if node['type'] == "Pioneer" else "👤 <span style='color:#94a3b8;'>Regular Member</span>"
+
+                glow = "text-shadow: 0 0 10px rgba(59,130,246,0.7);" if depth == 0 else ""
+                st.markdown(f"{prefix}{branch} <strong style='font-size:1.1rem; {glow}'>{node['name']}</strong> • {badge}", unsafe_allow_html=True)
+
+                new_prefix = prefix + connector
+                if node['children']:
+                    display_tree(node['children'], new_prefix, is_last_node, depth + 1)
+
+        # Premium container
+        st.markdown("""
+        <div style="
+            background: linear-gradient(135deg, rgba(15, 25, 50, 0.9), rgba(30, 41, 79, 0.8));
+            backdrop-filter: blur(16px);
+            border-radius: 20px;
+            padding: 32px;
+            border: 2px solid rgba(59, 130, 246, 0.4);
+            box-shadow: 0 10px 30px rgba(0,0,0,0.3), 0 0 20px rgba(59,130,246,0.2);
+            font-family: 'Courier New', monospace;
+            font-size: 17px;
+            line-height: 2.2;
+            margin: 20px 0;
+            position: relative;
+            overflow: hidden;
+        ">
+            <div style="position: absolute; top: -50%; left: -50%; width: 200%; height: 200%; background: radial-gradient(circle, rgba(59,130,246,0.1) 0%, transparent 70%); pointer-events: none; animation: pulse 8s infinite;"></div>
+            <style>@keyframes pulse {0% {transform: translate(50%,50%) scale(1); opacity: 0.3;} 50% {opacity: 0.5;} 100% {transform: translate(50%,50%) scale(1.2); opacity: 0.2;}}</style>
+        """, unsafe_allow_html=True)
+
+        st.markdown(f"""
+        <div style="text-align:center; margin-bottom:30px;">
+            <div style="display:inline-block; padding:15px 40px; background:{accent}; border-radius:50px; color:white; font-size:1.4rem; font-weight:bold; box-shadow:0 0 20px rgba(59,130,246,0.6);">
+                🌟 {client['name']} (You) • Pioneer Leader
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+
+        display_tree(tree_data, depth=0)
+        st.markdown("</div>", unsafe_allow_html=True)
+
+        st.caption("👑 Pioneer Leader • 👤 Regular Member • Deeper levels = stronger growth")
+
+    # === BONUS HISTORY (keep the amazing style from before) ===
+    st.markdown("---")
+    st.subheader("🎁 Referral Bonus History")
+    st.markdown("#### Your earnings from downline profits – pure passive income!")
+
+    bonus_history = queries.referral_bonus_history(client_id)
+    bonus_history['from_client'] = bonus_history['client_id'].map(clients.set_index('id')['name'])
+
+    if bonus_history.empty:
+        st.info("🌟 Referral bonuses will appear here once your downline starts generating profits.\n\nThe more active your network, the bigger your passive earnings!")
+    else:
+        total_bonus = bonus_history['referral_bonus'].sum()
+        st.markdown(f"""
+        <div style="text-align:center; margin:30px 0;">
+            <div style="display:inline-block; padding:20px 60px; background:linear-gradient(135deg, #1e3a8a, #3b82f6); border-radius:30px; color:white; font-size:2rem; font-weight:bold; box-shadow:0 0 30px rgba(59,130,246,0.8);">
+                Total Referral Earnings: ${total_bonus:,.2f} 💎
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown("""
+        <div style="
+            background: linear-gradient(135deg, rgba(15, 25, 50, 0.9), rgba(30, 41, 79, 0.8));
+            backdrop-filter: blur(16px);
+            border-radius: 20px;
+            padding: 20px;
+            border: 2px solid rgba(251, 191, 36, 0.4);
+            box-shadow: 0 10px 30px rgba(0,0,0,0.3), 0 0 25px rgba(251,191,36,0.2);
+        ">
+        """, unsafe_allow_html=True)
+
+        for _, row in bonus_history.iterrows():
+            date_str = pd.to_datetime(row['date']).strftime('%b %d, %Y')
+            bonus_str = f"${row['referral_bonus']:,.2f}"
+            st.markdown(f"""
+            <div style="
+                display: flex;
+                justify-content: space-between;
+                align-items: center;
+                padding: 18px 24px;
+                margin: 12px 0;
+                background: rgba(59, 130, 246, 0.15);
+                border-radius: 16px;
+                border-left: 6px solid #fbbf24;
+                box-shadow: 0 4px 15px rgba(251,191,36,0.2);
+            ">
+                <div style="flex: 1;">
+                    <div style="font-size:1.2rem; font-weight:bold; color:#fbbf24;">🏆 Bonus Earned</div>
+                    <div style="color:#e2e8f0; margin-top:8px;">From: <strong>{row['from_client']}</strong></div>
+                </div>
+                <div style="text-align:right;">
+                    <div style="font-size:1.8rem; font-weight:bold; color:#fbbf24; text-shadow: 0 0 15px rgba(251,191,36,0.6);">
+                        +{bonus_str}
+                    </div>
+                    <div style="color:#94a3b8; font-size:0.9rem; margin-top:4px;">{date_str}</div>
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+
+        st.markdown("</div>", unsafe_allow_html=True)
+
+        st.caption("💡 Every profit from your downline = automatic bonus. Build deeper, earn forever!")
+
+    st.markdown("</div>", unsafe_allow_html=True)
@@ -0,0 +1,79 @@
+# ------------------------- SUPER ULTIMATE NOTIFICATIONS (FULLY FIXED & RICH) -------------------------
+import streamlit as st
+
+from core import notifications
+from core.db import get_conn
+
+
+def render(selected):
+    st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+
+    if st.session_state.is_owner or st.session_state.is_admin:
+        st.info("📢 This page is for client personal notifications only.")
+        st.write("You send notifications through actions like License Generator, Withdrawals, etc.")
+        st.stop()
+
+    st.header("🔔 Notifications")
+    st.markdown("#### Important updates and alerts for your account")
+
+    client_id = st.session_state.client_id
+
+    # Live feed: a fragment timer polls a one-row signature query; only this
+    # block reruns, and the list is only re-read when the signature changes
+    @st.fragment(run_every=notifications.POLL_SECONDS)
+    def notification_feed(client_id):
+        # Fragment reruns get their own script thread -> that thread's pooled connection
+        feed_conn = get_conn()
+        signature = notifications.signature(feed_conn, client_id)
+        feed = st.session_state.get('notif_feed')
+        if feed is None or feed['client_id'] != client_id or feed['signature'] != signature:
+            feed = {'client_id': client_id, 'signature': signature,
+                    'rows': notifications.load(feed_conn, client_id)}
+            st.session_state.notif_feed = feed
+        notif_df = feed['rows']
+        unread_count = signature[2]
+
+        if unread_count > 0:
+            st.success(f"🟢 You have {unread_count} unread notification(s)")
+
+            if st.button("✅ Mark All as Read", type="primary", use_container_width=True):
+                try:
+                    feed_conn.execute("UPDATE notifications SET read = 1 WHERE client_id = ? AND read = 0", (client_id,))
+                    feed_conn.commit()
+                    st.success("All notifications marked as read!")
+                    st.rerun(scope="fragment")
+                except Exception as e:
+                    st.error(f"Error marking all as read: {e}")
+
+        if notif_df.empty:
+            st.info("No notifications yet.\n\n"
+                    "You will be notified here for:\n"
+                    "• New EA licenses\n"
+                    "• Withdrawal status changes\n"
+                    "• Important announcements\n"
+                    "• Messages from support")
+        else:
+            for _, noti in notif_df.iterrows():
+                icon = notifications.CATEGORY_ICONS.get(noti['category'], '🔔')
+                status_badge = "🟢 NEW" if noti['read'] == 0 else "✅ Read"
+
+                with st.expander(f"{status_badge} {icon} {noti['title']} • {noti['date']} • {noti['category']}", expanded=(noti['read'] == 0)):
+                    st.markdown(noti['message'])
+
+                    if noti['read'] == 0:
+                        col1, col2 = st.columns([1, 4])
+                        with col1:
+                            if st.button("Mark as Read", key=f"read_single_{noti['id']}"):
+                                try:
+                                    feed_conn.execute("UPDATE notifications SET read = 1 WHERE id = ?", (int(noti['id']),))
+                                    feed_conn.commit()
+                                    st.success("Marked as read!")
+                                    st.rerun(scope="fragment")
+                                except Exception as e:
+                                    st.error(f"Error: {e}")
+
+        st.caption(f"🔄 Live • checking for new notifications every {notifications.POLL_SECONDS} seconds")
+
+    notification_feed(client_id)
+
+    st.markdown("</div>", unsafe_allow_html=True)
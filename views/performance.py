@@ -0,0 +1,108 @@
+# ------------------------- PERFORMANCE (OWNER ONLY - PAGE RENDER TIMES & SLOW QUERIES, core/perf.py) -------------------------
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+from core import perf, slowlog
+from core.db import get_conn
+
+WINDOWS = {"Last hour": 1, "Last 24 hours": 24, "Last 7 days": 24 * 7, "Everything kept": None}
+
+
+def render(selected):
+    if not st.session_state.is_owner:
+        st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+        st.error("🚫 Access Denied")
+        st.write("Performance metrics are only available to Owner.")
+        st.markdown("</div>", unsafe_allow_html=True)
+        return
+
+    conn = get_conn()
+    st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+    st.header("⏱️ Performance")
+    st.markdown("#### Render time of every page run and the statements behind it")
+
+    # Runs finished in the last few seconds are still in memory
+    perf.flush(conn)
+    slowlog.flush()
+
+    col1, col2 = st.columns([2, 3])
+    with col1:
+        window = st.selectbox("Window", list(WINDOWS), index=1, key="perf_window")
+    hours = WINDOWS[window]
+    stats = perf.stats()
+    with col2:
+        st.caption(f"{stats['runs']} runs measured by this process • {stats['written']} written • "
+                   f"{stats['dropped']} dropped • metrics kept {perf.KEEP_DAYS} days")
+
+    # === PAGES ===
+    st.subheader("📄 Pages (wall time per run, slowest p95 first)")
+    summary = perf.page_summary(conn, hours)
+    if summary.empty:
+        st.info("No page runs recorded in this window yet.")
+    else:
+        st.dataframe(summary.rename(columns={
+            "page": "Page", "runs": "Runs", "p50_ms": "p50 ms", "p95_ms": "p95 ms", "p99_ms": "p99 ms",
+            "max_ms": "Max ms", "queries": "Queries / run", "rows": "Rows / run", "db_ms": "DB ms / run",
+            "pandas_ms": "Pandas ms / run", "errors": "Errors",
+        }).style.format({"p50 ms": "{:,.1f}", "p95 ms": "{:,.1f}", "p99 ms": "{:,.1f}", "Max ms": "{:,.1f}",
+                         "Queries / run": "{:,.1f}", "Rows / run": "{:,.0f}", "DB ms / run": "{:,.1f}",
+                         "Pandas ms / run": "{:,.1f}"}),
+            use_container_width=True, hide_index=True)
+
+    # === STATEMENTS ===
+    st.subheader("🐢 Slowest statements")
+    order = st.radio("Order by", ["Total time", "Slowest call", "Average"], horizontal=True, key="perf_order")
+    top = perf.slow_queries(conn, hours, limit=25,
+                            order={"Total time": "total_ms", "Slowest call": "max_ms", "Average": "avg_ms"}[order])
+    if top.empty:
+        st.info("No statements recorded in this window yet.")
+    else:
+        top['last_seen'] = pd.to_datetime(top['last_seen'], errors='coerce').dt.strftime('%b %d, %H:%M:%S')
+        st.dataframe(top.rename(columns={
+            "sql": "Statement", "calls": "Calls", "total_ms": "Total ms", "avg_ms": "Avg ms", "max_ms": "Max ms",
+            "rows": "Rows", "last_page": "Last page", "last_seen": "Last seen",
+        }).style.format({"Total ms": "{:,.1f}", "Avg ms": "{:,.2f}", "Max ms": "{:,.1f}"}),
+            use_container_width=True, hide_index=True)
+
+    # === SLOW STATEMENT LOG ===
+    st.subheader("🧾 Slow statement log")
+    slow_stats = slowlog.stats()
+    st.caption(f"Every statement over {slow_stats['threshold_ms']:g} ms (KMFX_SLOW_QUERY_MS), by normalized text, "
+               f"with its query plan • {slow_stats['logged']} logged by this process • kept {slowlog.KEEP_DAYS} days")
+    slow = slowlog.summary(conn, hours, limit=50, order="max_ms")
+    if slow.empty:
+        st.info("No slow statements logged in this window.")
+    else:
+        shown = slow.copy()
+        shown['full_scan'] = shown['full_scan'].map({1: "⚠️ yes", 0: ""})
+        shown['last_seen'] = pd.to_datetime(shown['last_seen'], errors='coerce').dt.strftime('%b %d, %H:%M:%S')
+        st.dataframe(shown[["sql", "calls", "max_ms", "avg_ms", "rows", "full_scan", "last_seen"]].rename(columns={
+            "sql": "Statement", "calls": "Calls", "max_ms": "Max ms", "avg_ms": "Avg ms", "rows": "Rows",
+            "full_scan": "Full scan", "last_seen": "Last seen",
+        }).style.format({"Max ms": "{:,.1f}", "Avg ms": "{:,.1f}"}), use_container_width=True, hide_index=True)
+        picked = st.selectbox("Query plan of", range(len(slow)), format_func=lambda i: slow['sql'].iloc[i][:120],
+                              key="perf_slow_plan")
+        st.code(slow['plan'].iloc[picked] or "(no plan for this kind of statement)", language=None)
+        st.caption(f"Slowest call: params hash {slow['params_hash'].iloc[picked]}")
+        st.code(slow['example'].iloc[picked], language="sql")
+    st.download_button("📥 Export slow statement log CSV", slowlog.export_csv(conn),
+                       f"KMFX_Slow_Statements_{datetime.date.today().isoformat()}.csv", "text/csv",
+                       use_container_width=True)
+
+    # === PROFILING ===
+    st.subheader("🔬 cProfile dumps")
+    if not stats['profiling']:
+        st.caption("Off. Start the app with KMFX_PROFILE=1 to profile every page run of the first session "
+                   f"that opens a page (dumps go to {stats['profile_dir']}/).")
+    else:
+        mine = stats['profiled_session'] == st.session_state.get('session_key')
+        st.caption(f"On for {'this session' if mine else 'another session'} • dumps in {stats['profile_dir']}/ "
+                   "• read one with `python -m pstats FILE`")
+        dumps = perf.profile_dumps()
+        if dumps:
+            st.dataframe(pd.DataFrame(dumps, columns=["File", "Bytes", "Written"]).head(50),
+                         use_container_width=True, hide_index=True)
+
+    st.markdown("</div>", unsafe_allow_html=True)
@@ -0,0 +1,217 @@
+# ------------------------- SUPER ULTIMATE PROFIT SHARING & EARNINGS (FINAL FIXED - REFERRAL BONUS GUARANTEED WORKING) -------------------------
+import datetime
+import hashlib
+import uuid
+
+import pandas as pd
+import streamlit as st
+
+from core import ledger, lookup, profits, queries, referrals
+from core.db import get_conn
+from views.common import add_log, load_clients, refresh_current_client
+
+
+def render(selected):
+    conn = get_conn()
+    st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+   
+    if st.session_state.is_owner or st.session_state.is_admin:
+        # ====================== OWNER / ADMIN VIEW ======================
+        st.header("💰 Profit Sharing Management")
+        df_clients = load_clients()
+       
+        tab_single, tab_bulk = st.tabs(["📈 Record Profit", "📤 Bulk Import"])
+        
+        with tab_single:
+            if df_clients.empty:
+                st.info("No clients yet. Add them in Client Management first.")
+            else:
+                client_options = dict(zip(df_clients['name'], df_clients['id']))
+                # One lookup per option (a DataFrame filter per option is quadratic in the client count)
+                client_types = df_clients.drop_duplicates('name').set_index('name')['type'].to_dict()
+                selected_name = st.selectbox(
+                    "Select Client",
+                    options=list(client_options.keys()),
+                    format_func=lambda x: f"{x} ({client_types[x]})"
+                )
+                client_id = client_options[selected_name]
+           
+                # Fresh client data
+                client = queries.client_by_id(client_id).iloc[0].to_dict()
+           
+                st.success(f"**Selected:** {client['name']} • {client['type']} • "
+                           f"Equity: ${client['current_equity']:,.2f} • "
+                           f"Withdrawable: ${client['withdrawable_balance']:,.2f}")
+           
+                # Profit input
+                col1, col2 = st.columns([2, 1])
+                with col1:
+                    profit = st.number_input("Profit / Loss Amount ($)", value=0.0, step=100.0, format="%.2f")
+                with col2:
+                    rec_date = st.date_input("Record Date", value=datetime.date.today())
+           
+                # One nonce per intended posting: a double click or a retry of the same posting
+                # carries the same idempotency key, so it is replayed instead of posted twice
+                if 'profit_nonce' not in st.session_state:
+                    st.session_state.profit_nonce = uuid.uuid4().hex
+                show_trace = st.checkbox("Show referral bonus trace", key="profit_trace")
+                record_clicked = st.button("📈 RECORD PROFIT / LOSS", type="primary", use_container_width=True)
+                if not record_clicked and st.session_state.pop('profit_posted', False):
+                    st.session_state.profit_nonce = uuid.uuid4().hex
+                # Result of the posting that triggered this rerun
+                if 'profit_result' in st.session_state:
+                    result, trace = st.session_state.pop('profit_result')
+                    st.success(result)
+                    if trace:
+                        st.info(trace)
+
+                if record_clicked:
+                    if profit == 0:
+                        st.warning("Enter a non-zero amount.")
+                    else:
+                        try:
+                            # Shares and the Pioneer bonus chain are computed inside the posting
+                            # transaction by the same engine as the bulk import (core/profits.py)
+                            key = profits.posting_key(client_id, rec_date, profit, st.session_state.profit_nonce)
+                            postings, bonuses, replayed = profits.post_profits(
+                                conn, [(client_id, profit, rec_date.isoformat())], key=key)
+                            st.session_state.profit_posted = True
+                            # A replay returns what the first click posted: shown the same way
+                            posted = postings.iloc[0]
+                            trace = []
+                            if show_trace and posted['profit'] > 0 and client['type'].strip() == "Regular":
+                                names = lookup.clients.names(bonuses['pioneer_id'].tolist())
+                                for level, pioneer_id, bonus in bonuses[['level', 'pioneer_id', 'bonus']].itertuples(index=False):
+                                    trace.append(f"Level {level}: +${bonus:.2f} → {names.get(pioneer_id, pioneer_id)} (Pioneer)")
+                                if len(bonuses) < referrals.MAX_BONUS_DEPTH:
+                                    uplines = referrals.get_upline(conn, client_id)
+                                    if len(uplines) > len(bonuses):
+                                        stop = uplines[len(bonuses)]
+                                        trace.append(f"Level {len(bonuses) + 1}: {stop['name']} is {stop['type']} → not Pioneer, stopping.")
+                                    else:
+                                        trace.append(f"Level {len(bonuses) + 1}: Reached top of chain (no further upline)")
+                            st.session_state.profit_result = (
+                                ("ℹ️ This profit was already recorded - nothing was posted twice.\n" if replayed
+                                 else "✅ Profit recorded successfully!\n") +
+                                f"Client earnings: +${posted['client_share']:.2f}\n"
+                                f"Referral bonuses distributed: ${posted['referral_total']:.2f}\n"
+                                f"Owner net: +${posted['your_share']:.2f}",
+                                "🔍 Referral bonus trace\n\n" + "\n\n".join(trace) if trace else None)
+                            st.rerun()
+                       
+                        except Exception as e:
+                            st.error(f"Error recording profit: {e}")
+                            print(f"MAIN PROFIT ERROR: {e}")
+           
+                # === PROFIT HISTORY ===
+                st.markdown("---")
+                st.subheader(f"Profit History - {client['name']}")
+                history = queries.profit_history(client_id)
+           
+                if not history.empty:
+                    history['date'] = pd.to_datetime(history['date']).dt.strftime('%b %d, %Y')
+                    history['profit'] = history['profit'].apply(lambda x: f"${x:,.2f}")
+                    history['client_share'] = history['client_share'].apply(lambda x: f"${x:,.2f}" if x else "-")
+                    history['your_share'] = history['your_share'].apply(lambda x: f"${x:,.2f}" if x else "-")
+                    history['referral_bonus'] = history['referral_bonus'].apply(lambda x: f"${x:,.2f}" if x else "-")
+                    st.dataframe(history, use_container_width=True, hide_index=True)
+                else:
+                    st.info("No profit records yet for this client.")
+   
+        with tab_bulk:
+            st.subheader("Bulk Profit Import")
+            st.caption("CSV with columns **client_id** (or **name**), **profit** and optional **date** (YYYY-MM-DD). "
+                       "Shares and referral bonuses are computed exactly like single-client recording "
+                       "and the whole file is posted in one transaction.")
+            bulk_date = st.date_input("Date for rows without one", value=datetime.date.today(), key="bulk_default_date")
+            bulk_file = st.file_uploader("Profit CSV", type=["csv"], key="bulk_profit_csv")
+            
+            if bulk_file is not None:
+                try:
+                    bulk_df = pd.read_csv(bulk_file)
+                    postings, bonuses = profits.preview_postings(conn, bulk_df, default_date=bulk_date.isoformat())
+                except Exception as e:
+                    st.error(f"Cannot import this file: {e}")
+                else:
+                    p1, p2, p3, p4 = st.columns(4)
+                    p1.metric("Rows", f"{len(postings):,}")
+                    p2.metric("Total Profit", f"${postings['profit'].sum():,.2f}")
+                    p3.metric("Referral Bonuses", f"${bonuses['bonus'].sum():,.2f}")
+                    p4.metric("Owner Net", f"${postings['your_share'].sum():,.2f}")
+                    
+                    preview = postings[['name', 'type', 'date', 'profit', 'client_share', 'referral_total', 'your_share']]
+                    st.dataframe(
+                        preview,
+                        use_container_width=True,
+                        hide_index=True,
+                        column_config={
+                            col: st.column_config.NumberColumn(format="$%.2f")
+                            for col in ['profit', 'client_share', 'referral_total', 'your_share']
+                        }
+                    )
+                    
+                    # Result of the posting that triggered this rerun
+                    if 'bulk_result' in st.session_state:
+                        st.success(st.session_state.pop('bulk_result'))
+
+                    if st.button(f"📤 POST {len(postings):,} PROFIT RECORDS", type="primary", use_container_width=True):
+                        try:
+                            # Keyed on the file's bytes, not the upload: the same CSV uploaded again is a no-op
+                            content = hashlib.sha256(bulk_file.getvalue()).hexdigest()
+                            key = ledger.posting_key("profit-import", content, bulk_date.isoformat())
+                            postings, bonuses, replayed = profits.post_profits(conn, bulk_df, default_date=bulk_date.isoformat(),
+                                                                               key=key)
+                            if not replayed:
+                                add_log("Bulk Profit Import",
+                                        f"{len(postings)} rows from {bulk_file.name} | Profit: ${postings['profit'].sum():,.2f} | "
+                                        f"Bonuses: {len(bonuses)} (${bonuses['bonus'].sum():,.2f})")
+                            # A replay returns what the first upload posted: shown the same way
+                            st.session_state.bulk_result = (
+                                (f"ℹ️ {bulk_file.name} was already posted - nothing was posted twice.\n" if replayed
+                                 else "✅ Profits posted!\n") +
+                                f"{len(postings):,} profit records (${postings['profit'].sum():,.2f}) • "
+                                f"{len(bonuses):,} referral bonuses (${bonuses['bonus'].sum():,.2f}) • "
+                                f"Owner net: ${postings['your_share'].sum():,.2f}")
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Error posting profits: {e}")
+   
+    else:
+        # ====================== CLIENT VIEW ======================
+        st.header("💰 My Profit & Earnings")
+        refresh_current_client()
+        client = st.session_state.current_client
+        client_id = client['id']
+       
+        col1, col2 = st.columns(2)
+        col1.metric("Current Equity", f"${client['current_equity']:,.2f}")
+        col2.metric("Withdrawable Earnings", f"${client['withdrawable_balance']:,.2f}")
+       
+        history = queries.earnings_history(client_id)
+       
+        if not history.empty:
+            st.subheader("Earnings History")
+            history['date'] = pd.to_datetime(history['date']).dt.strftime('%b %d, %Y')
+            history['profit'] = history['profit'].apply(lambda x: f"${x:,.2f}")
+            history['client_share'] = history['client_share'].apply(lambda x: f"${x:,.2f}" if x else "-")
+            history['referral_bonus'] = history['referral_bonus'].apply(lambda x: f"${x:,.2f}" if x else "-")
+            history['total_earned'] = pd.to_numeric(history['client_share'].str.replace(r'[$,]', '', regex=True), errors='coerce').fillna(0) + \
+                                      pd.to_numeric(history['referral_bonus'].str.replace(r'[$,]', '', regex=True), errors='coerce').fillna(0)
+            history['total_earned'] = history['total_earned'].apply(lambda x: f"${x:,.2f}")
+           
+            display_hist = history[['date', 'profit', 'client_share', 'referral_bonus', 'total_earned']]
+            display_hist.rename(columns={
+                'date': 'Date',
+                'profit': 'Recorded Profit',
+                'client_share': 'Your Share',
+                'referral_bonus': 'Referral Bonus',
+                'total_earned': 'Total Earned'
+            }, inplace=True)
+            st.dataframe(display_hist, use_container_width=True, hide_index=True)
+           
+            total_earned = history['total_earned'].str.replace(r'[$,]', '', regex=True).astype(float).sum()
+            st.success(f"🌟 Lifetime Earnings: ${total_earned:,.2f}")
+        else:
+            st.info("No earnings recorded yet. Your journey starts with the first profit!")
+   
+    st.markdown("</div>", unsafe_allow_html=True)
@@ -0,0 +1,183 @@
+# ------------------------- SUPER ULTIMATE REPORTS & EXPORT (OWNER ONLY) -------------------------
+import datetime
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from core import queries, timeseries
+from core.db import get_conn
+from views.common import load_clients, load_log_count, load_profits_summary, theme_colors
+
+
+def render(selected):
+    accent = theme_colors()["accent"]
+    if not st.session_state.is_owner:
+        st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+        st.error("🚫 Access Denied")
+        st.write("Reports & Export is only available to Owner.")
+        st.markdown("</div>", unsafe_allow_html=True)
+    else:
+        st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+        st.header("📈 Reports & Export")
+        st.markdown("#### Comprehensive data reports and CSV exports")
+
+        # Load all data
+        df_clients = load_clients()
+        df_profits = load_profits_summary()
+        df_withdrawals = queries.all_withdrawals()
+
+        tab1, tab2, tab3, tab4 = st.tabs(["💰 Profit Reports", "👥 Client Summary", "💳 Withdrawals Report", "📜 Full Audit Logs"])
+
+        with tab1:
+            st.subheader("Profit & Revenue Reports")
+
+            if df_profits.empty:
+                st.info("No profit records yet. Reports will populate after recording profits.")
+            else:
+                # Full profits with client names
+                profits_full = queries.profits_with_clients()
+
+                profits_full['date'] = pd.to_datetime(profits_full['date']).dt.strftime('%b %d, %Y')
+
+                # Format currency
+                for col in ['profit', 'client_share', 'your_share', 'referral_bonus']:
+                    profits_full[col] = profits_full[col].apply(lambda x: f"${x:,.2f}" if x else "$0.00")
+
+                st.dataframe(profits_full, use_container_width=True, hide_index=True)
+
+                # Totals
+                total_profit = df_profits['profit'].sum()
+                total_client_share = df_profits['client_share'].sum()
+                total_owner_share = df_profits['your_share'].sum()
+                total_referral = df_profits['referral_bonus'].sum()
+
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Total Recorded Profit", f"${total_profit:,.2f}")
+                col2.metric("Client Shares Paid", f"${total_client_share:,.2f}")
+                col3.metric("Your Revenue", f"${total_owner_share:,.2f}")
+                col4.metric("Referral Bonuses", f"${total_referral:,.2f}")
+
+                # Revenue over time - bucketed in SQL (core/timeseries.py)
+                st.markdown("#### 📈 Revenue Over Time")
+                bucket = st.radio("Group by", ["day", "week", "month"], index=2, horizontal=True,
+                                  format_func=str.title, key="report_bucket")
+                revenue = timeseries.revenue_series(bucket)
+                revenue_df = pd.DataFrame({
+                    'Period': revenue['x'],
+                    'Your Share': revenue['your_share'],
+                    'Referral Bonuses': revenue['referral_bonus']
+                })
+                fig_rev = px.bar(revenue_df, x='Period', y=['Your Share', 'Referral Bonuses'],
+                                 color_discrete_sequence=[accent, "#f59e0b"])
+                fig_rev.update_layout(
+                    template="plotly_dark" if st.session_state.theme == "dark" else "plotly_white",
+                    paper_bgcolor="rgba(0,0,0,0)",
+                    plot_bgcolor="rgba(0,0,0,0)",
+                    yaxis_title="Revenue ($)",
+                    legend_title_text="",
+                    height=400
+                )
+                st.plotly_chart(fig_rev, use_container_width=True)
+
+                # Export
+                csv_profits = profits_full.to_csv(index=False).encode()
+                st.download_button(
+                    "📥 Export Profit Report CSV",
+                    csv_profits,
+                    "KMFX_Profit_Report.csv",
+                    "text/csv",
+                    use_container_width=True
+                )
+
+        with tab2:
+            st.subheader("Client Summary Report")
+
+            if df_clients.empty:
+                st.info("No clients yet.")
+            else:
+                clients_report = df_clients.copy()
+                clients_report['current_equity'] = clients_report['current_equity'].apply(lambda x: f"${x:,.2f}")
+                clients_report['withdrawable_balance'] = clients_report['withdrawable_balance'].apply(lambda x: f"${x:,.2f}")
+                clients_report['start_balance'] = clients_report['start_balance'].apply(lambda x: f"${x:,.2f}")
+                clients_report['add_date'] = pd.to_datetime(clients_report['add_date']).dt.strftime('%b %d, %Y')
+                clients_report['expiry'] = pd.to_datetime(clients_report['expiry'], errors='coerce').dt.strftime('%b %d, %Y')
+
+                cols = ['name', 'type', 'mobile_number', 'address', 'accounts', 'referral_code',
+                        'current_equity', 'withdrawable_balance', 'start_balance', 'add_date', 'expiry']
+                clients_report = clients_report[[c for c in cols if c in clients_report.columns]]
+                clients_report.rename(columns={
+                    'name': 'Client Name',
+                    'type': 'Type',
+                    'mobile_number': 'Mobile',
+                    'address': 'Address',
+                    'accounts': 'Accounts',
+                    'referral_code': 'Referral Code',
+                    'current_equity': 'Current Equity',
+                    'withdrawable_balance': 'Withdrawable',
+                    'start_balance': 'Start Balance',
+                    'add_date': 'Joined',
+                    'expiry': 'Expiry'
+                }, inplace=True)
+
+                st.dataframe(clients_report, use_container_width=True, hide_index=True)
+
+                csv_clients = df_clients.to_csv(index=False).encode()
+                st.download_button(
+                    "📥 Export Client Summary CSV",
+                    csv_clients,
+                    "KMFX_Client_Summary.csv",
+                    "text/csv",
+                    use_container_width=True
+                )
+
+        with tab3:
+            st.subheader("Withdrawals Report")
+
+            if df_withdrawals.empty:
+                st.info("No withdrawal records yet.")
+            else:
+                wd_report = queries.withdrawals_with_clients()
+
+                wd_report['date_requested'] = pd.to_datetime(wd_report['date_requested']).dt.strftime('%b %d, %Y')
+                if 'date_processed' in wd_report.columns:
+                    wd_report['date_processed'] = pd.to_datetime(wd_report['date_processed'], errors='coerce').dt.strftime('%b %d, %Y')
+
+                wd_report['amount'] = wd_report['amount'].apply(lambda x: f"${x:,.2f}")
+
+                st.dataframe(wd_report, use_container_width=True, hide_index=True)
+
+                csv_wd = wd_report.to_csv(index=False).encode()
+                st.download_button(
+                    "📥 Export Withdrawals Report CSV",
+                    csv_wd,
+                    "KMFX_Withdrawals_Report.csv",
+                    "text/csv",
+                    use_container_width=True
+                )
+
+        with tab4:
+            st.subheader("Full Audit Logs Export")
+
+            latest_logs = queries.log_page(limit=queries.LOG_PAGE_SIZE)
+            if latest_logs.empty:
+                st.info("No logs yet.")
+            else:
+                st.caption(f"Latest {len(latest_logs)} of {load_log_count():,} entries - browse and filter them on the Audit Logs page.")
+                logs_display = latest_logs.copy()
+                logs_display['timestamp'] = pd.to_datetime(logs_display['timestamp']).dt.strftime('%Y-%m-%d %H:%M:%S')
+
+                st.dataframe(logs_display, use_container_width=True, hide_index=True)
+
+                if st.button("📄 Prepare Full Audit Logs CSV", use_container_width=True):
+                    st.session_state.report_logs_csv = queries.logs_csv()
+                if st.session_state.get('report_logs_csv'):
+                    st.download_button(
+                        "📥 Export Full Audit Logs CSV",
+                        st.session_state.report_logs_csv,
+                        f"KMFX_Audit_Logs_{datetime.date.today().isoformat()}.csv",
+                        "text/csv",
+                        use_container_width=True
+                    )
+
+        st.markdown("</div>", unsafe_allow_html=True)
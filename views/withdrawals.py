@@ -0,0 +1,232 @@
+# ------------------------- SUPER ULTIMATE WITHDRAWALS MANAGEMENT (WITH CLEAR 1-3 DAYS NOTE) -------------------------
+import datetime
+
+import streamlit as st
+
+from core import events, ledger, queries
+from core.db import get_conn
+from views.common import add_log, refresh_current_client
+
+
+def render(selected):
+    conn = get_conn()
+    c = conn.cursor()
+    st.markdown("<div class='content-card'>", unsafe_allow_html=True)
+
+    # ====================== ADMIN / OWNER VIEW ======================
+    if st.session_state.is_owner or st.session_state.is_admin:
+        st.header("💳 Withdrawal Management")
+        st.markdown("#### Approve requests and mark as paid when processed")
+
+        pending = queries.pending_withdrawals()
+        approved_pending_payout = queries.approved_withdrawals()
+
+        if pending.empty and approved_pending_payout.empty:
+            st.success("✅ No pending withdrawal actions at the moment.")
+        else:
+            if not pending.empty:
+                st.warning(f"⏳ {len(pending)} pending approval request(s)")
+                for _, req in pending.iterrows():
+                    with st.expander(f"⏳ ${req['amount']:,.2f} • {req['name']} • Requested: {req['date_requested']}", expanded=True):
+                        st.write(f"**Client:** {req['name']}")
+                        st.write(f"**Mobile:** {req['mobile_number'] or 'Not set'}")
+                        st.write(f"**Address:** {req['address'] or 'Not set'}")
+                        st.write(f"**Current Withdrawable:** ${req['withdrawable_balance']:,.2f}")
+                        st.write(f"**Details:**\n{req['details']}")
+
+                        col_approve, col_reject = st.columns(2)
+                        with col_approve:
+                            if st.button("✅ APPROVE", key=f"approve_{req['id']}", type="primary"):
+                                try:
+                                    c.execute("""UPDATE withdrawals
+                                                 SET status = 'Approved',
+                                                     date_processed = ?,
+                                                     processed_by = ?
+                                                 WHERE id = ?""",
+                                              (datetime.date.today().isoformat(),
+                                               "Owner" if st.session_state.is_owner else "Admin",
+                                               req['id']))
+                                    events.publish(conn, "withdrawal.approved", req['client_id'], withdrawal_id=int(req['id']),
+                                                   amount=float(req['amount']), text=f"💳 Withdrawal of ${req['amount']:,.2f} approved")
+                                    conn.commit()
+
+                                    # === NOTIFICATION WITH 1-3 DAYS NOTE ===
+                                    try:
+                                        c.execute("""INSERT INTO notifications
+                                                     (client_id, title, message, category, date, read)
+                                                     VALUES (
+                                                         (SELECT client_id FROM withdrawals WHERE id = ?),
+                                                         '💳 Withdrawal Approved!',
+                                                         ?,
+                                                         'Withdrawal',
+                                                         ?,
+                                                         0
+                                                     )""",
+                                                  (req['id'],
+                                                   f"Your withdrawal request of ${req['amount']:,.2f} has been **APPROVED**! 🎉\n\n"
+                                                   f"**Payment will be sent within 1-3 working days** via {req['method']}.\n\n"
+                                                   f"Please check your account after that period.\n\n"
+                                                   f"Thank you for trading with KMFX Elite!",
+                                                   datetime.date.today().isoformat()))
+                                        conn.commit()
+                                    except:
+                                        pass
+
+                                    add_log("Withdrawal Approved", f"${req['amount']:,.2f} for {req['name']}")
+                                    st.success("Approved! Client notified with processing time.")
+                                    st.rerun()
+                                except Exception as e:
+                                    st.error(f"Error: {e}")
+
+                        with col_reject:
+                            reject_reason = st.text_input("Reason for rejection", key=f"reason_{req['id']}")
+                            if st.button("❌ REJECT", key=f"reject_{req['id']}", type="secondary"):
+                                if not reject_reason.strip():
+                                    st.error("Reason required.")
+                                else:
+                                    try:
+                                        c.execute("""UPDATE withdrawals SET status = 'Rejected', notes = ? WHERE id = ?""",
+                                                  (reject_reason, req['id']))
+                                        events.publish(conn, "withdrawal.rejected", req['client_id'], withdrawal_id=int(req['id']),
+                                                       amount=float(req['amount']), text=f"💳 Withdrawal of ${req['amount']:,.2f} rejected")
+                                        conn.commit()
+                                        try:
+                                            c.execute("""INSERT INTO notifications
+                                                         (client_id, title, message, category, date, read)
+                                                         VALUES (
+                                                             (SELECT client_id FROM withdrawals WHERE id = ?),
+                                                             'Withdrawal Rejected',
+                                                             ?,
+                                                             'Withdrawal',
+                                                             ?,
+                                                             0
+                                                         )""",
+                                                      (req['id'],
+                                                       f"Your withdrawal was rejected.\nReason: {reject_reason}",
+                                                       datetime.date.today().isoformat()))
+                                            conn.commit()
+                                        except:
+                                            pass
+                                        add_log("Withdrawal Rejected", f"${req['amount']:,.2f} | {reject_reason}")
+                                        st.error("Rejected.")
+                                        st.rerun()
+                                    except Exception as e:
+                                        st.error(f"Error: {e}")
+
+            if not approved_pending_payout.empty:
+                st.markdown("---")
+                st.subheader("✅ Approved - Awaiting Payout (1-3 Working Days)")
+                for _, req in approved_pending_payout.iterrows():
+                    with st.expander(f"👍 ${req['amount']:,.2f} • {req['name']} • Approved: {req['date_processed']}", expanded=False):
+                        st.write(f"**Client:** {req['name']}")
+                        st.write(f"**Current Withdrawable:** ${req['withdrawable_balance']:,.2f}")
+                        st.write(f"**Details:** {req['details']}")
+                        st.info("⏳ Client has been informed: Payment within 1-3 working days")
+                        if st.button("💰 MARK AS PAID (Deduct Balance)", key=f"paid_{req['id']}", type="secondary", use_container_width=True):
+                            try:
+                                def mark_paid(conn):
+                                    # Only an Approved request is paid, so a double click cannot deduct twice
+                                    paid = conn.execute("""UPDATE withdrawals SET status = 'Paid'
+                                                           WHERE id = ? AND status = 'Approved'""", (req['id'],)).rowcount
+                                    if not paid:
+                                        return []
+                                    events.publish(conn, "withdrawal.paid", req['client_id'], withdrawal_id=int(req['id']),
+                                                   amount=float(req['amount']), text=f"💸 Withdrawal of ${req['amount']:,.2f} paid")
+                                    return [ledger.Entry(req['client_id'], 0.0, -req['amount'], "withdrawal",
+                                                         "withdrawals", req['id'])]
+
+                                if not ledger.post(conn, mark_paid):
+                                    st.warning("This withdrawal was already marked as paid.")
+                                    st.rerun()
+
+                                # Final paid notification
+                                try:
+                                    c.execute("""INSERT INTO notifications
+                                                 (client_id, title, message, category, date, read)
+                                                 VALUES (
+                                                     (SELECT client_id FROM withdrawals WHERE id = ?),
+                                                     '✅ Withdrawal Paid!',
+                                                     ?,
+                                                     'Withdrawal',
+                                                     ?,
+                                                     0
+                                                 )""",
+                                              (req['id'],
+                                               f"Great news! Your withdrawal of ${req['amount']:,.2f} has been **PAID**! 💸\n\n"
+                                               f"Check your {req['method']} account now.\n\n"
+                                               f"Thank you for being part of KMFX Elite!",
+                                               datetime.date.today().isoformat()))
+                                    conn.commit()
+                                except:
+                                    pass
+
+                                add_log("Withdrawal Paid", f"${req['amount']:,.2f} for {req['name']}")
+                                st.success("Marked as PAID! Balance deducted.")
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"Error: {e}")
+
+    # ====================== CLIENT VIEW ======================
+    else:
+        st.header("💳 My Withdrawals")
+        st.markdown("#### Request payout of your earnings")
+
+        refresh_current_client()
+        client = st.session_state.current_client
+        withdrawable = client['withdrawable_balance']
+        st.metric("Available for Withdrawal", f"${withdrawable:,.2f}")
+
+        if withdrawable < 10:
+            st.warning("Minimum withdrawal amount is $10.")
+        else:
+            with st.form("withdrawal_request"):
+                amount = st.number_input("Amount ($)", min_value=10.0, max_value=float(withdrawable), step=10.0)
+                method = st.selectbox("Payment Method", ["GCash", "Bank Transfer", "USDT", "PayMaya", "PayPal", "Other"])
+                details = st.text_area("Payment Details (e.g. GCash number, Bank account) *")
+
+                if st.form_submit_button("📤 SUBMIT REQUEST", type="primary"):
+                    if not details.strip():
+                        st.error("Payment details are required!")
+                    else:
+                        try:
+                            c.execute("""INSERT INTO withdrawals
+                                         (client_id, amount, method, details, date_requested, status)
+                                         VALUES (?, ?, ?, ?, ?, 'Pending')""",
+                                      (client['id'], amount, method, details, datetime.date.today().isoformat()))
+                            events.publish(conn, "withdrawal.requested", client['id'], amount=amount,
+                                           text=f"💳 {client['name']} requested a ${amount:,.2f} withdrawal")
+                            conn.commit()
+
+                            # === CLEAR SUCCESS MESSAGE WITH 1-3 DAYS NOTE ===
+                            st.success(f"✅ Withdrawal request for ${amount:,.2f} submitted successfully!\n\n"
+                                       f"**Status:** Pending Approval\n"
+                                       f"**Processing Time:** Once approved, payment will be sent within **1-3 working days**.\n\n"
+                                       f"You will receive a notification for every update.")
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Error: {e}")
+
+        # History
+        st.markdown("---")
+        st.subheader("Withdrawal History")
+        history = queries.client_withdrawals(client['id'])
+        if history.empty:
+            st.info("No withdrawal history yet.")
+        else:
+            for _, row in history.iterrows():
+                if row['status'] == 'Paid':
+                    icon = "✅"
+                    extra = ""
+                elif row['status'] == 'Approved':
+                    icon = "👍"
+                    extra = " (Payment processing: 1-3 working days)"
+                elif row['status'] == 'Rejected':
+                    icon = "❌"
+                    extra = f" - Reason: {row['notes'] or 'Not specified'}"
+                else:
+                    icon = "⏳"
+                    extra = ""
+
+                st.markdown(f"{icon} **${row['amount']:,.2f}** • {row['method']} • {row['date_requested']} • Status: **{row['status']}**{extra}")
+
+    st.markdown("</div>", unsafe_allow_html=True)